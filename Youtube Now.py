@@ -1,27 +1,1150 @@
 import sys
 import re
 import os
+import json
+import time
+import argparse
 import logging
+import logging.handlers
+import threading
+import traceback
+import cProfile
+import pstats
+import io
+import queue
+import atexit
+import random
+import itertools
+import math
+import mmap
+from concurrent.futures import ThreadPoolExecutor
+
+# Referencia para medir las fases del arranque (--startup-trace)
+_PROCESS_T0 = time.perf_counter()
+
+from collections import OrderedDict, deque
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QVBoxLayout, QPushButton, QHBoxLayout,
     QColorDialog, QDialog, QDialogButtonBox, QSpinBox, QFormLayout, QGroupBox,
-    QSlider, QCheckBox, QComboBox, QMessageBox, QListWidget, QListWidgetItem
+    QSlider, QCheckBox, QComboBox, QMessageBox, QListView, QShortcut, QPlainTextEdit, QFileDialog,
+    QScrollArea, QFrame, QInputDialog, QSizePolicy
 )
-from PyQt5.QtWebEngineWidgets import QWebEngineView, QWebEngineSettings, QWebEngineProfile, QWebEnginePage
-from PyQt5.QtCore import Qt, QUrl, QPoint, QSettings, QObject, QEvent
-from PyQt5.QtGui import QFont
+from PyQt5.QtCore import (
+    Qt, QUrl, QPoint, QSettings, QObject, QEvent, QTimer, pyqtSignal, QCoreApplication,
+    QSize, QRect, QFile, QIODevice, QBuffer, pyqtSlot
+)
+from PyQt5.QtGui import QFont, QKeySequence, QGuiApplication, QOpenGLContext
+from PyQt5.QtNetwork import QLocalServer, QLocalSocket
+from urllib.parse import quote, urlsplit, parse_qs
 import re
+from youtube_url import parse_youtube_url, EMBED_HOST, EMBED_HOSTS
+from perf import perf_log, perf_metrics, timed
+from telemetry import PlaybackTelemetry
+from settings_service import SettingsService
+from profiles import ProfileCacheManager, ProfileManager
+from history import HistoryStore, HistoryModel, history_key, format_duration
+from metadata import MetadataService
+from embed_hosts import EmbedHostStats, LoadSupervisor
+from players import PlayerLifecyclePolicy, PlayerManager
+import getpass
+from datetime import datetime
+
+# Directorio de datos de la aplicación (caché del perfil, historial, ...)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".youtube_floater_cache")
+
+# QtWebEngine (Chromium) es lo más caro del arranque: se importa bajo demanda con
+# load_webengine() cuando el lanzador ya está visible. Hasta entonces valen None.
+QWebEngineView = QWebEngineSettings = QWebEngineProfile = QWebEnginePage = None
+DiagnosticWebPage = None
+
+# Estados de ciclo de vida de página (Active -> Frozen -> Discarded), disponibles desde Qt 5.14
+LIFECYCLE_SUPPORTED = False
+
+class StartupTrace:
+    """Registra cuánto tarda cada fase del arranque; con --startup-trace las muestra en el log"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.phases = []
+
+    def mark(self, phase):
+        elapsed_ms = (time.perf_counter() - _PROCESS_T0) * 1000
+        self.phases.append((phase, elapsed_ms))
+        if self.enabled:
+            logging.info(f"[startup] {phase}: {elapsed_ms:.0f} ms")
+
+    def report(self):
+        if not self.enabled:
+            return
+        lines = ["Fases de arranque:"]
+        previous = 0.0
+        for phase, elapsed_ms in self.phases:
+            lines.append(f"  {phase:<28} {elapsed_ms:8.0f} ms  (+{elapsed_ms - previous:.0f} ms)")
+            previous = elapsed_ms
+        logging.info("\n".join(lines))
+
+startup_trace = StartupTrace()
+
+# --- Logging y diagnóstico ----------------------------------------------------
+# Log de rendimiento (bloqueos del event loop, tiempos, perfiles); además de la
+# consola va a un fichero rotativo (ver setup_logging)
+perf_log_path = None
+
+# Volcados de diagnóstico de cargas fallidas (se conservan los más recientes)
+DIAGNOSTICS_DIR = os.path.join(CACHE_DIR, "diagnostics")
+MAX_DIAGNOSTIC_DUMPS = 20
+
+def setup_logging(level=logging.INFO, perf_path=None):
+    """Log asíncrono: el hilo de la interfaz sólo encola los registros (QueueHandler)
+    y un QueueListener los escribe en consola y en el fichero de rendimiento.
+
+    Devuelve el listener; se detiene (vaciando la cola) al salir del proceso.
+    """
+    global perf_log_path
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    handlers = [console]
+    perf_path = perf_path or os.path.join(CACHE_DIR, "perf.log")
+    try:
+        os.makedirs(os.path.dirname(perf_path), exist_ok=True)
+        perf_file = logging.handlers.RotatingFileHandler(perf_path, maxBytes=1_000_000, backupCount=3, encoding="utf-8")
+        perf_file.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+        perf_file.addFilter(logging.Filter(perf_log.name))
+        handlers.append(perf_file)
+        perf_log_path = perf_path
+    except OSError:
+        console.handle(logging.makeLogRecord({"msg": f"No se pudo abrir el log de rendimiento {perf_path}",
+                                              "levelno": logging.WARNING, "levelname": "WARNING"}))
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+# Hilo para escribir volcados de diagnóstico sin bloquear la interfaz
+_diagnostics_executor = None
+
+def write_diagnostic_dump(stem, lines, html):
+    """Guarda el registro de una ventana y el HTML de la página en DIAGNOSTICS_DIR (en segundo plano)"""
+    global _diagnostics_executor
+    if _diagnostics_executor is None:
+        _diagnostics_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="diagnostics")
+    return _diagnostics_executor.submit(_write_diagnostic_dump, stem, lines, html)
+
+# Fecha en el nombre de los volcados (load-error-<fecha>-..., renderer-crash-<fecha>-...)
+_DUMP_DATE_RE = re.compile(r"\d{8}-\d{6}-\d{6}")
+
+def _dump_date(stem):
+    match = _DUMP_DATE_RE.search(stem)
+    return match.group() if match else stem
+
+def _write_diagnostic_dump(stem, lines, html):
+    try:
+        os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+        base = os.path.join(DIAGNOSTICS_DIR, stem)
+        with open(base + ".log", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        if html is not None:
+            with open(base + ".html", "w", encoding="utf-8") as f:
+                f.write(html)
+        # Conservar sólo los volcados más recientes (de carga y de renderer, por fecha)
+        stems = sorted({os.path.splitext(name)[0] for name in os.listdir(DIAGNOSTICS_DIR)}, key=_dump_date)
+        for old in stems[:-MAX_DIAGNOSTIC_DUMPS]:
+            for ext in (".log", ".html"):
+                try:
+                    os.remove(os.path.join(DIAGNOSTICS_DIR, old + ext))
+                except FileNotFoundError:
+                    pass
+        logging.error(f"Diagnóstico guardado en: {base}.log")
+        return base
+    except OSError:
+        logging.exception("No se pudo guardar el diagnóstico")
+        return None
+
+class DiagnosticsBuffer:
+    """Registro acotado en memoria de una VideoWindow (consola JS, carga, eventos).
+
+    Sólo se escribe a disco si una carga falla (ver write_diagnostic_dump). Los
+    mensajes de consola repetidos se limitan: de cada mensaje se guardan las
+    primeras REPEAT_BURST apariciones por ventana de REPEAT_WINDOW segundos y
+    del resto sólo se cuenta cuántas hubo.
+    """
+    REPEAT_WINDOW = 10.0
+    REPEAT_BURST = 3
+    _LEVELS = {0: "info", 1: "warning", 2: "error"}
+
+    def __init__(self, capacity=500):
+        self.entries = deque(maxlen=capacity)
+        self._repeats = {}  # (origen, línea, mensaje) -> [inicio de ventana, apariciones]
+        self.suppressed = 0
+
+    def add(self, kind, text):
+        self.entries.append((time.time(), kind, text))
+
+    def console(self, level, message, line, source):
+        """Anota un mensaje de consola; devuelve False si se descartó por repetido"""
+        now = time.monotonic()
+        key = (source, line, message)
+        state = self._repeats.get(key)
+        if state is None or now - state[0] > self.REPEAT_WINDOW:
+            if state is not None:
+                self._note_suppressed(key, state)
+            elif len(self._repeats) >= 1000:
+                self._repeats.clear()
+            state = self._repeats[key] = [now, 0]
+        state[1] += 1
+        if state[1] > self.REPEAT_BURST:
+            self.suppressed += 1
+            return False
+        self.add("console", f"[{self._LEVELS.get(int(level), level)}] {source}:{line} {message}")
+        return True
+
+    def _note_suppressed(self, key, state):
+        hidden = state[1] - self.REPEAT_BURST
+        if hidden > 0:
+            self.add("console", f"(+{hidden} repeticiones de: {key[2][:200]})")
+
+    def lines(self):
+        for key, state in self._repeats.items():
+            self._note_suppressed(key, state)
+            state[1] = min(state[1], self.REPEAT_BURST)
+        return [
+            f"{datetime.fromtimestamp(stamp):%H:%M:%S.%f}"[:-3] + f" {kind:<8} {text}"
+            for stamp, kind, text in self.entries
+        ]
+
+class StallDetector(QObject):
+    """Detecta bloqueos del event loop de la interfaz.
+
+    Un QTimer "latido" en el hilo de la interfaz anota cuándo corrió por última
+    vez; un hilo vigilante comprueba el latido y, si lleva más de threshold_ms
+    sin llegar, captura la pila Python del hilo de la interfaz en ese momento.
+    Cuando el latido vuelve se registra el bloqueo (duración y pila).
+    """
+    stallDetected = pyqtSignal(float, str)
+
+    def __init__(self, threshold_ms=250, interval_ms=100, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.recent = deque(maxlen=20)  # (hora, ms, pila) de los últimos bloqueos
+        self._gui_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._beat_id = 0
+        self._captured = None  # (beat_id, pila) capturada por el vigilante
+        self._running = False
+        self._timer = QTimer(self)
+        self._timer.setTimerType(Qt.PreciseTimer)
+        self._timer.setInterval(interval_ms)
+        self._timer.timeout.connect(self._beat)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._last_beat = time.monotonic()
+        self._timer.start()
+        threading.Thread(target=self._watch, name="stall-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self._timer.stop()
+
+    def _beat(self):
+        now = time.monotonic()
+        lag = now - self._last_beat - self.interval
+        captured = self._captured
+        self._last_beat = now
+        self._beat_id += 1
+        if lag > self.threshold:
+            stack = captured[1] if captured and captured[0] == self._beat_id - 1 else "(pila no capturada)"
+            self._record(lag * 1000, stack)
+
+    def _record(self, lag_ms, stack):
+        perf_metrics.record("bloqueo del event loop", lag_ms)
+        self.recent.append((datetime.now().strftime("%H:%M:%S"), lag_ms, stack))
+        perf_log.warning(f"Event loop bloqueado {lag_ms:.0f} ms. Pila al detectarlo:\n{stack}")
+        self.stallDetected.emit(lag_ms, stack)
+
+    def _watch(self):
+        while self._running:
+            time.sleep(self.interval / 2)
+            beat_id = self._beat_id
+            if time.monotonic() - self._last_beat <= self.threshold + self.interval:
+                continue
+            if self._captured and self._captured[0] == beat_id:
+                continue
+            frame = sys._current_frames().get(self._gui_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "(sin pila Python)"
+            self._captured = (beat_id, stack)
+
+class ProfilerToggle:
+    """Captura con cProfile del hilo de la interfaz, activable en caliente.
+
+    Al parar guarda el .prof en CACHE_DIR/profiles y escribe en el log de
+    rendimiento las funciones más costosas.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.path.join(CACHE_DIR, "profiles")
+        self._profiler = None
+        self.last_path = None
+
+    @property
+    def active(self):
+        return self._profiler is not None
+
+    def start(self):
+        if self.active:
+            return
+        self._profiler = cProfile.Profile()
+        self._profiler.enable()
+        perf_log.info("Perfilado con cProfile iniciado")
+
+    def stop(self):
+        if not self.active:
+            return None
+        profiler, self._profiler = self._profiler, None
+        profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        self.last_path = os.path.join(self.directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        profiler.dump_stats(self.last_path)
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(25)
+        perf_log.info(f"Perfil guardado en {self.last_path}\n{summary.getvalue()}")
+        return self.last_path
+
+    def toggle(self):
+        if self.active:
+            return self.stop()
+        self.start()
+        return None
+
+profiler_toggle = ProfilerToggle()
+
+# Detector de bloqueos de la aplicación; se crea al arrancar (ver __main__)
+stall_detector = None
+
+# Perfiles de ejecución de Chromium (QTWEBENGINE_CHROMIUM_FLAGS y sandbox). Los flags
+# sólo se leen al iniciar QtWebEngine, así que un cambio de perfil se aplica al reiniciar.
+RUNTIME_PROFILES = OrderedDict([
+    ("compat", {
+        "label": "Compatibilidad (sin GPU)",
+        "gpu": False,
+        "sandbox": False,
+        "flags": ["--disable-gpu"],
+    }),
+    ("low-memory", {
+        "label": "Poca memoria",
+        "gpu": False,
+        "sandbox": True,
+        # Un solo renderer, heap de JS pequeño y un hilo de rasterizado
+        "flags": ["--disable-gpu", "--renderer-process-limit=1",
+                  "--js-flags=--max-old-space-size=128", "--num-raster-threads=1"],
+    }),
+    ("gpu", {
+        # Lo que decida Chromium: usa la GPU salvo que el driver esté en su lista negra
+        "label": "GPU (ajustes de Chromium)",
+        "gpu": True,
+        "sandbox": True,
+        "flags": [],
+    }),
+    ("throughput", {
+        # Sólo a mano: fuerza el rasterizado por GPU aunque Chromium no lo active para el driver
+        "label": "Rendimiento (rasterizado por GPU forzado)",
+        "gpu": True,
+        "sandbox": True,
+        "flags": ["--enable-gpu-rasterization"],
+    }),
+])
+
+RUNTIME_PROFILE_CHOICES = [("auto", "Automático (GPU si está disponible)")] + [
+    (name, profile["label"]) for name, profile in RUNTIME_PROFILES.items()
+]
+
+class ChromiumRuntime:
+    """Elige y aplica el perfil de ejecución de Chromium antes de cargar QtWebEngine.
+
+    "auto" usa "gpu" (sin flags: Chromium respeta su lista de drivers
+    problemáticos) si hay OpenGL y "compat" si no. Antes de arrancar
+    con GPU se deja una marca en disco que se borra en cuanto un reproductor
+    responde (o al salir con normalidad); si al arrancar sigue ahí, el
+    arranque anterior con GPU se colgó o cayó y se vuelve a "compat" durante
+    GPU_RETRY_AFTER segundos.
+    """
+    GPU_RETRY_AFTER = 7 * 86400
+
+    def __init__(self, marker_path):
+        self.marker_path = marker_path
+        self.requested = None
+        self.active = None
+        self.fallback_reason = None
+
+    def select(self, requested):
+        """Resuelve requested ("auto" o un nombre de RUNTIME_PROFILES), lo aplica y devuelve el activo"""
+        self.requested = requested if requested == "auto" or requested in RUNTIME_PROFILES else "auto"
+        name = "gpu" if self.requested == "auto" else self.requested
+        if RUNTIME_PROFILES[name]["gpu"]:
+            self.fallback_reason = self._gpu_problem()
+            if self.fallback_reason:
+                name = "compat"
+            else:
+                self._write_marker("pending")
+        self.apply(name)
+        return name
+
+    def apply(self, name):
+        profile = RUNTIME_PROFILES[name]
+        self.active = name
+        if webengine_loaded():
+            logging.warning(f"QtWebEngine ya está cargado; el perfil {name} se aplicará al reiniciar")
+        if "QTWEBENGINE_CHROMIUM_FLAGS" in os.environ:
+            logging.info("QTWEBENGINE_CHROMIUM_FLAGS viene del entorno y sustituye a los flags del perfil")
+        else:
+            os.environ["QTWEBENGINE_CHROMIUM_FLAGS"] = " ".join(profile["flags"])
+        # Chromium no arranca con sandbox si se ejecuta como root
+        if not profile["sandbox"] or getattr(os, "geteuid", lambda: -1)() == 0:
+            os.environ.setdefault("QTWEBENGINE_DISABLE_SANDBOX", "1")
+        fallback = f" (en lugar de GPU: {self.fallback_reason})" if self.fallback_reason else ""
+        logging.info(f"Perfil de Chromium: {name}{fallback} · flags: {os.environ['QTWEBENGINE_CHROMIUM_FLAGS'] or '-'}"
+                     f" · sandbox: {'no' if os.environ.get('QTWEBENGINE_DISABLE_SANDBOX') == '1' else 'sí'}")
+
+    def confirm(self):
+        """La GPU funcionó en este arranque: quitar la marca"""
+        if self.active and RUNTIME_PROFILES[self.active]["gpu"] and (self._read_marker() or {}).get("state") == "pending":
+            self.reset()
+
+    def reset(self):
+        """Olvida fallos anteriores de GPU (p. ej. al elegir el perfil a mano)"""
+        try:
+            os.remove(self.marker_path)
+        except OSError:
+            pass
+
+    def _gpu_problem(self):
+        platform = QGuiApplication.platformName()
+        if platform in ("offscreen", "minimal", "vnc"):
+            return f"plataforma {platform} sin GPU"
+        marker = self._read_marker()
+        if marker and marker.get("state") == "pending":
+            self._write_marker("failed")
+            return "el último arranque con GPU no llegó a mostrar un reproductor"
+        if marker and marker.get("state") == "failed" and time.time() - marker.get("time", 0) < self.GPU_RETRY_AFTER:
+            return "la GPU falló en un arranque reciente"
+        if not QOpenGLContext().create():
+            return "no se pudo crear un contexto OpenGL"
+        return None
+
+    def _read_marker(self):
+        try:
+            with open(self.marker_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_marker(self, state):
+        try:
+            os.makedirs(os.path.dirname(self.marker_path), exist_ok=True)
+            with open(self.marker_path, "w", encoding="utf-8") as f:
+                json.dump({"state": state, "time": time.time()}, f)
+        except OSError:
+            logging.debug("No se pudo escribir la marca de prueba de GPU")
+
+chromium_runtime = ChromiumRuntime(os.path.join(CACHE_DIR, "gpu_probe.json"))
+
+# Se rellenan en load_webengine(): cliente JS de QWebChannel incluido en Qt
+QWebEngineScript = QWebChannel = None
+PlayerSchemeHandler = None
+QWEBCHANNEL_JS = ""
+
+def _read_qwebchannel_js():
+    source = QFile(":/qtwebchannel/qwebchannel.js")
+    if not source.open(QIODevice.ReadOnly):
+        logging.warning("qwebchannel.js no disponible; la telemetría de reproducción queda desactivada")
+        return ""
+    try:
+        return bytes(source.readAll()).decode("utf-8")
+    finally:
+        source.close()
+
+def webengine_loaded():
+    return QWebEngineView is not None
+
+def load_webengine():
+    """Importa QtWebEngine y define las clases que dependen de él (sólo la primera vez).
+
+    Requiere que Qt.AA_ShareOpenGLContexts se haya activado antes de crear la QApplication.
+    """
+    global QWebEngineView, QWebEngineSettings, QWebEngineProfile, QWebEnginePage
+    global QWebEngineScript, QWebChannel, QWEBCHANNEL_JS
+    global DiagnosticWebPage, LIFECYCLE_SUPPORTED
+    global PLAYER_SCHEME_SUPPORTED, PlayerSchemeHandler
+    if webengine_loaded():
+        return
+    from PyQt5 import QtWebEngineCore
+    # El esquema se registra antes de crear cualquier perfil o página
+    PLAYER_SCHEME_SUPPORTED = _register_player_scheme(QtWebEngineCore)
+    PlayerSchemeHandler = _define_player_scheme(QtWebEngineCore)
+    from PyQt5 import QtWebEngineWidgets
+    from PyQt5.QtWebChannel import QWebChannel
+    QWebEngineScript = QtWebEngineWidgets.QWebEngineScript
+    QWEBCHANNEL_JS = _read_qwebchannel_js()
+    QWebEngineSettings = QtWebEngineWidgets.QWebEngineSettings
+    QWebEngineProfile = QtWebEngineWidgets.QWebEngineProfile
+    QWebEnginePage = QtWebEngineWidgets.QWebEnginePage
+    LIFECYCLE_SUPPORTED = hasattr(QWebEnginePage, "LifecycleState")
+    DiagnosticWebPage = _define_diagnostic_page()
+    profile_manager.page_class = DiagnosticWebPage
+    if PLAYER_SCHEME_SUPPORTED:
+        profile_manager.install_scheme(PLAYER_SCHEME, PlayerSchemeHandler)
+    QWebEngineView = QtWebEngineWidgets.QWebEngineView
+    startup_trace.mark("QtWebEngine importado")
+
+# Se rellenan en load_multimedia(): QtMultimedia sólo se importa si se abre un archivo directo
+QMediaPlayer = QMediaContent = QVideoWidget = None
+
+def load_multimedia():
+    """Importa QtMultimedia para NativeVideoWindow (sólo la primera vez)"""
+    global QMediaPlayer, QMediaContent, QVideoWidget
+    if QMediaPlayer is not None:
+        return
+    from PyQt5 import QtMultimedia, QtMultimediaWidgets
+    QMediaContent = QtMultimedia.QMediaContent
+    QVideoWidget = QtMultimediaWidgets.QVideoWidget
+    QMediaPlayer = QtMultimedia.QMediaPlayer
+    startup_trace.mark("QtMultimedia importado")
+
+# Calidades de YouTube por altura de imagen, de menor a mayor
+QUALITY_LEVELS = [
+    (144, "tiny"), (240, "small"), (360, "medium"), (480, "large"),
+    (720, "hd720"), (1080, "hd1080"), (1440, "hd1440"), (2160, "hd2160"),
+]
+
+# Opciones del límite de calidad en la configuración: (clave, texto).
+# El reproductor de YouTube ignora vq= y setPlaybackQuality/setPlaybackQualityRange
+# y elige la calidad según el tamaño del reproductor; el límite se hace cumplir
+# con ese tamaño (ver floaterSetQuality en PLAYER_API_JS)
+MAX_QUALITY_CHOICES = [
+    ("auto", "Automática (según tamaño de ventana)"),
+    ("hd1080", "Hasta 1080p"),
+    ("hd720", "Hasta 720p"),
+    ("large", "Hasta 480p"),
+    ("medium", "Hasta 360p"),
+    ("small", "Hasta 240p"),
+    ("none", "Sin límite (decide YouTube)"),
+]
+
+def quality_for_size(pixel_height, max_quality="auto"):
+    """Calidad más baja que cubre pixel_height píxeles físicos, sin pasar de max_quality.
+
+    Devuelve None si no hay que limitar nada (max_quality == "none").
+    """
+    if max_quality == "none":
+        return None
+    target = QUALITY_LEVELS[-1][1]
+    for height, quality in QUALITY_LEVELS:
+        if height >= pixel_height:
+            target = quality
+            break
+    names = [quality for _, quality in QUALITY_LEVELS]
+    if max_quality in names and names.index(target) > names.index(max_quality):
+        target = max_quality
+    return target
+
+def cap_quality(max_quality, limit):
+    """max_quality sin pasar de limit ("auto" y "none" pasan a ser limit)"""
+    names = [quality for _, quality in QUALITY_LEVELS]
+    if max_quality not in names or names.index(max_quality) > names.index(limit):
+        return limit
+    return max_quality
+
+# Script de la IFrame API (los benchmarks lo sustituyen por uno local)
+IFRAME_API_URL = os.environ.get("YOUTUBE_FLOATER_IFRAME_API", "https://www.youtube.com/iframe_api")
+
+embed_host_stats = EmbedHostStats(legacy_path=os.path.join(CACHE_DIR, "embed_hosts.json"))
+
+# Prefijo de los mensajes de consola que usa la página del reproductor para hablar con Python
+PLAYER_EVENT_PREFIX = "__floater__"
+
+# Script de la página contenedora: engancha la IFrame API de YouTube al iframe existente
+# y expone floaterLoad() para cambiar de video sin recargar la página.
+PLAYER_API_JS = """
+var player = null;
+var playerReady = false;
+// Telemetría: los eventos se acumulan y se envían a Python en lotes por QWebChannel
+var floaterTelemetry = {queue: [], bridge: null};
+function floaterTrack(type, data) {
+  floaterTelemetry.queue.push([type, Math.round(performance.now()), data || {}]);
+}
+function floaterFlush() {
+  var t = floaterTelemetry;
+  if (t.bridge && t.queue.length) {
+    t.bridge.report(JSON.stringify(t.queue));
+    t.queue = [];
+  }
+}
+function floaterSample() {
+  if (!playerReady || player.getPlayerState() !== YT.PlayerState.PLAYING) { return; }
+  var sample = {quality: player.getPlaybackQuality(), loaded: player.getVideoLoadedFraction(),
+                position: player.getCurrentTime()};
+  try {
+    // Sólo accesible si el reproductor es del mismo origen (p. ej. el servidor de los benchmarks)
+    var quality = document.getElementById('player').contentDocument.querySelector('video').getVideoPlaybackQuality();
+    sample.dropped = quality.droppedVideoFrames;
+    sample.frames = quality.totalVideoFrames;
+  } catch (e) {}
+  floaterTrack('sample', sample);
+}
+function floaterEmit(type, data) {
+  console.info('%s' + JSON.stringify({type: type, data: data || {}}));
+  floaterTrack(type, data);
+}
+function onYouTubeIframeAPIReady() {
+  player = new YT.Player('player', {
+    events: {
+      onReady: function () { playerReady = true; floaterEmit('ready'); },
+      onStateChange: function (e) {
+        var data = {state: e.data};
+        // Sin posición mientras no ha empezado (valdría 0 aunque se pidiera otro inicio)
+        if (e.data > 0 && e.data !== YT.PlayerState.CUED) { data.position = player.getCurrentTime(); }
+        floaterEmit('state', data);
+      },
+      onPlaybackQualityChange: function (e) {
+        floaterTrack('quality', {quality: e.data});
+        floaterCheckQuality(e.data);
+      },
+      onError: function (e) { floaterEmit('error', {code: e.data}); }
+    }
+  });
+}
+if (window.qt && window.QWebChannel) {
+  new QWebChannel(qt.webChannelTransport, function (channel) {
+    floaterTelemetry.bridge = channel.objects.telemetry || null;
+  });
+  setInterval(floaterFlush, 2000);
+  setInterval(floaterSample, 5000);
+  window.addEventListener('pagehide', floaterFlush);
+}
+floaterTrack('load');
+function floaterPosition() {
+  return playerReady ? player.getCurrentTime() : null;
+}
+function floaterPause() {
+  if (!playerReady || player.getPlayerState() !== YT.PlayerState.PLAYING) { return false; }
+  player.pauseVideo();
+  return true;
+}
+function floaterPlay() {
+  if (playerReady) { player.playVideo(); }
+}
+// Límite de calidad. YouTube no hace caso de setPlaybackQualityRange pero sí
+// del tamaño del reproductor: si pasa del límite, el iframe se maqueta a la
+// altura del límite, se escala con CSS hasta llenar la ventana y el video se
+// vuelve a cargar en la misma posición para que elija otra vez (una vez por
+// video y límite, por si ni así baja). Si luego el límite sube o se quita, se
+// recarga igual para que pueda subir de calidad
+var floaterLevels = %s;
+var floaterCap = {quality: null, videoId: null, shrunk: false, reloaded: null, scale: 1};
+function floaterRank(quality) {
+  for (var i = 0; i < floaterLevels.length; i++) {
+    if (floaterLevels[i][1] === quality) { return i; }
+  }
+  return -1;
+}
+function floaterFitFrame() {
+  var frame = document.getElementById('player');
+  var rank = floaterRank(floaterCap.quality);
+  var scale = 1;
+  if (floaterCap.shrunk && rank >= 0) {
+    var height = floaterLevels[rank][0] / (window.devicePixelRatio || 1);
+    scale = Math.min(1, height / Math.max(1, window.innerHeight));
+  }
+  frame.style.width = frame.style.height = scale < 1 ? (100 * scale) + '%%' : '';
+  frame.style.transformOrigin = scale < 1 ? '0 0' : '';
+  frame.style.transform = scale < 1 ? 'scale(' + (1 / scale) + ')' : '';
+  var grown = scale > floaterCap.scale;
+  floaterCap.scale = scale;
+  return grown;
+}
+function floaterReload() {
+  var args = {videoId: floaterCap.videoId, startSeconds: player.getCurrentTime()};
+  var state = player.getPlayerState();
+  if (state === YT.PlayerState.PLAYING || state === YT.PlayerState.BUFFERING) {
+    player.loadVideoById(args);
+  } else {
+    player.cueVideoById(args);
+  }
+}
+function floaterCheckQuality(quality) {
+  var cap = floaterRank(floaterCap.quality);
+  if (!playerReady || cap < 0 || floaterRank(quality) <= cap || !floaterCap.videoId) { return; }
+  var key = floaterCap.videoId + '/' + floaterCap.quality;
+  if (floaterCap.reloaded === key) { return; }
+  floaterCap.reloaded = key;
+  floaterCap.shrunk = true;
+  floaterFitFrame();
+  floaterEmit('quality_capped', {quality: quality, cap: floaterCap.quality});
+  floaterReload();
+}
+function floaterSetQuality(quality, videoId) {
+  if (!playerReady) { return false; }
+  floaterCap.quality = quality;
+  floaterCap.videoId = videoId;
+  if (floaterFitFrame() && videoId) { floaterReload(); }
+  if (quality) {
+    if (player.setPlaybackQualityRange) { player.setPlaybackQualityRange(floaterLevels[0][1], quality); }
+    player.setPlaybackQuality(quality);
+    floaterCheckQuality(player.getPlaybackQuality());
+  }
+  return true;
+}
+window.addEventListener('resize', floaterFitFrame);
+function floaterVideoInfo() {
+  if (!playerReady) { return null; }
+  var data = player.getVideoData ? player.getVideoData() : {};
+  return {duration: player.getDuration(), title: data.title || '', channel: data.author || ''};
+}
+function floaterLoad(videoId, start, autoplay) {
+  if (!playerReady) { return false; }
+  var args = {videoId: videoId, startSeconds: start || 0};
+  floaterTrack('load');
+  if (autoplay) { player.loadVideoById(args); } else { player.cueVideoById(args); }
+  return true;
+}
+""" % (PLAYER_EVENT_PREFIX, json.dumps(QUALITY_LEVELS))
+
+# Página contenedora servida por el esquema propio floater:// (PlayerSchemeHandler).
+# Es un documento fijo: el embed a cargar llega en la query (?src=...), así que
+# abrir un video no genera HTML nuevo. Cambiar la versión al tocar la página o
+# sus recursos para que ninguna página abierta mezcle versiones.
+PLAYER_SCHEME = b"floater"
+PLAYER_PAGE_VERSION = "2"
+
+PLAYER_CSS = """
+html, body { height: 100%; margin: 0; padding: 0; background: #000; }
+.player-wrapper { width: 100%; height: 100%; overflow: hidden; position: relative; }
+.player-wrapper iframe { width: 100%; height: 100%; border: 0; display: block; background: #000; }
+"""
+
+PLAYER_BOOT_JS = """
+(function () {
+  var frame = document.getElementById('player');
+  frame.onload = function () { floaterEmit('frame'); };
+  frame.src = new URLSearchParams(location.search).get('src');
+})();
+"""
+
+PLAYER_PAGE_HTML = f"""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<link rel="stylesheet" href="player.css">
+</head>
+<body>
+<div class="player-wrapper">
+<iframe id="player" allow="autoplay; encrypted-media; fullscreen; picture-in-picture" allowfullscreen></iframe>
+</div>
+<script src="player.js"></script>
+<script src="{IFRAME_API_URL}" async></script>
+</body>
+</html>
+"""
+
+# Mosaico: varias fichas (iframes) en una sola página; MosaicWindow la carga
+# con una ?src= por video. Las fichas se reordenan con la propiedad CSS order:
+# mover un iframe en el DOM lo recargaría. El límite de calidad de cada ficha
+# se hace cumplir como en PLAYER_API_JS, con el tamaño de su iframe.
+MOSAIC_CSS = """
+html, body { height: 100%; margin: 0; padding: 0; background: #000; overflow: hidden; font-family: 'Segoe UI', Arial, sans-serif; }
+#grid { display: grid; width: 100%; height: 100%; gap: 2px; background: #121629; }
+#grid.dragging iframe { pointer-events: none; }
+.tile { position: relative; background: #000; outline: 2px solid transparent; outline-offset: -2px; }
+.tile.focused { outline-color: #eebbc3; }
+.tile.dragover { outline-color: #b8c1ec; }
+.tile iframe { width: 100%; height: 100%; border: 0; display: block; }
+.tile .bar {
+  position: absolute; top: 0; left: 0; right: 0; height: 26px; padding: 0 6px;
+  display: flex; gap: 6px; align-items: center;
+  background: rgba(35, 41, 70, 0.85); color: #fffffe; font-size: 12px;
+  opacity: 0; transition: opacity 0.15s; cursor: grab;
+}
+.tile:hover .bar, .tile.dragover .bar { opacity: 1; }
+.bar .label { flex: 1; overflow: hidden; white-space: nowrap; text-overflow: ellipsis; }
+.bar button { background: none; border: 0; color: inherit; cursor: pointer; font-size: 14px; }
+"""
+
+MOSAIC_JS = """
+var floaterTiles = [];
+var floaterFocused = null;
+var floaterQuality = {focused: 'large', others: 'small'};
+function floaterEmit(type, data) {
+  console.info('%s' + JSON.stringify({type: type, data: data || {}}));
+}
+var floaterLevels = %s;
+function floaterSources() {
+  return window.FLOATER_SOURCES || new URLSearchParams(location.search).getAll('src');
+}
+function floaterBuild() {
+  var grid = document.getElementById('grid');
+  floaterSources().forEach(function (src, i) {
+    var path = (src.split('/embed/')[1] || '').split('?')[0];
+    // Las listas (videoseries) no se pueden recargar por id: sólo se les pide el límite
+    var tile = {id: i, order: i, ready: false, muted: true, player: null, resume: false,
+                videoId: path === 'videoseries' ? null : path, cap: null, shrunk: false, reloaded: null, scale: 1};
+    tile.box = document.createElement('div');
+    tile.box.className = 'tile';
+    tile.frame = document.createElement('iframe');
+    tile.frame.allow = 'autoplay; encrypted-media; fullscreen; picture-in-picture';
+    tile.frame.setAttribute('allowfullscreen', '');
+    tile.frame.src = src;
+    tile.bar = document.createElement('div');
+    tile.bar.className = 'bar';
+    tile.bar.draggable = true;
+    tile.bar.title = 'Clic: enfocar (sonido y calidad completa) · Arrastrar: mover';
+    var handle = document.createElement('span');
+    handle.textContent = '\\u283f';
+    var label = document.createElement('span');
+    label.className = 'label';
+    label.textContent = (i + 1) + ' \\u00b7 ' + path;
+    tile.mute = document.createElement('button');
+    tile.mute.title = 'Silenciar / activar sonido';
+    tile.bar.appendChild(handle);
+    tile.bar.appendChild(label);
+    tile.bar.appendChild(tile.mute);
+    tile.bar.addEventListener('click', function (e) {
+      if (e.target === tile.mute) { floaterToggleMute(tile.id); } else { floaterFocus(tile.id, true); }
+    });
+    tile.bar.addEventListener('dragstart', function (e) {
+      e.dataTransfer.setData('text/plain', String(tile.id));
+      grid.classList.add('dragging');
+    });
+    tile.bar.addEventListener('dragend', function () { grid.classList.remove('dragging'); });
+    tile.box.addEventListener('dragover', function (e) { e.preventDefault(); tile.box.classList.add('dragover'); });
+    tile.box.addEventListener('dragleave', function () { tile.box.classList.remove('dragover'); });
+    tile.box.addEventListener('drop', function (e) {
+      e.preventDefault();
+      tile.box.classList.remove('dragover');
+      var from = parseInt(e.dataTransfer.getData('text/plain'), 10);
+      if (!isNaN(from) && from !== tile.id) { floaterMove(from, tile.id); }
+    });
+    tile.box.appendChild(tile.frame);
+    tile.box.appendChild(tile.bar);
+    grid.appendChild(tile.box);
+    floaterTiles.push(tile);
+  });
+  floaterLayout();
+}
+function floaterLayout() {
+  var grid = document.getElementById('grid');
+  var columns = Math.ceil(Math.sqrt(floaterTiles.length)) || 1;
+  var rows = Math.ceil(floaterTiles.length / columns) || 1;
+  grid.style.gridTemplateColumns = 'repeat(' + columns + ', 1fr)';
+  grid.style.gridTemplateRows = 'repeat(' + rows + ', 1fr)';
+  floaterTiles.forEach(function (tile) { tile.box.style.order = tile.order; });
+}
+function onYouTubeIframeAPIReady() {
+  floaterTiles.forEach(function (tile) {
+    tile.player = new YT.Player(tile.frame, {
+      events: {
+        onReady: function () { tile.ready = true; floaterApply(tile); floaterEmit('ready', {tile: tile.id}); },
+        onStateChange: function (e) { floaterEmit('state', {tile: tile.id, state: e.data}); },
+        onPlaybackQualityChange: function (e) { floaterCheckTile(tile, e.data); },
+        onError: function (e) { floaterEmit('error', {tile: tile.id, code: e.data}); }
+      }
+    });
+  });
+}
+function floaterApply(tile) {
+  var focused = tile.id === floaterFocused;
+  tile.box.classList.toggle('focused', focused);
+  tile.mute.textContent = tile.muted ? '\\ud83d\\udd07' : '\\ud83d\\udd0a';
+  if (!tile.ready) { return; }
+  if (tile.muted) { tile.player.mute(); } else { tile.player.unMute(); }
+  floaterCapTile(tile, focused ? floaterQuality.focused : floaterQuality.others);
+}
+function floaterRank(quality) {
+  for (var i = 0; i < floaterLevels.length; i++) {
+    if (floaterLevels[i][1] === quality) { return i; }
+  }
+  return -1;
+}
+function floaterFitTile(tile) {
+  var rank = floaterRank(tile.cap);
+  var scale = 1;
+  if (tile.shrunk && rank >= 0) {
+    var height = floaterLevels[rank][0] / (window.devicePixelRatio || 1);
+    scale = Math.min(1, height / Math.max(1, tile.box.clientHeight));
+  }
+  tile.frame.style.width = tile.frame.style.height = scale < 1 ? (100 * scale) + '%%' : '';
+  tile.frame.style.transformOrigin = scale < 1 ? '0 0' : '';
+  tile.frame.style.transform = scale < 1 ? 'scale(' + (1 / scale) + ')' : '';
+  var grown = scale > tile.scale;
+  tile.scale = scale;
+  return grown;
+}
+function floaterReloadTile(tile) {
+  var args = {videoId: tile.videoId, startSeconds: tile.player.getCurrentTime()};
+  var state = tile.player.getPlayerState();
+  if (state === YT.PlayerState.PLAYING || state === YT.PlayerState.BUFFERING) {
+    tile.player.loadVideoById(args);
+  } else {
+    tile.player.cueVideoById(args);
+  }
+}
+function floaterCheckTile(tile, quality) {
+  var cap = floaterRank(tile.cap);
+  if (!tile.ready || cap < 0 || floaterRank(quality) <= cap || !tile.videoId) { return; }
+  var key = tile.videoId + '/' + tile.cap;
+  if (tile.reloaded === key) { return; }
+  tile.reloaded = key;
+  tile.shrunk = true;
+  floaterFitTile(tile);
+  floaterEmit('quality_capped', {tile: tile.id, quality: quality, cap: tile.cap});
+  floaterReloadTile(tile);
+}
+function floaterCapTile(tile, quality) {
+  tile.cap = quality;
+  if (floaterFitTile(tile) && tile.videoId) { floaterReloadTile(tile); }
+  if (floaterRank(quality) < 0) { return; }
+  if (tile.player.setPlaybackQualityRange) { tile.player.setPlaybackQualityRange(floaterLevels[0][1], quality); }
+  tile.player.setPlaybackQuality(quality);
+  floaterCheckTile(tile, tile.player.getPlaybackQuality());
+}
+function floaterFocus(id, fromUser) {
+  if (!floaterTiles[id]) { return false; }
+  floaterFocused = id;
+  floaterTiles.forEach(function (tile) { tile.muted = tile.id !== id; floaterApply(tile); });
+  if (fromUser) { floaterEmit('focus', {tile: id}); }
+  return true;
+}
+function floaterToggleMute(id) {
+  var tile = floaterTiles[id];
+  tile.muted = !tile.muted;
+  floaterApply(tile);
+  floaterEmit('mute', {tile: id, muted: tile.muted});
+}
+function floaterSetQuality(focused, others) {
+  floaterQuality = {focused: focused, others: others};
+  floaterTiles.forEach(floaterApply);
+}
+// Posición de cada ficha (null si aún no ha cargado), para la sesión y la recuperación
+function floaterPosition() {
+  return floaterTiles.map(function (tile) { return tile.ready ? tile.player.getCurrentTime() : null; });
+}
+function floaterPause() {
+  var paused = false;
+  floaterTiles.forEach(function (tile) {
+    tile.resume = tile.ready && tile.player.getPlayerState() === YT.PlayerState.PLAYING;
+    if (tile.resume) { tile.player.pauseVideo(); paused = true; }
+  });
+  return paused;
+}
+function floaterPlay() {
+  floaterTiles.forEach(function (tile) {
+    if (tile.resume) { tile.player.playVideo(); }
+    tile.resume = false;
+  });
+}
+function floaterMove(fromId, toId) {
+  var from = floaterTiles[fromId].order, to = floaterTiles[toId].order;
+  floaterTiles.forEach(function (tile) {
+    if (tile.id === fromId) { tile.order = to; }
+    else if (from < to && tile.order > from && tile.order <= to) { tile.order -= 1; }
+    else if (from > to && tile.order >= to && tile.order < from) { tile.order += 1; }
+  });
+  floaterLayout();
+  var order = floaterTiles.slice().sort(function (a, b) { return a.order - b.order; });
+  floaterEmit('order', {order: order.map(function (tile) { return tile.id; })});
+}
+floaterBuild();
+floaterFocus(function () {
+  var focus = window.FLOATER_FOCUS !== undefined ? window.FLOATER_FOCUS
+    : parseInt(new URLSearchParams(location.search).get('focus'), 10);
+  return floaterTiles[focus] ? focus : 0;
+}());
+window.addEventListener('resize', function () { floaterTiles.forEach(floaterFitTile); });
+""" % (PLAYER_EVENT_PREFIX, json.dumps(QUALITY_LEVELS))
+
+MOSAIC_PAGE_HTML = f"""<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width,initial-scale=1">
+<link rel="stylesheet" href="mosaic.css">
+</head>
+<body>
+<div id="grid"></div>
+<script src="mosaic.js"></script>
+<script src="{IFRAME_API_URL}" async></script>
+</body>
+</html>
+"""
+
+# Recursos del esquema: nombre -> (tipo MIME, contenido); se codifican una sola vez
+PLAYER_ASSETS = {
+    "player.html": (b"text/html; charset=utf-8", PLAYER_PAGE_HTML.encode("utf-8")),
+    "player.css": (b"text/css; charset=utf-8", PLAYER_CSS.encode("utf-8")),
+    "player.js": (b"application/javascript; charset=utf-8", (PLAYER_API_JS + PLAYER_BOOT_JS).encode("utf-8")),
+    "mosaic.html": (b"text/html; charset=utf-8", MOSAIC_PAGE_HTML.encode("utf-8")),
+    "mosaic.css": (b"text/css; charset=utf-8", MOSAIC_CSS.encode("utf-8")),
+    "mosaic.js": (b"application/javascript; charset=utf-8", MOSAIC_JS.encode("utf-8")),
+}
+
+# Dominios que la página contenedora acepta en ?src=
+EMBED_NETLOCS = frozenset(urlsplit(host).netloc for host in EMBED_HOSTS + (EMBED_HOST,))
+
+# Se pone a True en load_webengine() si Qt permite registrar el esquema (5.12+)
+PLAYER_SCHEME_SUPPORTED = False
+
+def player_page_url(embed_url, video_id=None):
+    """URL floater:// de la página contenedora que carga embed_url"""
+    return QUrl(
+        f"{PLAYER_SCHEME.decode()}://player/v{PLAYER_PAGE_VERSION}/{video_id or 'videoseries'}"
+        f"?src={quote(embed_url, safe='')}"
+    )
+
+def mosaic_page_url(embed_urls, focused=0):
+    """URL floater:// del mosaico con una ficha por embed y focused como ficha enfocada"""
+    query = "&".join(f"src={quote(url, safe='')}" for url in embed_urls) + f"&focus={int(focused)}"
+    return QUrl(f"{PLAYER_SCHEME.decode()}://player/v{PLAYER_PAGE_VERSION}/mosaic?{query}")
 
-# Diagnostics: capture JS console and log
-class DiagnosticWebPage(QWebEnginePage):
-    def javaScriptConsoleMessage(self, level, msg, linenumber, sourceid):
-        logging.debug(f"JS console ({level}) {sourceid}:{linenumber} - {msg}")
+playback_telemetry = PlaybackTelemetry()
+
+class TelemetryBridge(QObject):
+    """Objeto que la página ve como channel.objects.telemetry (QWebChannel).
+
+    Recibe los lotes de eventos de la página en una sola llamada cada pocos
+    segundos. Hasta que una ventana lo adopta con attach() (p. ej. una página
+    oculta de LoadSupervisor) guarda los lotes para no perder el arranque.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._handler = None
+        self._backlog = []
+
+    @pyqtSlot(str)
+    def report(self, batch):
+        try:
+            events = json.loads(batch)
+        except ValueError:
+            logging.debug("Lote de telemetría inválido")
+            return
+        if not isinstance(events, list):
+            return
+        if self._handler is None:
+            self._backlog.extend(events)
+        else:
+            self._handler(events)
+
+    def attach(self, handler):
+        self._handler = handler
+        if self._backlog:
+            events, self._backlog = self._backlog, []
+            handler(events)
+
+def install_telemetry(page):
+    """Expone un TelemetryBridge a la página por QWebChannel (page.telemetry_bridge)"""
+    page.telemetry_bridge = TelemetryBridge(page)
+    if not QWEBCHANNEL_JS:
+        return
+    script = QWebEngineScript()
+    script.setName("qwebchannel")
+    script.setSourceCode(QWEBCHANNEL_JS)
+    # Antes que los scripts de la página contenedora, que crean el QWebChannel
+    script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+    script.setWorldId(QWebEngineScript.MainWorld)
+    script.setRunsOnSubFrames(False)
+    page.scripts().insert(script)
+    channel = QWebChannel(page)
+    channel.registerObject("telemetry", page.telemetry_bridge)
+    page.setWebChannel(channel)
+
+def _register_player_scheme(core):
+    if not hasattr(core, "QWebEngineUrlScheme"):
+        logging.info("Qt sin QWebEngineUrlScheme: la página del reproductor se carga con setHtml")
+        return False
+    if os.environ.get("YOUTUBE_FLOATER_WRAPPER") == "sethtml":
+        return False
+    scheme = core.QWebEngineUrlScheme(PLAYER_SCHEME)
+    scheme.setSyntax(core.QWebEngineUrlScheme.Syntax.Host)
+    # Contexto seguro (autoplay, EME) y con CORS, como una página https
+    scheme.setFlags(core.QWebEngineUrlScheme.SecureScheme | core.QWebEngineUrlScheme.CorsEnabled)
+    core.QWebEngineUrlScheme.registerScheme(scheme)
+    return True
+
+def _define_player_scheme(core):
+    class PlayerSchemeHandler(core.QWebEngineUrlSchemeHandler):
+        """Sirve floater://player/v<versión>/... desde memoria (PLAYER_ASSETS).
+
+        Cualquier ruta que no sea un recurso es la página contenedora ("mosaic"
+        es la del mosaico); sólo se sirven si todas las ?src= apuntan a un
+        dominio de embed conocido.
+        """
+
+        def requestStarted(self, job):
+            url = job.requestUrl()
+            parts = url.path().strip("/").split("/")
+            if url.host() != "player" or len(parts) != 2 or parts[0] != f"v{PLAYER_PAGE_VERSION}":
+                job.fail(core.QWebEngineUrlRequestJob.UrlNotFound)
+                return
+            asset = PLAYER_ASSETS.get(parts[1])
+            if asset is None or parts[1].endswith(".html"):
+                sources = parse_qs(url.query(QUrl.FullyEncoded)).get("src", [""])
+                for src in sources:
+                    if urlsplit(src).scheme not in ("http", "https") or urlsplit(src).netloc not in EMBED_NETLOCS:
+                        logging.warning(f"Página del reproductor con origen no permitido: {src!r}")
+                        job.fail(core.QWebEngineUrlRequestJob.RequestDenied)
+                        return
+                asset = PLAYER_ASSETS["mosaic.html" if parts[1] in ("mosaic", "mosaic.html") else "player.html"]
+            content_type, body = asset
+            # El job se queda con el buffer y lo libera al terminar
+            buffer = QBuffer(job)
+            buffer.setData(body)
+            buffer.open(QIODevice.ReadOnly)
+            job.reply(content_type, buffer)
+
+    return PlayerSchemeHandler
+
+def _define_diagnostic_page():
+    # Diagnostics: capture JS console and log
+    class DiagnosticWebPage(QWebEnginePage):
+        # Eventos de la IFrame API reenviados por la página (tipo, datos)
+        playerEvent = pyqtSignal(str, dict)
+        # DiagnosticsBuffer de la ventana dueña de la página
+        diagnostics = None
+
+        def javaScriptConsoleMessage(self, level, msg, linenumber, sourceid):
+            if msg.startswith(ProfileCacheManager.REPORT_PREFIX):
+                cache_manager.record_report(msg[len(ProfileCacheManager.REPORT_PREFIX):])
+                return
+            if msg.startswith(PLAYER_EVENT_PREFIX):
+                try:
+                    event = json.loads(msg[len(PLAYER_EVENT_PREFIX):])
+                    self.playerEvent.emit(event.get("type", ""), event.get("data") or {})
+                except ValueError:
+                    logging.debug(f"Evento de reproductor inválido: {msg}")
+                return
+            # La consola del reproductor es muy habladora: va al registro de la
+            # ventana (con límite de repeticiones) y no al log
+            if self.diagnostics is not None:
+                self.diagnostics.console(level, msg, linenumber, sourceid)
+
+    return DiagnosticWebPage
 
 class ConfigDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Configuración")
-        self.setFixedSize(550, 650)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        # Redimensionable: el contenido va en un área con scroll, así que cabe en pantallas pequeñas
+        self.setMinimumSize(560, 400)
+        available = QGuiApplication.primaryScreen().availableGeometry()
+        self.resize(min(720, available.width()), min(820, available.height() - 40))
         self.setStyleSheet("""
             QDialog {
                 background: #232946;
@@ -29,6 +1152,9 @@ class ConfigDialog(QDialog):
                 font-family: 'Segoe UI', 'Arial', sans-serif;
                 font-size: 15px;
             }
+            QScrollArea, QWidget#configContent {
+                background: #232946;
+            }
             QPushButton {
                 background: #eebbc3;
                 color: #232946;
@@ -93,9 +1219,20 @@ class ConfigDialog(QDialog):
             }
         """)
         
-        layout = QVBoxLayout()
+        # Los grupos van en un área con scroll; los botones quedan siempre visibles abajo
+        dialog_layout = QVBoxLayout()
+        dialog_layout.setContentsMargins(0, 0, 0, 25)
+        content = QWidget()
+        content.setObjectName("configContent")
+        layout = QVBoxLayout(content)
         layout.setSpacing(15)
-        layout.setContentsMargins(25, 25, 25, 25)
+        layout.setContentsMargins(25, 25, 25, 10)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.NoFrame)
+        scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        scroll.setWidget(content)
+        dialog_layout.addWidget(scroll)
 
         # Grupo para apariencia
         appearance_group = QGroupBox("Personalización Visual")
@@ -143,6 +1280,15 @@ class ConfigDialog(QDialog):
         size_form.addRow("Preset:", self.size_preset)
         size_form.addRow("Ancho (px):", self.width_spin)
         size_form.addRow("Alto (px):", self.height_spin)
+
+        self.quality_combo = QComboBox()
+        for key, label in MAX_QUALITY_CHOICES:
+            self.quality_combo.addItem(label, key)
+        index = self.quality_combo.findData(self.parent().max_quality)
+        self.quality_combo.setCurrentIndex(max(index, 0))
+        self.quality_combo.setToolTip("YouTube elige la calidad según el tamaño del reproductor: si se pasa\n"
+                                      "de este límite, el video se dibuja a menor tamaño y se amplía")
+        size_form.addRow("Calidad máxima:", self.quality_combo)
         size_layout.addLayout(size_form)
 
         apply_size_btn = QPushButton("Aplicar nuevo tamaño")
@@ -160,12 +1306,102 @@ class ConfigDialog(QDialog):
         
         self.save_history_check = QCheckBox("Guardar historial de videos")
         self.save_history_check.setChecked(self.parent().save_history)
+
+        self.reuse_window_check = QCheckBox("Reutilizar la ventana abierta (cambio instantáneo de video)")
+        self.reuse_window_check.setChecked(self.parent().reuse_window)
+
+        self.restore_session_check = QCheckBox("Restaurar las ventanas abiertas al volver a iniciar")
+        self.restore_session_check.setChecked(self.parent().restore_session)
+        self.restore_session_check.setToolTip("Vuelven como miniaturas; el reproductor se crea al hacer clic en ellas")
+
+        self.native_mmap_check = QCheckBox("Leer los archivos locales con mmap (reproductor nativo)")
+        self.native_mmap_check.setChecked(self.parent().native_mmap)
+        self.native_mmap_check.setToolTip("Los videos locales se leen mapeados en memoria en lugar de con lecturas normales")
         
+        pool_layout = QHBoxLayout()
+        pool_layout.addWidget(QLabel("Ventanas precargadas (0 = desactivado):"))
+        self.pool_spin = QSpinBox()
+        self.pool_spin.setRange(0, VideoWindowPool.MAX_SIZE)
+        self.pool_spin.setValue(self.parent().pool_size)
+        self.pool_spin.setToolTip("Mantiene reproductores listos en segundo plano para abrir videos al instante.\n"
+                                  "Usa 0 en equipos con poca memoria.")
+        pool_layout.addWidget(self.pool_spin)
+
         behavior_layout.addWidget(self.autoplay_check)
         behavior_layout.addWidget(self.save_history_check)
+        behavior_layout.addWidget(self.reuse_window_check)
+        behavior_layout.addWidget(self.restore_session_check)
+        behavior_layout.addWidget(self.native_mmap_check)
+
+        self.background_freeze_check = QCheckBox("Congelar reproductores minimizados o tapados")
+        self.background_freeze_check.setChecked(self.parent().background_freeze)
+        behavior_layout.addWidget(self.background_freeze_check)
+        behavior_layout.addLayout(pool_layout)
+
+        max_players_layout = QHBoxLayout()
+        max_players_layout.addWidget(QLabel("Máximo de reproductores abiertos (0 = sin límite):"))
+        self.max_players_spin = QSpinBox()
+        self.max_players_spin.setRange(0, 16)
+        self.max_players_spin.setValue(self.parent().max_players)
+        self.max_players_spin.setToolTip("Al superar el límite se cierra el reproductor usado hace más tiempo")
+        max_players_layout.addWidget(self.max_players_spin)
+        behavior_layout.addLayout(max_players_layout)
+
+        load_timeout_layout = QHBoxLayout()
+        load_timeout_layout.addWidget(QLabel("Tiempo máximo de carga del reproductor (s):"))
+        self.load_timeout_spin = QSpinBox()
+        self.load_timeout_spin.setRange(2, 60)
+        self.load_timeout_spin.setValue(self.parent().load_timeout)
+        self.load_timeout_spin.setToolTip("Si el reproductor no responde en este tiempo se reintenta la carga")
+        load_timeout_layout.addWidget(self.load_timeout_spin)
+        behavior_layout.addLayout(load_timeout_layout)
+
+        self.race_hosts_check = QCheckBox("Si la carga va lenta, probar youtube.com y youtube-nocookie.com a la vez")
+        self.race_hosts_check.setChecked(self.parent().race_hosts)
+        behavior_layout.addWidget(self.race_hosts_check)
         
         layout.addWidget(behavior_group)
 
+        # Grupo para la caché del navegador
+        cache_group = QGroupBox("Caché")
+        cache_layout = QVBoxLayout(cache_group)
+        self.cache_label = QLabel("Calculando tamaño de la caché...")
+        cache_layout.addWidget(self.cache_label)
+        cache_row = QHBoxLayout()
+        cache_row.addWidget(QLabel("Tamaño máximo (MB):"))
+        self.cache_quota_spin = QSpinBox()
+        self.cache_quota_spin.setRange(50, 10000)
+        self.cache_quota_spin.setSingleStep(50)
+        self.cache_quota_spin.setValue(self.parent().cache_quota_mb)
+        self.cache_quota_spin.setToolTip("Caché HTTP + almacenamiento de YouTube. Las cookies (sesión) no se borran.")
+        cache_row.addWidget(self.cache_quota_spin)
+        clear_cache_btn = QPushButton("🧹 Vaciar caché")
+        clear_cache_btn.setToolTip("La caché HTTP se vacía ya; el almacenamiento de YouTube, al reiniciar.\n"
+                                   "Las cookies (sesión) no se borran.")
+        clear_cache_btn.clicked.connect(self.clear_cache)
+        cache_row.addWidget(clear_cache_btn)
+        cache_layout.addLayout(cache_row)
+        layout.addWidget(cache_group)
+        cache_manager.statsChanged.connect(self.update_cache_label)
+        cache_manager.refresh_stats()
+
+        # Grupo para el perfil de Chromium (se aplica al reiniciar)
+        runtime_group = QGroupBox("Motor de video (Chromium)")
+        runtime_form = QFormLayout(runtime_group)
+        self.runtime_combo = QComboBox()
+        for key, label in RUNTIME_PROFILE_CHOICES:
+            self.runtime_combo.addItem(label, key)
+        self.runtime_combo.setCurrentIndex(max(self.runtime_combo.findData(self.parent().runtime_profile), 0))
+        self.runtime_combo.setToolTip("Compatibilidad: sin GPU. Poca memoria: un solo proceso de render.\n"
+                                      "GPU: la GPU con los ajustes de Chromium (respeta su lista de drivers problemáticos).\n"
+                                      "Rendimiento: fuerza el rasterizado por GPU. Se aplica al reiniciar la aplicación.")
+        runtime_form.addRow("Perfil:", self.runtime_combo)
+        active = RUNTIME_PROFILES[chromium_runtime.active]["label"] if chromium_runtime.active else "-"
+        if chromium_runtime.fallback_reason:
+            active += f" ({chromium_runtime.fallback_reason})"
+        runtime_form.addRow("En uso:", QLabel(active))
+        layout.addWidget(runtime_group)
+
         # Grupo para contacto
         contact_group = QGroupBox("Soporte y Contacto")
         contact_layout = QVBoxLayout(contact_group)
@@ -191,10 +1427,32 @@ class ConfigDialog(QDialog):
         close_btn = QPushButton("Cerrar")
         close_btn.clicked.connect(self.reject)
         button_layout.addWidget(close_btn)
-        
-        layout.addLayout(button_layout)
+        button_layout.setContentsMargins(25, 0, 25, 0)
 
-        self.setLayout(layout)
+        dialog_layout.addLayout(button_layout)
+
+        self.setLayout(dialog_layout)
+
+    def update_cache_label(self, stats):
+        used = (stats["http_bytes"] or 0) + (stats["storage_bytes"] or 0)
+        text = f"En uso: {used / 1e6:.0f} MB (HTTP {(stats['http_bytes'] or 0) / 1e6:.0f} MB) de {stats['quota_bytes'] / 1e6:.0f} MB"
+        if stats["hit_rate"] is not None:
+            text += f" · aciertos {stats['hit_rate']:.0%}"
+        if stats["storage_clear_pending"]:
+            text += "\nEl almacenamiento se vaciará al reiniciar la aplicación"
+        self.cache_label.setText(text)
+
+    def clear_cache(self):
+        cache_manager.clear()
+        self.cache_label.setText("Vaciando caché...")
+
+    def done(self, result):
+        # cache_manager es global: no dejarle conexiones a diálogos ya cerrados
+        try:
+            cache_manager.statsChanged.disconnect(self.update_cache_label)
+        except TypeError:
+            pass  # ya desconectado
+        super().done(result)
 
     def apply_preset(self, preset):
         presets = {
@@ -219,21 +1477,174 @@ class ConfigDialog(QDialog):
     def change_opacity(self, value):
         self.opacity_label.setText(f"{value}%")
         self.parent().setWindowOpacity(value / 100.0)
+        # Arrastrar el slider genera muchos cambios: SettingsService los agrupa en una escritura
+        self.parent().settings.setValue("window_opacity", value / 100.0)
 
     def apply_size(self):
         self.parent().video_width = self.width_spin.value()
         self.parent().video_height = self.height_spin.value()
+        self.parent().save_settings()
 
     def save_config(self):
         self.parent().video_width = self.width_spin.value()
         self.parent().video_height = self.height_spin.value()
+        self.parent().max_quality = self.quality_combo.currentData()
+        for window in self.parent().player_manager.windows():
+            if isinstance(window, (VideoWindow, MosaicWindow)):
+                window.set_max_quality(self.parent().max_quality)
         self.parent().autoplay = self.autoplay_check.isChecked()
         self.parent().save_history = self.save_history_check.isChecked()
+        self.parent().reuse_window = self.reuse_window_check.isChecked()
+        self.parent().restore_session = self.restore_session_check.isChecked()
+        self.parent().native_mmap = self.native_mmap_check.isChecked()
+        self.parent().background_freeze = self.background_freeze_check.isChecked()
+        self.parent().lifecycle_policy.set_enabled(self.parent().background_freeze)
+        self.parent().pool_size = self.pool_spin.value()
+        self.parent().window_pool.set_size(self.parent().pool_size)
+        self.parent().max_players = self.max_players_spin.value()
+        self.parent().player_manager.set_max_players(self.parent().max_players)
+        self.parent().load_timeout = self.load_timeout_spin.value()
+        self.parent().race_hosts = self.race_hosts_check.isChecked()
+        LoadSupervisor.configure(self.parent().load_timeout, self.parent().race_hosts)
+        self.parent().cache_quota_mb = self.cache_quota_spin.value()
+        cache_manager.set_quota(self.parent().cache_quota_mb)
+        message = "¡Configuración guardada exitosamente!"
+        runtime_profile = self.runtime_combo.currentData()
+        if runtime_profile != self.parent().runtime_profile:
+            self.parent().runtime_profile = runtime_profile
+            # Elegido a mano: volver a probar la GPU aunque haya fallado antes
+            chromium_runtime.reset()
+            message += "\n\nEl nuevo perfil de Chromium se aplicará al reiniciar la aplicación."
         self.parent().save_settings()
-        QMessageBox.information(self, "Configuración", "¡Configuración guardada exitosamente!")
+        QMessageBox.information(self, "Configuración", message)
+
+class MetricsDialog(QDialog):
+    """Panel de métricas de rendimiento (Ctrl+Shift+M en el lanzador)"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Métricas de rendimiento")
+        self.resize(620, 420)
+        self.setStyleSheet("""
+            QDialog { background: #232946; color: #fffffe; }
+            QPlainTextEdit {
+                background: #121629;
+                color: #fffffe;
+                border: 2px solid #b8c1ec;
+                border-radius: 8px;
+            }
+            QPushButton {
+                background: #eebbc3;
+                color: #232946;
+                border: none;
+                border-radius: 8px;
+                padding: 8px 16px;
+                font-weight: bold;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        self.text = QPlainTextEdit()
+        self.text.setReadOnly(True)
+        self.text.setFont(QFont("Consolas", 10))
+        layout.addWidget(self.text)
+
+        buttons = QHBoxLayout()
+        self.profile_btn = QPushButton()
+        self.profile_btn.clicked.connect(self.toggle_profile)
+        buttons.addWidget(self.profile_btn)
+        export_btn = QPushButton("📤 Exportar telemetría")
+        export_btn.clicked.connect(self.export_telemetry)
+        buttons.addWidget(export_btn)
+        close_btn = QPushButton("Cerrar")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(1000)
+        self._timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self._timer.stop()
+
+    def toggle_profile(self):
+        path = profiler_toggle.toggle()
+        if path:
+            QMessageBox.information(self, "Perfil", f"Perfil guardado en:\n{path}")
+        self.refresh()
+
+    def export_telemetry(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exportar telemetría", os.path.join(os.path.expanduser("~"), "floater-telemetry.json"),
+            "JSON (*.json);;Prometheus (*.prom)"
+        )
+        if path and playback_telemetry.export(path):
+            QMessageBox.information(self, "Telemetría", f"Telemetría guardada en:\n{path}")
+
+    def refresh(self):
+        lines = [f"{'Operación':<34}{'n':>6}{'media':>9}{'máx':>9}{'última':>9}  (ms)"]
+        for name, stats in sorted(perf_metrics.snapshot().items()):
+            average = stats["total_ms"] / stats["count"]
+            lines.append(f"{name:<34}{stats['count']:>6}{average:>9.1f}{stats['max_ms']:>9.1f}{stats['last_ms']:>9.1f}")
+        if stall_detector is not None:
+            lines.append("")
+            lines.append(f"Bloqueos recientes (más de {stall_detector.threshold * 1000:.0f} ms):")
+            for when, lag_ms, stack in reversed(stall_detector.recent):
+                # De la pila basta con las últimas llamadas
+                tail = stack.strip().splitlines()[-4:]
+                lines.append(f"  {when}  {lag_ms:.0f} ms")
+                lines.extend(f"      {line.strip()}" for line in tail)
+            if not stall_detector.recent:
+                lines.append("  ninguno")
+        cache = cache_manager.stats()
+        lines.append("")
+        lines.append(f"Caché: HTTP {(cache['http_bytes'] or 0) / 1e6:.1f} MB, almacenamiento "
+                     f"{(cache['storage_bytes'] or 0) / 1e6:.1f} MB, cuota {cache['quota_bytes'] / 1e6:.0f} MB")
+        lines.append(f"  recursos: {cache['hits']} desde caché, {cache['revalidated']} revalidados, "
+                     f"{cache['misses']} descargados, {cache['opaque']} sin datos de tiempo")
+        playback = playback_telemetry.totals()
+        lines.append("")
+        startup = playback["startup_ms_median"]
+        lines.append(f"Reproducción: {playback['sessions']} videos, arranque mediano "
+                     f"{'-' if startup is None else f'{startup:.0f} ms'}, {playback['rebuffers']} paradas a cargar "
+                     f"({playback['rebuffer_ratio']:.1%} del tiempo), {playback['errors']} errores")
+        for window_id, session in sorted(playback_telemetry.windows().items()):
+            lines.append(f"  ventana {window_id}: {session['video'] or '(incógnito)'} · calidad {session['quality'] or '-'}"
+                         f" · arranque {session['startup_ms'] if session['startup_ms'] is not None else '-'} ms"
+                         f" · paradas {session['rebuffers']}")
+        lines.append(f"Permisos: {profile_manager.permission_requests} peticiones, "
+                     f"{profile_manager.permission_cache_hits} resueltas desde caché · "
+                     f"perfiles de incógnito abiertos: {profile_manager.incognito_profiles}")
+        if chromium_runtime.active:
+            lines.append(f"Chromium: perfil {chromium_runtime.active} · {os.environ.get('QTWEBENGINE_CHROMIUM_FLAGS', '')}")
+        if perf_log_path:
+            lines.append("")
+            lines.append(f"Log: {perf_log_path}")
+        if profiler_toggle.last_path:
+            lines.append(f"Último perfil: {profiler_toggle.last_path}")
+        self.text.setPlainText("\n".join(lines))
+        self.profile_btn.setText("⏹ Detener perfil" if profiler_toggle.active else "⏺ Iniciar perfil (cProfile)")
 
-class VideoWindow(QWidget):
-    def __init__(self, url, width=480, height=270, autoplay=True):
+class FloatingPlayerBase(QWidget):
+    """Ventana flotante sin bordes con los botones de pin, minimizar y cerrar encima.
+
+    La comparten VideoWindow (QtWebEngine) y NativeVideoWindow (QtMultimedia):
+    cada una pone su reproductor con set_content(). El arrastre desde la
+    franja superior, el pin y el estilo son comunes, igual que la parte del
+    PlayerManager que no depende del reproductor (is_backgrounded() y las
+    señales); freeze(), discard() y wake() los pone cada subclase.
+    """
+    # Emitida al cerrar la ventana (✕) y al activarla, para el PlayerManager
+    closed = pyqtSignal(object)
+    activated = pyqtSignal(object)
+
+    def __init__(self, width=480, height=270):
         super().__init__()
         self.setWindowTitle("Reproductor Flotante")
         self.normal_size = (width, height)
@@ -258,13 +1669,9 @@ class VideoWindow(QWidget):
         self.layout = QVBoxLayout()
         self.layout.setContentsMargins(0, 0, 0, 0)
         self.layout.setSpacing(0)
-
-        # WebView ocupa todo
-        self.webview = QWebEngineView()
-        self.layout.addWidget(self.webview, stretch=1)
         self.setLayout(self.layout)
-        
-        # No necesitamos event filter para webview - los botones estarán flotantes encima
+
+        # No necesitamos event filter para el reproductor - los botones estarán flotantes encima
 
         # Botones de control como overlay (widget flotante encima del video)
         # Contenedor para los botones - debe ser descendiente de self para que tenga coordenadas correctas
@@ -335,149 +1742,10 @@ class VideoWindow(QWidget):
         control_bar.addWidget(minimize_btn)
         control_bar.addWidget(self.close_btn)
 
-        # Configurar perfil personalizado
-        profile = self.webview.page().profile()
-        try:
-            # Preferir almacenamiento persistente para cookies/credenciales
-            profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)
-            cache_dir = os.path.join(os.path.expanduser("~"), ".youtube_floater_cache")
-            os.makedirs(cache_dir, exist_ok=True)
-            profile.setCachePath(cache_dir)
-            profile.setPersistentStoragePath(cache_dir)
-        except Exception:
-            logging.debug("No se pudo configurar almacenamiento persistente del perfil")
-
-        # Configurar User Agent moderno
-        try:
-            profile.setHttpUserAgent(
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-                "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
-            )
-        except Exception:
-            logging.debug("No se pudo establecer User Agent en el perfil")
-
-        # Usar página diagnóstica para capturar mensajes de consola
-        page = DiagnosticWebPage(profile, self.webview)
-        self.webview.setPage(page)
-
-        # Configurar settings del navegador
-        settings = self.webview.settings()
-        settings.setAttribute(QWebEngineSettings.FullScreenSupportEnabled, True)
-        settings.setAttribute(QWebEngineSettings.PlaybackRequiresUserGesture, False)
-        settings.setAttribute(QWebEngineSettings.PluginsEnabled, True)
-        settings.setAttribute(QWebEngineSettings.LocalStorageEnabled, True)
-        # Permitir que contenido local cargue recursos remotos (para setHtml baseUrl)
-        try:
-            settings.setAttribute(QWebEngineSettings.LocalContentCanAccessRemoteUrls, True)
-            settings.setAttribute(QWebEngineSettings.LocalContentCanAccessFileUrls, True)
-        except Exception:
-            logging.debug("Some LocalContent settings not available on this Qt version")
-
-        # Conectores para diagnóstico
-        self._fallback_attempted = False
-        self.webview.loadStarted.connect(lambda: logging.info("WebView loadStarted"))
-        self.webview.loadProgress.connect(lambda p: logging.info(f"WebView loadProgress: {p}%"))
-        self.webview.loadFinished.connect(self.on_load_finished)
-
-        # Permitir automáticamente permisos solicitados por la página (audio, cámara, geolocation)
-        try:
-            def _grant_permission(url, feature):
-                try:
-                    page.setFeaturePermission(url, feature, QWebEnginePage.PermissionGrantedByUser)
-                    logging.info(f"Granted feature permission {feature} for {url.toString()}")
-                except Exception:
-                    logging.debug("Could not set feature permission")
-
-            self.webview.page().featurePermissionRequested.connect(_grant_permission)
-        except Exception:
-            logging.debug("featurePermissionRequested not available in this Qt version")
-
-        embed_url = self.youtube_embed_url(url, autoplay)
-        self.webview.setStyleSheet("background: #000;")
-
-        # Cargar mediante HTML con iframe para forzar atributos 'allow' y 'allowfullscreen'
-        # El webview ocupa toda la ventana, iframe al 100% sin recorte
-        iframe_html = f"""
-        <!doctype html>
-        <html>
-        <head>
-          <meta charset="utf-8"> 
-          <meta name="viewport" content="width=device-width,initial-scale=1">
-          <style>
-            html,body {{ height:100%; margin:0; background:#000; padding:0; }}
-            .player-wrapper {{ 
-              width:100%; height:100%; 
-              overflow:hidden;
-              position:relative;
-            }}
-            .player-wrapper iframe {{
-              width:100%; height:100%;
-              border:0; display:block;
-              background:#000;
-            }}
-          </style>
-        </head>
-        <body>
-          <div class="player-wrapper">
-            <iframe src="{embed_url}" allow="autoplay; encrypted-media; fullscreen; picture-in-picture" allowfullscreen></iframe>
-          </div>
-        </body>
-        </html>
-        """
-
-        # Usar baseUrl para que el iframe herede el dominio y cookies
-        try:
-            self.webview.setHtml(iframe_html, QUrl(embed_url))
-        except Exception:
-            logging.exception("setHtml failed, falling back to load()")
-            self.webview.load(QUrl(embed_url))
-
-        if hasattr(self.webview, "fullScreenRequested"):
-            self.webview.fullScreenRequested.connect(self.handle_fullscreen)
-
-        self.setMouseTracking(True)
-
-    def on_load_finished(self, ok: bool):
-        url = self.webview.url().toString()
-        logging.info(f"loadFinished: {ok} -> {url}")
-        if not ok:
-            # Capturar HTML para diagnóstico
-            try:
-                def _save_html(html):
-                    fname = os.path.join(os.path.expanduser("~"), "youtube_floater_error.html")
-                    with open(fname, "w", encoding="utf-8") as f:
-                        f.write(html)
-                    logging.error(f"Página cargada mal. HTML guardado en: {fname}")
-                self.webview.page().toHtml(_save_html)
-            except Exception as e:
-                logging.exception("Error capturando HTML de la página")
-
-            # Intentar fallback entre dominios (nocookie <-> www)
-            if not getattr(self, "_fallback_attempted", False):
-                self._fallback_attempted = True
-                if "youtube-nocookie.com" in url:
-                    new_url = url.replace("youtube-nocookie.com", "www.youtube.com")
-                else:
-                    new_url = url.replace("www.youtube.com", "www.youtube-nocookie.com")
-                logging.info(f"Intentando fallback a: {new_url}")
-                self.webview.load(QUrl(new_url))
-            else:
-                QMessageBox.warning(self, "Error de carga", "No se pudo cargar el video (error 153). Revisa consola y actualiza PyQt5/QtWebEngine.")
-
-    def youtube_embed_url(self, url, autoplay=True):
-        patterns = [
-            r"youtu\.be/([a-zA-Z0-9_-]+)",
-            r"youtube\.com/watch\?v=([a-zA-Z0-9_-]+)",
-            r"youtube\.com/embed/([a-zA-Z0-9_-]+)",
-            r"youtube\.com/shorts/([a-zA-Z0-9_-]+)"
-        ]
-        for pat in patterns:
-            m = re.search(pat, url)
-            if m:
-                video_id = m.group(1)
-                autoplay_param = "1" if autoplay else "0"
-                return f"https://www.youtube-nocookie.com/embed/{video_id}?autoplay={autoplay_param}&rel=0&modestbranding=1&controls=1&playsinline=1&fs=1"
-        return url
+    def set_content(self, widget):
+        """Pone el reproductor debajo de los botones, ocupando toda la ventana"""
+        self.layout.addWidget(widget, stretch=1)
+        self.buttons_container.raise_()
 
     def toggle_pin(self):
         self.is_pinned = not self.is_pinned
@@ -489,19 +1757,6 @@ class VideoWindow(QWidget):
             self.pin_btn.setText("📍")
         self.show()
 
-    def handle_fullscreen(self, request):
-        if request.toggleOn():
-            self.fullscreen = True
-            self.close_btn.hide()
-            self.pin_btn.hide()
-            self.showFullScreen()
-        else:
-            self.fullscreen = False
-            self.close_btn.show()
-            self.pin_btn.show()
-            self.showNormal()
-        request.accept()
-
     def resizeEvent(self, event):
         """Actualizar posición del contenedor de botones al redimensionar"""
         super().resizeEvent(event)
@@ -540,23 +1795,1473 @@ class VideoWindow(QWidget):
         self._drag_active = False
         event.accept()
 
-class FloatingWindow(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Reproductor Flotante para Videos de YouTube")
-        self.setFixedSize(600, 500)
-        
-        # Configuración por defecto
-        self.settings = QSettings("BochisLine", "YouTubeFloater")
-        self.video_width = self.settings.value("video_width", 480, type=int)
-        self.video_height = self.settings.value("video_height", 270, type=int)
-        self.autoplay = self.settings.value("autoplay", True, type=bool)
-        self.save_history = self.settings.value("save_history", True, type=bool)
-        self.bg_color = self.settings.value("bg_color", "#232946")
-        self.video_history = self.settings.value("video_history", [])
-        if not isinstance(self.video_history, list):
-            self.video_history = []
-        
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            self.wake()
+            self.activated.emit(self)
+        elif event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self.wake()
+
+    def is_backgrounded(self):
+        """True si el reproductor no se está viendo: minimizado o tapado por otra ventana de la app.
+
+        Solo se consideran tapadas las ventanas despineadas, inactivas y cubiertas por
+        completo por otra ventana visible de la aplicación; la oclusión por ventanas de
+        otros programas no se puede detectar desde Qt.
+        """
+        if self.fullscreen:
+            return False
+        if self.isMinimized() or not self.isVisible():
+            return True
+        if self.is_pinned or self.isActiveWindow():
+            return False
+        geometry = self.frameGeometry()
+        for other in QApplication.topLevelWidgets():
+            if other is self or not other.isVisible() or other.isMinimized():
+                continue
+            if other.frameGeometry().contains(geometry):
+                return True
+        return False
+
+    def closeEvent(self, event):
+        super().closeEvent(event)
+        if event.isAccepted():
+            self.closed.emit(self)
+
+class VideoWindow(FloatingPlayerBase):
+    # Duración (y título/canal si la API los da) del video al empezar a reproducirse: (url, datos)
+    videoInfo = pyqtSignal(str, dict)
+    # Numeración de ventanas para la telemetría de reproducción
+    _telemetry_ids = itertools.count(1)
+    # Calidad máxima en modo de poca memoria (tras varios fallos del renderer)
+    LOW_MEMORY_QUALITY = "medium"
+
+    @timed("VideoWindow.__init__")
+    def __init__(self, url=None, width=480, height=270, autoplay=True, max_quality="auto", incognito=False, start=0):
+        """Construye la ventana (webview, página, settings y overlay).
+
+        Si no se pasa url queda como "cascarón" listo para recibir un video
+        con load_video(); así la usa VideoWindowPool para precargar ventanas.
+        """
+        load_webengine()
+        super().__init__(width, height)
+        # Registro de diagnóstico de esta ventana; sólo se vuelca si falla una carga
+        self.diagnostics = DiagnosticsBuffer()
+        self.telemetry_id = str(next(self._telemetry_ids))
+        self.max_quality = max_quality
+        self.applied_quality = None
+        # Re-evaluar la calidad tras un redimensionado, con debounce
+        self._quality_timer = QTimer(self)
+        self._quality_timer.setSingleShot(True)
+        self._quality_timer.setInterval(500)
+        self._quality_timer.timeout.connect(self.apply_quality)
+
+        # WebView ocupa todo (debajo de los botones)
+        self.webview = QWebEngineView()
+        self.set_content(self.webview)
+
+        # Perfil compartido (ya configurado) o uno propio y efímero si es incógnito
+        self.incognito = incognito
+        self.profile = profile_manager.profile(incognito, owner=self)
+
+        # Usar página diagnóstica para capturar mensajes de consola
+        page = self.create_page()
+        self.webview.setPage(page)
+        self.player_ready = False
+        self.video_id = None
+        # Video del que ya se emitió videoInfo
+        self.info_video_id = None
+        self.video_title = ""
+        page.playerEvent.connect(self.on_player_event)
+        page.telemetry_bridge.attach(self.on_telemetry)
+        self.load_supervisor = LoadSupervisor(self, embed_host_stats)
+        # Renderer caído o colgado: reconstruir la página y seguir donde iba
+        self.low_memory = False
+        self.recovery = RecoverySupervisor(self)
+        self.recovery.watch(page)
+
+        # Estado para la política de segundo plano (PlayerLifecyclePolicy)
+        self.current_url = None
+        self.current_autoplay = autoplay
+        self.last_position = 0.0
+        self.lifecycle_state = "active"  # active | frozen | discarded | paused
+        self._resume_on_wake = False
+
+        # Conectores para diagnóstico
+        self.webview.loadStarted.connect(lambda: self.diagnostics.add("load", f"loadStarted {self.webview.url().toString()}"))
+        self.webview.loadProgress.connect(lambda p: self.diagnostics.add("load", f"loadProgress {p}%"))
+        self.webview.loadFinished.connect(self.on_load_finished)
+
+        self.webview.setStyleSheet("background: #000;")
+
+        if hasattr(self.webview, "fullScreenRequested"):
+            self.webview.fullScreenRequested.connect(self.handle_fullscreen)
+
+        self.setMouseTracking(True)
+
+        if url:
+            self.load_video(url, autoplay, start)
+
+    def create_page(self):
+        """Página del reproductor con los ajustes y el diagnóstico de esta ventana.
+
+        La usa la página visible y también las páginas ocultas con las que
+        LoadSupervisor prueba otros dominios de embed.
+        """
+        page = profile_manager.create_page(self.profile, self.webview)
+        page.diagnostics = self.diagnostics
+        install_telemetry(page)
+        return page
+
+    def adopt_page(self, page):
+        """Pone page (una página oculta que ganó la carrera, o una nueva) en lugar de la visible"""
+        old = self.webview.page()
+        self.webview.setPage(page)
+        page.setAudioMuted(False)
+        page.playerEvent.connect(self.on_player_event)
+        page.telemetry_bridge.attach(self.on_telemetry)
+        self.recovery.watch(page)
+        if old is not None and old is not page:
+            old.deleteLater()
+
+    def rebuild_page(self):
+        """Sustituye la página (renderer caído o colgado) por una nueva y vuelve a la última posición"""
+        self.load_supervisor.cancel()
+        self.adopt_page(self.create_page())
+        if self.current_url:
+            self.load_video(self.current_url, self.current_autoplay, int(self.last_position))
+
+    def enter_low_memory_mode(self):
+        """Para ventanas cuyo renderer falla una y otra vez: calidad limitada y sin páginas ocultas"""
+        self.low_memory = True
+        self.load_supervisor.race = False
+        self.set_max_quality(self.max_quality)
+        logging.warning(f"Reproductor en modo de poca memoria (calidad máxima {self.max_quality})")
+
+    def warm_up(self):
+        """Carga una página vacía para arrancar el proceso renderer por adelantado"""
+        self.webview.setHtml("<!doctype html><html><body style='background:#000'></body></html>")
+
+    def load_video(self, url, autoplay=True, start=0):
+        self.player_ready = False
+        self.video_id = self.extract_video_id(url)
+        self.current_url = url
+        self.current_autoplay = autoplay
+        self.last_position = float(start)
+        self.applied_quality = self.target_quality()
+        if parse_youtube_url(url) is None:
+            logging.warning(f"No es un enlace de YouTube: {url}")
+            return
+        # El supervisor elige dominio, vigila que el reproductor responda y reintenta
+        self.load_supervisor.start(url, autoplay, start)
+
+    def load_into(self, page, host, url, autoplay, start):
+        """Carga en page la página contenedora del reproductor servido desde host"""
+        embed_url = self.youtube_embed_url(url, autoplay, start, self.applied_quality, host=host)
+        if PLAYER_SCHEME_SUPPORTED:
+            # Documento fijo servido desde memoria; sólo cambia la query con el embed
+            parsed = parse_youtube_url(url)
+            page.load(player_page_url(embed_url, parsed.video_id if parsed else None))
+            return
+
+        # Sin esquema propio (Qt < 5.12): página contenedora en línea con setHtml.
+        # El iframe lleva 'allow' y 'allowfullscreen' y ocupa toda la ventana
+        iframe_html = f"""
+        <!doctype html>
+        <html>
+        <head>
+          <meta charset="utf-8"> 
+          <meta name="viewport" content="width=device-width,initial-scale=1">
+          <style>{PLAYER_CSS}</style>
+        </head>
+        <body>
+          <div class="player-wrapper">
+            <iframe id="player" src="{embed_url}" allow="autoplay; encrypted-media; fullscreen; picture-in-picture" allowfullscreen onload="floaterEmit('frame')"></iframe>
+          </div>
+          <script>{PLAYER_API_JS}</script>
+          <script src="{IFRAME_API_URL}" async></script>
+        </body>
+        </html>
+        """
+
+        # Usar baseUrl para que el iframe herede el dominio y cookies
+        try:
+            page.setHtml(iframe_html, QUrl(embed_url))
+        except Exception:
+            logging.exception("setHtml failed, falling back to load()")
+            page.load(QUrl(embed_url))
+
+    def switch_video(self, url, autoplay=True):
+        """Cambia de video dentro del reproductor ya cargado (sin recrear la página).
+
+        Si la IFrame API todavía no está lista, o la URL no es de YouTube,
+        se recarga la página completa con load_video().
+        """
+        parsed = parse_youtube_url(url)
+        if not (self.player_ready and parsed and parsed.video_id and not parsed.playlist_id):
+            self.load_video(url, autoplay)
+            return
+        video_id = parsed.video_id
+
+        def _on_result(ok):
+            if not ok:
+                self.load_video(url, autoplay)
+                return
+            # loadVideoById vuelve a la calidad por defecto: pedir otra vez la objetivo
+            self.applied_quality = None
+            self.apply_quality()
+
+        self.video_id = video_id
+        self.current_url = url
+        self.current_autoplay = autoplay
+        self.last_position = float(parsed.start)
+        self.webview.page().runJavaScript(
+            f"floaterLoad({json.dumps(video_id)}, {parsed.start}, {'true' if autoplay else 'false'})", _on_result
+        )
+
+    def on_player_event(self, event_type, data):
+        self.diagnostics.add("player", f"{event_type} {json.dumps(data)}")
+        self.load_supervisor.on_player_event(self.webview.page(), event_type, data)
+        if event_type == "ready":
+            self.player_ready = True
+            self.recovery.on_ready()
+            logging.debug("IFrame API lista")
+            chromium_runtime.confirm()
+            # El embed sólo sugiere la calidad con vq; fijarla también por la API
+            self.applied_quality = None
+            self.apply_quality()
+        elif event_type == "state" and data.get("state") == 1 and self.info_video_id != self.video_id:
+            # oEmbed no da la duración: se pide a la IFrame API una vez por video
+            self.info_video_id = self.video_id
+            url = self.current_url
+            self.webview.page().runJavaScript("floaterVideoInfo()", lambda info: self._on_video_info(url, info))
+        elif event_type == "quality_capped":
+            logging.info(f"YouTube eligió {data.get('quality')} por encima del límite {data.get('cap')}: "
+                         "reproductor reducido y video recargado")
+        elif event_type == "error":
+            logging.warning(f"Error del reproductor de YouTube: {data.get('code')}")
+
+    def on_telemetry(self, events):
+        # En incógnito no se asocia la telemetría a un video concreto
+        playback_telemetry.ingest(self.telemetry_id, "" if self.incognito else (self.video_id or ""), events)
+        # Última posición conocida (muestras y cambios de estado), para la sesión
+        for event in reversed(events):
+            data = event[2] if isinstance(event, (list, tuple)) and len(event) == 3 else None
+            if isinstance(data, dict) and isinstance(data.get("position"), (int, float)):
+                self.last_position = float(data["position"])
+                break
+
+    def _on_video_info(self, url, info):
+        if url and isinstance(info, dict) and info.get("duration"):
+            self.video_title = info.get("title") or self.video_title
+            self.videoInfo.emit(url, info)
+
+    def session_state(self):
+        """Entrada de SessionStore para esta ventana, o None si no hay que guardarla"""
+        if self.incognito or not self.current_url:
+            return None
+        geometry = self.normalGeometry() if self.fullscreen or self.isMinimized() else self.geometry()
+        return {
+            "kind": "video",
+            "url": self.current_url,
+            "position": round(self.last_position, 1),
+            "geometry": [geometry.x(), geometry.y(), geometry.width(), geometry.height()],
+            "pinned": self.is_pinned,
+            "opacity": round(self.windowOpacity(), 2),
+            "title": self.video_title,
+        }
+
+    @timed("VideoWindow.on_load_finished")
+    def on_load_finished(self, ok: bool):
+        url = self.webview.url().toString()
+        self.diagnostics.add("load", f"loadFinished {ok} {url}")
+        logging.info(f"loadFinished: {ok} -> {url}")
+        if not ok:
+            # Los reintentos y el cambio de dominio los decide LoadSupervisor
+            self.dump_diagnostics()
+
+    def load_failed(self):
+        """Ningún dominio de embed respondió tras todos los reintentos"""
+        self.dump_diagnostics()
+        QTimer.singleShot(0, lambda: QMessageBox.warning(
+            self, "Error de carga",
+            "No se pudo cargar el video tras varios intentos. Revisa la conexión y actualiza PyQt5/QtWebEngine."
+        ))
+
+    def dump_diagnostics(self, kind="load-error", with_html=True):
+        """Vuelca el registro de la ventana y el HTML de la página a un fichero con fecha.
+
+        toHtml() es asíncrono y la escritura se hace en un hilo aparte, así que
+        nada de esto bloquea la interfaz. Con el renderer caído o colgado
+        (with_html=False) sólo se guarda el registro.
+        """
+        stem = f"{kind}-{datetime.now():%Y%m%d-%H%M%S-%f}-{self.video_id or 'sin-video'}"
+        lines = self.diagnostics.lines()
+        if not with_html:
+            write_diagnostic_dump(stem, lines, None)
+            return
+        try:
+            self.webview.page().toHtml(lambda html: write_diagnostic_dump(stem, lines, html))
+        except RuntimeError:
+            # La página ya no existe: guardar al menos el registro
+            write_diagnostic_dump(stem, lines, None)
+
+    @staticmethod
+    def extract_video_id(url):
+        parsed = parse_youtube_url(url)
+        return parsed.video_id if parsed else None
+
+    def youtube_embed_url(self, url, autoplay=True, start=0, quality=None, host=None):
+        """URL del reproductor embebido para url, o None si no es un enlace de YouTube"""
+        parsed = parse_youtube_url(url)
+        if not parsed:
+            return None
+        return parsed.player_url(
+            autoplay, host=host, start=start or None, rel=0, modestbranding=1, controls=1,
+            playsinline=1, fs=1, enablejsapi=1, vq=quality
+        )
+
+    def target_quality(self):
+        """Calidad objetivo según la altura actual en píxeles físicos y el límite del usuario"""
+        pixel_height = int(self.height() * self.devicePixelRatioF())
+        return quality_for_size(pixel_height, self.max_quality)
+
+    def set_max_quality(self, max_quality):
+        if self.low_memory:
+            max_quality = cap_quality(max_quality, self.LOW_MEMORY_QUALITY)
+        self.max_quality = max_quality
+        self.apply_quality()
+
+    def schedule_quality_update(self):
+        self._quality_timer.start()
+
+    def apply_quality(self):
+        """Fija en el reproductor cargado la calidad objetivo como límite.
+
+        Si YouTube se pasa de él, la página reduce el tamaño del reproductor y
+        recarga el video (floaterSetQuality en PLAYER_API_JS). Sin límite
+        ("none") se deshace la reducción.
+        """
+        quality = self.target_quality()
+        if not self.player_ready or quality == self.applied_quality:
+            return
+        self.applied_quality = quality
+        logging.debug(f"Calidad del reproductor limitada a {quality} ({self.width()}x{self.height()})")
+        self.webview.page().runJavaScript(
+            f"floaterSetQuality({json.dumps(quality)}, {json.dumps(self.video_id)})")
+
+    def handle_fullscreen(self, request):
+        if request.toggleOn():
+            self.fullscreen = True
+            self.close_btn.hide()
+            self.pin_btn.hide()
+            self.showFullScreen()
+        else:
+            self.fullscreen = False
+            self.close_btn.show()
+            self.pin_btn.show()
+            self.showNormal()
+        request.accept()
+        self.schedule_quality_update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if hasattr(self, '_quality_timer'):
+            self.schedule_quality_update()
+
+    @property
+    def loading(self):
+        return self.load_supervisor.loading
+
+    def remember_position(self, value):
+        """Respuesta de floaterPosition(): segundos, o None si el reproductor no está listo"""
+        if isinstance(value, (int, float)):
+            self.last_position = float(value)
+
+    def _save_position(self, callback=None):
+        def _on_position(value):
+            self.remember_position(value)
+            if callback:
+                callback()
+        self.webview.page().runJavaScript("typeof floaterPosition === 'function' ? floaterPosition() : null", _on_position)
+
+    def freeze(self):
+        """Active -> Frozen: el renderer deja de ejecutar JS y de decodificar"""
+        if self.lifecycle_state != "active":
+            return
+        if not LIFECYCLE_SUPPORTED:
+            self.pause_in_background()
+            return
+
+        def _do_freeze():
+            if self.lifecycle_state != "active" or not self.is_backgrounded():
+                return
+            page = self.webview.page()
+            page.setVisible(False)
+            page.setLifecycleState(QWebEnginePage.Frozen)
+            self.lifecycle_state = "frozen"
+            logging.debug(f"Reproductor congelado en {self.last_position:.1f}s")
+
+        self._save_position(_do_freeze)
+
+    @property
+    def can_discard(self):
+        return LIFECYCLE_SUPPORTED
+
+    def discard(self):
+        """Frozen -> Discarded: se libera el renderer; wake() recarga en la misma posición"""
+        if not LIFECYCLE_SUPPORTED or self.lifecycle_state == "discarded":
+            return
+        if self.lifecycle_state != "active":
+            # Congelado: la posición ya se guardó en freeze()
+            self._do_discard()
+            return
+
+        def _discard_active():
+            if self.lifecycle_state == "active" and self.is_backgrounded():
+                self.webview.page().setVisible(False)
+                self._do_discard()
+
+        # Como freeze(): guardar antes la posición, que la página ya no podrá dar
+        self._save_position(_discard_active)
+
+    def _do_discard(self):
+        self.webview.page().setLifecycleState(QWebEnginePage.Discarded)
+        self.lifecycle_state = "discarded"
+        logging.debug(f"Reproductor descartado en {self.last_position:.1f}s")
+
+    def pause_in_background(self):
+        """Alternativa para Qt < 5.14: pausar mediante la IFrame API"""
+        if self.lifecycle_state != "active" or not self.player_ready:
+            return
+
+        def _on_paused(paused):
+            self._resume_on_wake = bool(paused)
+            self.lifecycle_state = "paused"
+
+        self.webview.page().runJavaScript("floaterPause()", _on_paused)
+
+    def wake(self):
+        """Devuelve el reproductor a Active al volver a mostrarse"""
+        state = self.lifecycle_state
+        if state == "active":
+            return
+        self.lifecycle_state = "active"
+        page = self.webview.page()
+        if state == "paused":
+            if self._resume_on_wake:
+                page.runJavaScript("floaterPlay()")
+            self._resume_on_wake = False
+            return
+        if state == "discarded" and self.current_url:
+            # Pasar a Active recargaría la página descartada y luego load_video navegaría
+            # otra vez; en su lugar una página nueva carga directamente en la posición guardada
+            self.rebuild_page()
+            return
+        page.setLifecycleState(QWebEnginePage.Active)
+        page.setVisible(True)
+
+    def render_process_pid(self):
+        """PID del renderer de Chromium (Qt >= 5.15), o None si no está disponible"""
+        page = self.webview.page()
+        if page is None or not hasattr(page, "renderProcessPid"):
+            return None
+        return page.renderProcessPid() or None
+
+    def release(self):
+        """Libera página, webview y la propia ventana (y con ellos el renderer)"""
+        self.load_supervisor.cancel()
+        self.recovery.stop()
+        playback_telemetry.close_window(self.telemetry_id)
+        page = self.webview.page()
+        self.webview.stop()
+        if page is not None:
+            page.deleteLater()
+        self.webview.deleteLater()
+        self.deleteLater()
+
+# Extensiones que se reproducen con NativeVideoWindow (QtMultimedia) en lugar de Chromium
+NATIVE_MEDIA_EXTENSIONS = (
+    ".mp4", ".m4v", ".webm", ".mkv", ".mov", ".ogv", ".avi",
+    ".mp3", ".m4a", ".ogg", ".opus", ".wav", ".flac",
+)
+
+def direct_media_source(text):
+    """QUrl de un archivo local o enlace directo a video/audio (no YouTube), o None"""
+    text = (text or "").strip().strip('"')
+    if not text or parse_youtube_url(text):
+        return None
+    parts = urlsplit(text)
+    if parts.scheme in ("http", "https"):
+        if os.path.splitext(parts.path)[1].lower() in NATIVE_MEDIA_EXTENSIONS:
+            return QUrl(text)
+        return None
+    path = QUrl(text).toLocalFile() if parts.scheme == "file" else os.path.expanduser(text)
+    if os.path.splitext(path)[1].lower() in NATIVE_MEDIA_EXTENSIONS and os.path.isfile(path):
+        return QUrl.fromLocalFile(os.path.abspath(path))
+    return None
+
+class MappedFileDevice(QIODevice):
+    """QIODevice de sólo lectura sobre un archivo mapeado en memoria (mmap).
+
+    QMediaPlayer lee directamente de la caché de páginas del sistema, sin el
+    búfer intermedio de QFile: cada lectura es una rebanada del mapa.
+    """
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent)
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Archivos vacíos o que no se pueden mapear
+            self._file.close()
+            raise
+        self.open(QIODevice.ReadOnly | QIODevice.Unbuffered)
+
+    def isSequential(self):
+        return False
+
+    def size(self):
+        return len(self._map)
+
+    def readData(self, maxlen):
+        start = self.pos()
+        return self._map[start:start + maxlen]
+
+    def writeData(self, data):
+        return -1
+
+    def close(self):
+        super().close()
+        if not self._map.closed:
+            self._map.close()
+            self._file.close()
+
+class NativeVideoWindow(FloatingPlayerBase):
+    """Reproductor de archivos locales y enlaces directos (.mp4, .webm, ...) con QtMultimedia.
+
+    No usa Chromium, así que abre antes y ocupa una fracción de la memoria de
+    una VideoWindow. Tiene el mismo overlay (pin, minimizar, cerrar) y se
+    arrastra igual; un clic en el video pausa o reanuda y el doble clic pasa
+    a pantalla completa. Con use_mmap los archivos locales se leen con
+    MappedFileDevice.
+
+    Como las demás ventanas la gestiona el PlayerManager: en segundo plano se
+    pausa (freeze) y luego suelta el decodificador y el archivo (discard), que
+    wake() vuelve a abrir en la misma posición. No tiene renderer propio, así
+    que no cuenta como tal en las estadísticas.
+    """
+    # discard() libera de verdad el decodificador y el archivo
+    can_discard = True
+
+    @timed("NativeVideoWindow.__init__")
+    def __init__(self, source, width=480, height=270, autoplay=True, use_mmap=False, start=0):
+        load_multimedia()
+        super().__init__(width, height)
+        self.source = source
+        self.current_url = source.toString()
+        self.autoplay = autoplay
+        self.use_mmap = use_mmap
+        self.start = start
+        self.lifecycle_state = "active"
+        self._resume_on_wake = False
+        self._device = None
+        self._started = False
+        self._error_shown = False  # InvalidMedia y error() llegan juntos: un solo aviso
+        name = os.path.basename(source.toLocalFile()) if source.isLocalFile() else source.fileName()
+        self.video_title = name
+        self.setWindowTitle(f"Reproductor Flotante · {name}")
+
+        self.video_widget = QVideoWidget()
+        self.video_widget.setStyleSheet("background: #000; border: none;")
+        self.set_content(self.video_widget)
+        self.player = QMediaPlayer(self, QMediaPlayer.VideoSurface)
+        self.player.setVideoOutput(self.video_widget)
+        self.player.mediaStatusChanged.connect(self.on_media_status)
+        self.player.error.connect(self.on_error)
+        self.load(use_mmap)
+
+    def load(self, use_mmap=False):
+        media = QMediaContent(self.source)
+        if use_mmap and self.source.isLocalFile():
+            try:
+                self._device = MappedFileDevice(self.source.toLocalFile(), self)
+            except (OSError, ValueError):
+                logging.warning(f"No se pudo mapear {self.source.toLocalFile()}; se lee de forma normal")
+                self._device = None
+        if self._device is not None:
+            self.player.setMedia(media, self._device)
+        else:
+            self.player.setMedia(media)
+
+    def on_media_status(self, status):
+        if status in (QMediaPlayer.LoadedMedia, QMediaPlayer.BufferedMedia) and not self._started:
+            self._started = True
+            if self.start:
+                self.player.setPosition(int(self.start * 1000))
+            if self.autoplay:
+                self.player.play()
+        elif status == QMediaPlayer.InvalidMedia:
+            self.on_error()
+
+    def on_error(self, *args):
+        if self._error_shown:
+            return
+        self._error_shown = True
+        message = self.player.errorString() or "formato no soportado"
+        logging.warning(f"No se pudo reproducir {self.current_url}: {message}")
+        QTimer.singleShot(0, lambda: QMessageBox.warning(
+            self, "Error de reproducción", f"No se pudo reproducir el archivo:\n{message}"
+        ))
+
+    def toggle_playback(self):
+        if self.player.state() == QMediaPlayer.PlayingState:
+            self.player.pause()
+        else:
+            self.player.play()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and event.y() >= 45:
+            self.toggle_playback()
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def mouseDoubleClickEvent(self, event):
+        self.fullscreen = not self.fullscreen
+        if self.fullscreen:
+            self.showFullScreen()
+        else:
+            self.showNormal()
+        event.accept()
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Space:
+            self.toggle_playback()
+        elif event.key() == Qt.Key_Escape and self.fullscreen:
+            self.fullscreen = False
+            self.showNormal()
+        else:
+            super().keyPressEvent(event)
+
+    @property
+    def last_position(self):
+        """Segundos reproducidos; antes de cargar (o descartada), donde va a empezar"""
+        if self._started and self.lifecycle_state != "discarded":
+            return self.player.position() / 1000
+        return float(self.start)
+
+    def session_state(self):
+        """Entrada de SessionStore para esta ventana"""
+        geometry = self.normalGeometry() if self.fullscreen or self.isMinimized() else self.geometry()
+        return {
+            "kind": "native",
+            "url": self.current_url,
+            "position": round(self.last_position, 1),
+            "geometry": [geometry.x(), geometry.y(), geometry.width(), geometry.height()],
+            "pinned": self.is_pinned,
+            "opacity": round(self.windowOpacity(), 2),
+            "title": self.video_title,
+        }
+
+    def freeze(self):
+        """Active -> Frozen: pausa la reproducción (no hay renderer que congelar)"""
+        if self.lifecycle_state != "active":
+            return
+        self._resume_on_wake = self.player.state() == QMediaPlayer.PlayingState
+        self.player.pause()
+        self.lifecycle_state = "frozen"
+
+    def discard(self):
+        """-> Discarded: suelta el decodificador y el archivo; wake() lo reabre en la misma posición"""
+        if self.lifecycle_state == "discarded":
+            return
+        if self.lifecycle_state == "active":
+            self._resume_on_wake = self.player.state() == QMediaPlayer.PlayingState
+        self.start = self.last_position
+        self._unload()
+        self.lifecycle_state = "discarded"
+        logging.debug(f"Reproductor nativo descartado en {self.start:.1f}s")
+
+    def wake(self):
+        """Devuelve el reproductor a Active al volver a mostrarse"""
+        state = self.lifecycle_state
+        if state == "active":
+            return
+        self.lifecycle_state = "active"
+        if state == "discarded":
+            # on_media_status salta a self.start y sigue sólo si estaba reproduciendo
+            self.autoplay = self._resume_on_wake
+            self._started = False
+            self.load(self.use_mmap)
+        elif self._resume_on_wake:
+            self.player.play()
+        self._resume_on_wake = False
+
+    def render_process_pid(self):
+        """QtMultimedia decodifica en este mismo proceso"""
+        return None
+
+    def _unload(self):
+        self.player.stop()
+        self.player.setMedia(QMediaContent())
+        if self._device is not None:
+            self._device.close()
+            self._device = None
+
+    def release(self):
+        """Detiene el reproductor y libera el archivo (y el mmap)"""
+        self._unload()
+        self.deleteLater()
+
+class MosaicWindow(QWidget):
+    """Varios videos en una sola página (un solo renderer) con una cuadrícula.
+
+    Sólo la ficha enfocada tiene sonido y la calidad que le corresponde por
+    tamaño; las demás van silenciadas y limitadas a OTHER_QUALITY. Las fichas
+    se enfocan con un clic en su barra y se reordenan arrastrándolas.
+
+    Para PlayerManager, PlayerLifecyclePolicy y RecoverySupervisor es un
+    reproductor más: se congela, se descarta y se reconstruye entera, con
+    cada ficha en la posición que guarda positions.
+    """
+    MAX_TILES = 9
+    OTHER_QUALITY = "small"
+    LOW_MEMORY_OTHER_QUALITY = "tiny"
+    closed = pyqtSignal(object)
+    activated = pyqtSignal(object)
+
+    @timed("MosaicWindow.__init__")
+    def __init__(self, urls, width=960, height=540, autoplay=True, max_quality="auto", starts=None, focused=0):
+        load_webengine()
+        super().__init__()
+        self.diagnostics = DiagnosticsBuffer()
+        self.telemetry_id = str(next(VideoWindow._telemetry_ids))
+        self.max_quality = max_quality
+        self.other_quality = self.OTHER_QUALITY
+        self.applied_quality = None
+        self.autoplay = autoplay
+        tiles = [(url, parsed) for url, parsed in ((url, parse_youtube_url(url)) for url in urls) if parsed]
+        tiles = tiles[:self.MAX_TILES]
+        self.urls = [url for url, _ in tiles]
+        self.parsed = [parsed for _, parsed in tiles]
+        starts = list(starts or [])[:len(tiles)]
+        starts += [parsed.start for parsed in self.parsed[len(starts):]]
+        # Posición de cada ficha; la ponen al día los pings de RecoverySupervisor
+        self.positions = [float(start) for start in starts]
+        # Orden visual de las fichas (ids), tras arrastrarlas
+        self.order = list(range(len(self.parsed)))
+        self.focused_tile = focused if 0 <= focused < len(self.parsed) else 0
+        self.player_ready = False
+        self.loading = False
+        self.low_memory = False
+        self.lifecycle_state = "active"  # active | frozen | discarded | paused
+        self._resume_on_wake = False
+        self.setWindowTitle(f"🧩 Mosaico ({len(self.parsed)} videos)")
+        self.setWindowFlags(self.windowFlags() | Qt.WindowStaysOnTopHint)
+        self.resize(width, height)
+        self.setMinimumSize(320, 180)
+        self.setStyleSheet("background: #000;")
+
+        self._quality_timer = QTimer(self)
+        self._quality_timer.setSingleShot(True)
+        self._quality_timer.setInterval(500)
+        self._quality_timer.timeout.connect(self.apply_quality)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.webview = QWebEngineView()
+        layout.addWidget(self.webview)
+        page = self.create_page()
+        self.webview.setPage(page)
+        self.webview.loadFinished.connect(
+            lambda ok: self.diagnostics.add("load", f"loadFinished {ok} {self.webview.url().toString()}")
+        )
+        self.recovery = RecoverySupervisor(self)
+        self.recovery.watch(page)
+        self.load()
+
+    def create_page(self):
+        page = profile_manager.create_page(profile_manager.profile(), self.webview)
+        page.diagnostics = self.diagnostics
+        page.playerEvent.connect(self.on_player_event)
+        return page
+
+    def rebuild_page(self):
+        """Sustituye la página (renderer caído, colgado o descartado) y vuelve a cargar las fichas"""
+        old = self.webview.page()
+        page = self.create_page()
+        self.webview.setPage(page)
+        self.recovery.watch(page)
+        if old is not None:
+            old.deleteLater()
+        self.load()
+
+    def embed_urls(self):
+        """Un embed por ficha en su última posición; sólo la enfocada empieza con sonido"""
+        host = embed_host_stats.ranked(EMBED_HOSTS)[0]
+        focused = self.tile_quality()
+        return [
+            parsed.player_url(
+                self.autoplay, host=host, start=int(self.positions[i]), rel=0, modestbranding=1, controls=1,
+                playsinline=1, fs=1, enablejsapi=1, mute=None if i == self.focused_tile else 1,
+                vq=focused if i == self.focused_tile else self.other_quality
+            )
+            for i, parsed in enumerate(self.parsed)
+        ]
+
+    def load(self):
+        self.player_ready = False
+        self.loading = True
+        self.applied_quality = None
+        sources = self.embed_urls()
+        page = self.webview.page()
+        if PLAYER_SCHEME_SUPPORTED:
+            page.load(mosaic_page_url(sources, self.focused_tile))
+            return
+        html = (
+            MOSAIC_PAGE_HTML
+            .replace('<link rel="stylesheet" href="mosaic.css">', f"<style>{MOSAIC_CSS}</style>")
+            .replace('<script src="mosaic.js"></script>',
+                     f"<script>var FLOATER_SOURCES = {json.dumps(sources)}; "
+                     f"var FLOATER_FOCUS = {self.focused_tile};{MOSAIC_JS}</script>")
+        )
+        page.setHtml(html, QUrl(sources[0]) if sources else QUrl())
+
+    def tile_quality(self):
+        """Calidad de la ficha enfocada según el tamaño de una celda de la cuadrícula"""
+        count = max(1, len(self.parsed))
+        columns = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / columns)
+        pixel_height = int(self.height() / rows * self.devicePixelRatioF())
+        return quality_for_size(pixel_height, self.max_quality)
+
+    def set_max_quality(self, max_quality):
+        if self.low_memory:
+            max_quality = cap_quality(max_quality, VideoWindow.LOW_MEMORY_QUALITY)
+        self.max_quality = max_quality
+        self.apply_quality()
+
+    def apply_quality(self):
+        """Límite de la ficha enfocada y de las demás; la página lo hace cumplir con el tamaño de cada iframe"""
+        quality = (self.tile_quality(), self.other_quality)
+        if not self.player_ready or quality == self.applied_quality:
+            return
+        self.applied_quality = quality
+        self.webview.page().runJavaScript(f"floaterSetQuality({json.dumps(quality[0])}, {json.dumps(quality[1])})")
+
+    def enter_low_memory_mode(self):
+        """Tras varios fallos del renderer: todas las fichas con menos calidad"""
+        self.low_memory = True
+        self.other_quality = self.LOW_MEMORY_OTHER_QUALITY
+        self.set_max_quality(self.max_quality)
+        logging.warning(f"Mosaico en modo de poca memoria (calidad máxima {self.max_quality})")
+
+    def focus_tile(self, tile):
+        self.webview.page().runJavaScript(f"floaterFocus({int(tile)}, true)")
+
+    def on_player_event(self, event_type, data):
+        self.diagnostics.add("player", f"{event_type} {json.dumps(data)}")
+        if event_type == "ready" and not self.player_ready:
+            self.player_ready = True
+            self.loading = False
+            self.recovery.on_ready()
+            self.apply_quality()
+        elif event_type == "focus":
+            self.focused_tile = data.get("tile", 0)
+        elif event_type == "order":
+            order = data.get("order")
+            if isinstance(order, list) and sorted(order) == list(range(len(self.parsed))):
+                self.order = order
+            logging.debug(f"Mosaico reordenado: {order}")
+        elif event_type == "quality_capped":
+            logging.info(f"Ficha {data.get('tile')}: YouTube eligió {data.get('quality')} por encima del "
+                         f"límite {data.get('cap')}; reproductor reducido y video recargado")
+        elif event_type == "error":
+            logging.warning(f"Error del reproductor en la ficha {data.get('tile')}: {data.get('code')}")
+
+    @property
+    def last_position(self):
+        """Posición de la ficha enfocada"""
+        return self.positions[self.focused_tile] if self.positions else 0.0
+
+    def remember_position(self, value):
+        """Respuesta de floaterPosition(): la posición de cada ficha (None si aún no cargó)"""
+        if not isinstance(value, list):
+            return
+        for index, position in enumerate(value[:len(self.positions)]):
+            if isinstance(position, (int, float)):
+                self.positions[index] = float(position)
+
+    def session_state(self):
+        """Entrada de SessionStore: las fichas en su orden visual, cada una con su posición"""
+        if not self.urls:
+            return None
+        geometry = self.normalGeometry() if self.isMinimized() else self.geometry()
+        return {
+            "kind": "mosaic",
+            "url": self.urls[self.order[0]],
+            "urls": [self.urls[tile] for tile in self.order],
+            "positions": [round(self.positions[tile], 1) for tile in self.order],
+            "focused": self.order.index(self.focused_tile),
+            "position": round(self.last_position, 1),
+            "geometry": [geometry.x(), geometry.y(), geometry.width(), geometry.height()],
+            "pinned": True,
+            "opacity": round(self.windowOpacity(), 2),
+            "title": self.windowTitle(),
+        }
+
+    def dump_diagnostics(self, kind="load-error", with_html=True):
+        stem = f"{kind}-{datetime.now():%Y%m%d-%H%M%S-%f}-mosaico"
+        lines = self.diagnostics.lines()
+        if not with_html:
+            write_diagnostic_dump(stem, lines, None)
+            return
+        try:
+            self.webview.page().toHtml(lambda html: write_diagnostic_dump(stem, lines, html))
+        except RuntimeError:
+            write_diagnostic_dump(stem, lines, None)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._quality_timer.start()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            self.wake()
+            self.activated.emit(self)
+        elif event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self.wake()
+
+    def is_backgrounded(self):
+        """Siempre está encima: sólo deja de verse minimizado u oculto"""
+        return self.isMinimized() or not self.isVisible()
+
+    @property
+    def can_discard(self):
+        return LIFECYCLE_SUPPORTED
+
+    def _save_positions(self, callback):
+        def _on_positions(value):
+            self.remember_position(value)
+            callback()
+        self.webview.page().runJavaScript("typeof floaterPosition === 'function' ? floaterPosition() : null",
+                                          _on_positions)
+
+    def freeze(self):
+        """Active -> Frozen (o pausa por la IFrame API en Qt < 5.14), como VideoWindow.freeze"""
+        if self.lifecycle_state != "active":
+            return
+        if not LIFECYCLE_SUPPORTED:
+            if self.player_ready:
+                def _on_paused(paused):
+                    self._resume_on_wake = bool(paused)
+                    self.lifecycle_state = "paused"
+                self.webview.page().runJavaScript("floaterPause()", _on_paused)
+            return
+
+        def _do_freeze():
+            if self.lifecycle_state != "active" or not self.is_backgrounded():
+                return
+            page = self.webview.page()
+            page.setVisible(False)
+            page.setLifecycleState(QWebEnginePage.Frozen)
+            self.lifecycle_state = "frozen"
+
+        self._save_positions(_do_freeze)
+
+    def discard(self):
+        """Libera el renderer; wake() reconstruye la página con las posiciones guardadas"""
+        if not LIFECYCLE_SUPPORTED or self.lifecycle_state == "discarded":
+            return
+
+        def _do_discard():
+            page = self.webview.page()
+            page.setVisible(False)
+            page.setLifecycleState(QWebEnginePage.Discarded)
+            self.lifecycle_state = "discarded"
+
+        if self.lifecycle_state != "active":
+            # Congelado: las posiciones ya se guardaron en freeze()
+            _do_discard()
+            return
+
+        def _discard_active():
+            if self.lifecycle_state == "active" and self.is_backgrounded():
+                _do_discard()
+
+        self._save_positions(_discard_active)
+
+    def wake(self):
+        state = self.lifecycle_state
+        if state == "active":
+            return
+        self.lifecycle_state = "active"
+        page = self.webview.page()
+        if state == "paused":
+            if self._resume_on_wake:
+                page.runJavaScript("floaterPlay()")
+            self._resume_on_wake = False
+        elif state == "discarded":
+            self.rebuild_page()
+        else:
+            page.setLifecycleState(QWebEnginePage.Active)
+            page.setVisible(True)
+
+    def closeEvent(self, event):
+        super().closeEvent(event)
+        if event.isAccepted():
+            # PlayerManager llama a release()
+            self.closed.emit(self)
+
+    def render_process_pid(self):
+        page = self.webview.page()
+        if page is None or not hasattr(page, "renderProcessPid"):
+            return None
+        return page.renderProcessPid() or None
+
+    def release(self):
+        self.recovery.stop()
+        playback_telemetry.close_window(self.telemetry_id)
+        page = self.webview.page()
+        self.webview.stop()
+        if page is not None:
+            page.deleteLater()
+        self.webview.deleteLater()
+        self.deleteLater()
+
+class RecoverySupervisor(QObject):
+    """Recupera una VideoWindow o MosaicWindow cuyo renderer murió (p. ej. por falta de memoria) o se colgó.
+
+    Escucha renderProcessTerminated de la página visible y, mientras el
+    reproductor está activo y a la vista, le hace un ping por JS cada
+    HEARTBEAT_MS (floaterPosition(), que además guarda la posición). Si
+    MISSED_LIMIT pings seguidos no vuelven, la página se da por colgada. En
+    los dos casos se reconstruye la página con espera exponencial y el video
+    sigue en la última posición conocida; tras STABLE_AFTER_MS sin fallos la
+    espera vuelve a empezar. Una ventana que falla LOW_MEMORY_AFTER veces
+    pasa a modo de poca memoria.
+    """
+    HEARTBEAT_MS = 5000
+    MISSED_LIMIT = 3
+    BACKOFF_MS = 1000
+    MAX_BACKOFF_MS = 60000
+    STABLE_AFTER_MS = 120000
+    LOW_MEMORY_AFTER = 2
+
+    def __init__(self, window):
+        super().__init__(window)
+        self.window = window
+        self.failures = {"crash": 0, "hang": 0}
+        self.attempt = 0  # recuperaciones seguidas, para la espera
+        self._ping_pending = False
+        self._missed = 0
+        self._heartbeat = QTimer(self)
+        self._heartbeat.setInterval(self.HEARTBEAT_MS)
+        self._heartbeat.timeout.connect(self._ping)
+        self._heartbeat.start()
+        self._rebuild_timer = QTimer(self)
+        self._rebuild_timer.setSingleShot(True)
+        self._rebuild_timer.timeout.connect(self._rebuild)
+        self._stable_timer = QTimer(self)
+        self._stable_timer.setSingleShot(True)
+        self._stable_timer.setInterval(self.STABLE_AFTER_MS)
+        self._stable_timer.timeout.connect(self._reset_backoff)
+
+    @property
+    def total_failures(self):
+        return sum(self.failures.values())
+
+    def watch(self, page):
+        """Vigila page (la página visible); las anteriores se ignoran al cambiar"""
+        page.renderProcessTerminated.connect(
+            lambda status, exit_code, page=page: self._on_terminated(page, status, exit_code)
+        )
+        self._ping_pending = False
+        self._missed = 0
+
+    def on_ready(self):
+        if self.attempt:
+            self._stable_timer.start()
+
+    def stop(self):
+        for timer in (self._heartbeat, self._rebuild_timer, self._stable_timer):
+            timer.stop()
+
+    def _reset_backoff(self):
+        self.attempt = 0
+
+    def _watching(self):
+        """Sólo se vigila un reproductor cargado, activo (no congelado ni descartado) y visible"""
+        window = self.window
+        return (window.player_ready and window.lifecycle_state == "active" and window.isVisible()
+                and not window.loading and not self._rebuild_timer.isActive())
+
+    def _ping(self):
+        if not self._watching():
+            self._ping_pending = False
+            self._missed = 0
+            return
+        if self._ping_pending:
+            self._missed += 1
+            if self._missed >= self.MISSED_LIMIT:
+                logging.warning(f"El reproductor no responde desde hace {self._missed * self.HEARTBEAT_MS / 1000:.0f} s")
+                self._recover("hang")
+                return
+        self._ping_pending = True
+        page = self.window.webview.page()
+        page.runJavaScript(
+            "typeof floaterPosition === 'function' ? floaterPosition() : null",
+            lambda value, page=page: self._on_pong(page, value)
+        )
+
+    def _on_pong(self, page, value):
+        if page is not self.window.webview.page():
+            return
+        self._ping_pending = False
+        self._missed = 0
+        self.window.remember_position(value)
+
+    def _on_terminated(self, page, status, exit_code):
+        if page is not self.window.webview.page() or self.window.lifecycle_state == "discarded":
+            return
+        if status == QWebEnginePage.NormalTerminationStatus:
+            return
+        logging.warning(f"El renderer del reproductor terminó (estado {int(status)}, código {exit_code})")
+        self._recover("crash")
+
+    def _recover(self, reason):
+        if self._rebuild_timer.isActive():
+            return
+        window = self.window
+        self.failures[reason] += 1
+        playback_telemetry.record_renderer_failure(window.telemetry_id, reason)
+        window.diagnostics.add("recovery", f"{reason} en {window.last_position:.1f}s (fallo {self.total_failures})")
+        window.dump_diagnostics(f"renderer-{reason}", with_html=False)
+        if self.total_failures >= self.LOW_MEMORY_AFTER and not window.low_memory:
+            window.enter_low_memory_mode()
+        self._stable_timer.stop()
+        self._ping_pending = False
+        self._missed = 0
+        window.player_ready = False
+        delay_ms = min(self.MAX_BACKOFF_MS, self.BACKOFF_MS * 2 ** self.attempt) * random.uniform(0.8, 1.2)
+        self.attempt += 1
+        logging.warning(f"Reconstruyendo el reproductor en {delay_ms / 1000:.1f} s "
+                        f"(intento {self.attempt}, {self.total_failures} fallos en esta ventana)")
+        self._rebuild_timer.start(int(delay_ms))
+
+    def _rebuild(self):
+        self.window.rebuild_page()
+
+class VideoWindowPool(QObject):
+    """Mantiene ventanas VideoWindow ocultas y ya inicializadas para abrir videos al instante.
+
+    Con size = 0 el pool queda desactivado (útil en equipos con poca memoria)
+    y cada video crea su ventana como antes.
+    """
+    MAX_SIZE = 3
+
+    def __init__(self, size=1, parent=None):
+        super().__init__(parent)
+        self.size = max(0, min(size, self.MAX_SIZE))
+        self._idle = []
+        # Temporizador de 0 ms: se dispara cuando el event loop queda libre
+        self._refill_timer = QTimer(self)
+        self._refill_timer.setSingleShot(True)
+        self._refill_timer.setInterval(0)
+        self._refill_timer.timeout.connect(self._refill_one)
+
+    def set_size(self, size):
+        self.size = max(0, min(size, self.MAX_SIZE))
+        while len(self._idle) > self.size:
+            self._idle.pop().deleteLater()
+        self.schedule_refill()
+
+    def acquire(self, url, width, height, autoplay=True, max_quality="auto", start=0):
+        """Entrega una ventana precargada (o una nueva si el pool está vacío) con el video cargado"""
+        if self._idle:
+            window = self._idle.pop(0)
+            window.normal_size = (width, height)
+            window.resize(width, height)
+            window.max_quality = max_quality
+            window.load_video(url, autoplay, start)
+            logging.debug("VideoWindow entregada desde el pool")
+        else:
+            window = VideoWindow(url, width, height, autoplay, max_quality, start=start)
+        self.schedule_refill()
+        return window
+
+    def schedule_refill(self):
+        if self.size > 0 and len(self._idle) < self.size and not self._refill_timer.isActive():
+            self._refill_timer.start()
+
+    def _refill_one(self):
+        # Una ventana por iteración para no bloquear la interfaz
+        if len(self._idle) >= self.size:
+            return
+        window = VideoWindow()
+        window.warm_up()
+        self._idle.append(window)
+        logging.debug(f"Pool de ventanas: {len(self._idle)}/{self.size} precargadas")
+        self.schedule_refill()
+
+    def clear(self):
+        self._refill_timer.stop()
+        while self._idle:
+            self._idle.pop().deleteLater()
+
+cache_manager = ProfileCacheManager(CACHE_DIR)
+profile_manager = ProfileManager(cache_manager)
+profile_manager.profileCreated.connect(lambda: startup_trace.mark("Perfil de QtWebEngine configurado"))
+
+class SessionStore:
+    """Ventanas flotantes abiertas al salir, para restaurarlas en el siguiente arranque.
+
+    Un único JSON (escritura atómica) con una entrada por ventana: tipo (kind),
+    url, posición de reproducción, geometría, pin, opacidad y título. Los
+    mosaicos ("mosaic") llevan además urls, positions y focused, una por ficha;
+    url es la de la primera, así que versiones anteriores la abren como video suelto.
+    En las de NativeVideoWindow ("native") url es el archivo o enlace directo.
+    """
+    VERSION = 1
+    MAX_WINDOWS = 20
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError):
+            logging.warning("Sesión guardada ilegible; se ignora")
+            return []
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return []
+        entries = []
+        for entry in data.get("windows", [])[:self.MAX_WINDOWS]:
+            try:
+                geometry = [int(value) for value in entry["geometry"]][:4]
+                kind = entry.get("kind", "video")
+                valid_url = direct_media_source if kind == "native" else parse_youtube_url
+                if len(geometry) != 4 or kind not in ("video", "mosaic", "native") or valid_url(entry["url"]) is None:
+                    continue
+                extra = {}
+                if kind == "mosaic":
+                    tiles = [(url, position) for url, position in zip(entry["urls"], entry["positions"])
+                             if parse_youtube_url(url)][:MosaicWindow.MAX_TILES]
+                    if len(tiles) < 2:
+                        continue
+                    extra = {
+                        "urls": [url for url, _ in tiles],
+                        "positions": [max(0.0, float(position or 0)) for _, position in tiles],
+                        "focused": min(max(0, int(entry.get("focused") or 0)), len(tiles) - 1),
+                    }
+                entries.append({
+                    "kind": kind,
+                    **extra,
+                    "url": entry["url"],
+                    "position": max(0.0, float(entry.get("position") or 0)),
+                    "geometry": geometry,
+                    "pinned": bool(entry.get("pinned", True)),
+                    "opacity": min(1.0, max(0.2, float(entry.get("opacity") or 1.0))),
+                    "title": str(entry.get("title") or ""),
+                })
+            except (KeyError, TypeError, ValueError):
+                continue
+        return entries
+
+    def save(self, entries):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": self.VERSION, "windows": entries[:self.MAX_WINDOWS]}, f,
+                          ensure_ascii=False, indent=1)
+            os.replace(tmp, self.path)
+        except OSError:
+            logging.exception("No se pudo guardar la sesión")
+
+class SessionPlaceholder(QWidget):
+    """Ventana restaurada sin reproductor: miniatura, título y posición.
+
+    No crea QWebEngineView; al hacer clic o al activarse pide el reproductor
+    real con hydrateRequested y FloatingWindow la sustituye por el reproductor
+    (VideoWindow, MosaicWindow o NativeVideoWindow) en la misma geometría.
+    """
+    hydrateRequested = pyqtSignal(object)
+    closed = pyqtSignal(object)
+    # Activaciones al poco de mostrarse las provoca el gestor de ventanas, no el usuario
+    ACTIVATION_GRACE_MS = 1000
+
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+        self.key = history_key(state["url"])
+        self.hydrating = False
+        self._activation_armed = False
+        self.setWindowTitle("Reproductor Flotante")
+        self.setWindowFlags(Qt.Window | Qt.FramelessWindowHint
+                            | (Qt.WindowStaysOnTopHint if state["pinned"] else Qt.Widget))
+        # Que restaurar la sesión no active (y con ello hidrate) ninguna ventana
+        self.setAttribute(Qt.WA_ShowWithoutActivating)
+        self.setMinimumSize(200, 150)
+        self.setGeometry(*self.visible_geometry(state["geometry"]))
+        self.setWindowOpacity(state["opacity"])
+        self.setCursor(Qt.PointingHandCursor)
+        self.setStyleSheet("""
+            QWidget {
+                background: #121629;
+                border-radius: 8px;
+            }
+            QLabel {
+                color: #fffffe;
+                background: transparent;
+            }
+            QLabel#hint {
+                color: #b8c1ec;
+            }
+        """)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 12)
+        self.thumbnail = QLabel()
+        self.thumbnail.setAlignment(Qt.AlignCenter)
+        self.thumbnail.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        layout.addWidget(self.thumbnail, stretch=1)
+        self.title_label = QLabel()
+        self.title_label.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        layout.addWidget(self.title_label)
+        hint = QLabel(f"▶ Clic para continuar en {format_duration(state['position'])}")
+        hint.setObjectName("hint")
+        layout.addWidget(hint)
+        self.set_title(state["title"])
+        self._pixmap = None
+
+        close_btn = QPushButton("✕", self)
+        close_btn.setFixedSize(28, 28)
+        close_btn.setCursor(Qt.ArrowCursor)
+        close_btn.setToolTip("Descartar esta ventana de la sesión")
+        close_btn.setStyleSheet("""
+            QPushButton {
+                background: rgba(0,0,0,0.6);
+                color: white;
+                border: none;
+                font-size: 18px;
+                border-radius: 14px;
+            }
+            QPushButton:hover {
+                background: #e74c3c;
+            }
+        """)
+        close_btn.clicked.connect(self.close)
+        self.close_btn = close_btn
+
+    @staticmethod
+    def visible_geometry(geometry):
+        """La geometría guardada, o centrada en la pantalla principal si ya no cae en ninguna"""
+        x, y, width, height = geometry
+        for screen in QGuiApplication.screens():
+            if screen.availableGeometry().intersects(QRect(x, y, width, height)):
+                return x, y, width, height
+        available = QGuiApplication.primaryScreen().availableGeometry()
+        width, height = min(width, available.width()), min(height, available.height())
+        return (available.x() + (available.width() - width) // 2,
+                available.y() + (available.height() - height) // 2, width, height)
+
+    def set_title(self, title):
+        self.title_label.setText(self.title_label.fontMetrics().elidedText(
+            title or self.state["url"], Qt.ElideRight, max(50, self.width() - 24)
+        ))
+        if title:
+            self.state["title"] = title
+
+    def set_thumbnail(self, pixmap):
+        self._pixmap = pixmap
+        self._scale_thumbnail()
+
+    def _scale_thumbnail(self):
+        if self._pixmap is not None:
+            self.thumbnail.setPixmap(self._pixmap.scaled(
+                self.thumbnail.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation
+            ))
+
+    def request_hydration(self):
+        if not self.hydrating:
+            self.hydrating = True
+            self.hydrateRequested.emit(self)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.close_btn.move(self.width() - self.close_btn.width() - 5, 5)
+        self.set_title(self.state["title"])
+        self._scale_thumbnail()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.request_hydration()
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        QTimer.singleShot(self.ACTIVATION_GRACE_MS, self._arm_activation)
+
+    def _arm_activation(self):
+        self._activation_armed = True
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow() and self._activation_armed:
+            self.request_hydration()
+
+    def closeEvent(self, event):
+        super().closeEvent(event)
+        if event.isAccepted():
+            self.closed.emit(self)
+
+class FloatingWindow(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Reproductor Flotante para Videos de YouTube")
+        self.setFixedSize(600, 640)
+        
+        # Configuración por defecto
+        # Las escrituras se agrupan y se hacen fuera del hilo de la interfaz
+        self.settings = SettingsService("BochisLine", "YouTubeFloater", self)
+        embed_host_stats.attach(self.settings)
+        self.setWindowOpacity(self.settings.value("window_opacity", 1.0, type=float))
+        self.video_width = self.settings.value("video_width", 480, type=int)
+        self.video_height = self.settings.value("video_height", 270, type=int)
+        self.max_quality = self.settings.value("max_quality", "auto")
+        self.autoplay = self.settings.value("autoplay", True, type=bool)
+        self.save_history = self.settings.value("save_history", True, type=bool)
+        self.bg_color = self.settings.value("bg_color", "#232946")
+        self.pool_size = self.settings.value("pool_size", 1, type=int)
+        self.reuse_window = self.settings.value("reuse_window", False, type=bool)
+        self.max_players = self.settings.value("max_players", 4, type=int)
+        self.background_freeze = self.settings.value("background_freeze", True, type=bool)
+        self.freeze_delay = self.settings.value("freeze_delay", 10, type=int)
+        self.discard_delay = self.settings.value("discard_delay", 600, type=int)
+        self.load_timeout = self.settings.value("load_timeout", 8, type=int)
+        self.race_hosts = self.settings.value("race_hosts", True, type=bool)
+        LoadSupervisor.configure(self.load_timeout, self.race_hosts)
+        self.cache_quota_mb = self.settings.value("cache_quota_mb", 500, type=int)
+        cache_manager.set_quota(self.cache_quota_mb)
+        self.runtime_profile = self.settings.value("runtime_profile", "auto")
+        self.restore_session = self.settings.value("restore_session", True, type=bool)
+        self.native_mmap = self.settings.value("native_mmap", False, type=bool)
+        # Migración y recorte del almacenamiento antes de que QtWebEngine lo abra
+        cache_manager.start_maintenance()
+        self.history = HistoryStore(os.path.join(CACHE_DIR, "history.jsonl"))
+        self._migrate_legacy_history()
+        
         self.update_style()
 
         layout = QVBoxLayout()
@@ -626,44 +3331,173 @@ class FloatingWindow(QWidget):
         """)
         clear_btn.clicked.connect(self.url_input.clear)
         button_layout.addWidget(clear_btn)
+
+        incognito_btn = QPushButton("🕶 Incógnito")
+        incognito_btn.setToolTip("Abrir en una ventana sin cookies ni caché en disco y sin guardar en el historial")
+        incognito_btn.setStyleSheet("""
+            QPushButton {
+                background: #121629;
+                min-width: 110px;
+            }
+            QPushButton:hover {
+                background: #b8c1ec;
+                color: #232946;
+            }
+        """)
+        incognito_btn.clicked.connect(self.open_incognito)
+        button_layout.addWidget(incognito_btn)
+
+        mosaic_btn = QPushButton("🧩 Mosaico")
+        mosaic_btn.setToolTip("Ver varios videos a la vez en una sola ventana (un enlace por línea)")
+        mosaic_btn.setStyleSheet("""
+            QPushButton {
+                background: #121629;
+                min-width: 100px;
+            }
+            QPushButton:hover {
+                background: #b8c1ec;
+                color: #232946;
+            }
+        """)
+        mosaic_btn.clicked.connect(self.ask_mosaic)
         layout.addLayout(button_layout)
 
+        # Acciones secundarias en su propia fila para no recortar el botón principal
+        secondary_layout = QHBoxLayout()
+        secondary_layout.addStretch()
+        secondary_layout.addWidget(mosaic_btn)
+        layout.addLayout(secondary_layout)
+
+        # Títulos, canales y miniaturas en segundo plano (oEmbed + caché en disco),
+        # para el historial y las ventanas restauradas de la sesión anterior
+        self.metadata = MetadataService(os.path.join(CACHE_DIR, "metadata"), self)
+        self.metadata.metadataReady.connect(self.apply_metadata)
+
         # Historial de videos
-        if self.save_history and self.video_history:
-            history_label = QLabel("📚 Historial reciente:")
+        if self.save_history:
+            history_label = QLabel("📚 Historial:")
             history_label.setFont(QFont("Segoe UI", 11))
             layout.addWidget(history_label)
-            
-            self.history_list = QListWidget()
-            self.history_list.setMaximumHeight(120)
+
+            self.history_search = QLineEdit()
+            self.history_search.setPlaceholderText("🔍 Buscar por título, id o enlace...")
+            self.history_search.setClearButtonEnabled(True)
+            layout.addWidget(self.history_search)
+
+            # Modelo + vista virtualizada: sólo se pintan las filas visibles
+            self.history_model = HistoryModel(self.history, self, metadata=self.metadata)
+            self.history_search.textChanged.connect(self.history_model.set_filter)
+            QTimer.singleShot(1000, self.history_model.prepare_index)
+            self.history_list = QListView()
+            self.history_list.setModel(self.history_model)
+            self.history_list.setUniformItemSizes(True)
+            self.history_list.setIconSize(QSize(64, 36))
+            self.history_list.setTextElideMode(Qt.ElideRight)
+            self.history_list.setMaximumHeight(180)
             self.history_list.setStyleSheet("""
-                QListWidget {
+                QListView {
                     background: #121629;
                     border: 2px solid #b8c1ec;
                     border-radius: 8px;
                     padding: 5px;
                 }
-                QListWidget::item {
+                QListView::item {
                     padding: 8px;
                     border-radius: 4px;
                     color: #fffffe;
                 }
-                QListWidget::item:hover {
+                QListView::item:hover {
                     background: #2d3561;
                 }
-                QListWidget::item:selected {
+                QListView::item:selected {
                     background: #b8c1ec;
                     color: #232946;
                 }
             """)
-            self.history_list.itemDoubleClicked.connect(self.open_from_history)
-            self.update_history_list()
+            self.history_list.doubleClicked.connect(self.open_from_history)
             layout.addWidget(self.history_list)
 
         layout.addStretch()
+
+        # Estado del perfil de cProfile (Ctrl+Shift+P); oculto hasta que se usa
+        self.profiler_label = QLabel()
+        self.profiler_label.setObjectName("creator")
+        self.profiler_label.hide()
+        layout.addWidget(self.profiler_label)
+
+        # Estado de reproductores/renderers vivos
+        self.players_label = QLabel()
+        self.players_label.setObjectName("creator")
+        layout.addWidget(self.players_label)
+
         self.setLayout(layout)
-        self.floating_windows = []
+        self.player_manager = PlayerManager(self.max_players, self)
+        self.player_manager.statsChanged.connect(self.update_players_label)
+        self.update_players_label(self.player_manager.stats())
+        self.lifecycle_policy = PlayerLifecyclePolicy(
+            self.player_manager, self.background_freeze, self.freeze_delay, self.discard_delay, self
+        )
+
+        # Pool de ventanas precargadas; se rellena cuando el event loop está libre
+        # y QtWebEngine ya está cargado (ver ensure_webengine)
+        self.window_pool = VideoWindowPool(self.pool_size, self)
+        # Sesión: ventanas abiertas al salir; vuelven como SessionPlaceholder sin reproductor
+        self.session = SessionStore(os.path.join(CACHE_DIR, "session.json"))
+        self.placeholders = []
+        self._session_saved = False
+        self.metadata.metadataReady.connect(self._update_placeholder_title)
+        self.metadata.thumbnailReady.connect(self._update_placeholder_thumbnail)
+        QApplication.instance().aboutToQuit.connect(self.save_session)
+        QApplication.instance().aboutToQuit.connect(self.window_pool.clear)
+        QApplication.instance().aboutToQuit.connect(self.history.close)
+
+        # Arranque por etapas: primero el lanzador, después QtWebEngine en segundo plano
+        # (en el primer momento libre o en cuanto se enfoca/pega algo en url_input)
+        self._webengine_failed = False
+        self.url_input.installEventFilter(self)
+        self.url_input.textChanged.connect(self.schedule_webengine_load)
+
+        # Atajos ocultos de diagnóstico: panel de métricas y perfilado con cProfile
+        self.metrics_dialog = None
+        QShortcut(QKeySequence("Ctrl+Shift+M"), self, activated=self.open_metrics)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=self.toggle_profiler)
+        startup_trace.mark("Lanzador construido")
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not webengine_loaded() and not self._webengine_failed:
+            # Dejar que el lanzador se pinte antes de cargar Chromium
+            QTimer.singleShot(150, self.ensure_webengine)
+
+    def eventFilter(self, obj, event):
+        if obj is self.url_input and event.type() == QEvent.FocusIn:
+            self.schedule_webengine_load()
+        return super().eventFilter(obj, event)
 
+    def schedule_webengine_load(self, *args):
+        if not webengine_loaded() and not self._webengine_failed:
+            QTimer.singleShot(0, self.ensure_webengine)
+
+    def ensure_webengine(self):
+        """Carga QtWebEngine (una vez) y empieza a precargar ventanas"""
+        if webengine_loaded():
+            return True
+        try:
+            load_webengine()
+        except ImportError:
+            if not self._webengine_failed:
+                logging.exception("No se pudo cargar QtWebEngine")
+            self._webengine_failed = True
+            return False
+        self.window_pool.schedule_refill()
+        QTimer.singleShot(0, self._finish_startup_trace)
+        return True
+
+    def _finish_startup_trace(self):
+        startup_trace.mark("QtWebEngine listo")
+        startup_trace.report()
+
+    @timed("update_style")
     def update_style(self):
         self.setStyleSheet(f"""
             QWidget {{
@@ -709,25 +3543,54 @@ class FloatingWindow(QWidget):
             }}
         """)
 
+    @timed("update_history_list")
     def update_history_list(self):
-        if hasattr(self, 'history_list'):
-            self.history_list.clear()
-            for url in reversed(self.video_history[-10:]):  # Mostrar últimos 10
-                item = QListWidgetItem(f"🎥 {url[:60]}...")
-                item.setData(Qt.UserRole, url)
-                self.history_list.addItem(item)
+        if hasattr(self, 'history_model'):
+            self.history_model.reload()
 
     def add_to_history(self, url):
         if self.save_history:
-            if url in self.video_history:
-                self.video_history.remove(url)
-            self.video_history.append(url)
-            self.video_history = self.video_history[-20:]  # Mantener últimos 20
-            self.save_settings()
-            self.update_history_list()
-
-    def open_from_history(self, item):
-        url = item.data(Qt.UserRole)
+            if hasattr(self, 'history_model'):
+                self.history_model.record_visit(url)
+            else:
+                self.history.add(url)
+
+    def apply_video_info(self, url, info):
+        """Datos que la IFrame API da al reproducir (sobre todo la duración)"""
+        key = history_key(url)
+        if key:
+            self.apply_metadata(key, {"duration": int(info["duration"]), **{
+                name: info[name] for name in ("title", "channel") if info.get(name)
+            }})
+
+    def apply_metadata(self, key, meta):
+        """Guarda en el historial los datos que faltan o cambiaron (título, canal, duración)"""
+        entry = self.history.get(key)
+        if entry is None:
+            return
+        fields = {
+            name: meta[name] for name in ("title", "channel", "duration")
+            if meta.get(name) and entry.get(name) != meta[name]
+        }
+        if fields:
+            self.history.update_meta(key, **fields)
+            if hasattr(self, 'history_model'):
+                self.history_model.refresh_key(key)
+
+    def _migrate_legacy_history(self):
+        """Pasa la lista video_history de QSettings (versiones anteriores) al HistoryStore"""
+        legacy = self.settings.value("video_history", None)
+        if legacy is None:
+            return
+        if isinstance(legacy, str):
+            legacy = [legacy]
+        if isinstance(legacy, list) and not len(self.history):
+            self.history.migrate(legacy)
+            logging.info(f"Historial migrado desde QSettings: {len(legacy)} entradas")
+        self.settings.remove("video_history")
+
+    def open_from_history(self, index):
+        url = index.data(HistoryModel.UrlRole)
         self.url_input.setText(url)
         self.open_video()
 
@@ -735,34 +3598,438 @@ class FloatingWindow(QWidget):
         dlg = ConfigDialog(self)
         dlg.exec_()
 
+    def restore_windows(self):
+        """Vuelve a mostrar las ventanas de la sesión anterior como marcadores ligeros"""
+        entries = self.session.load()
+        for state in entries:
+            placeholder = SessionPlaceholder(state)
+            placeholder.hydrateRequested.connect(self.hydrate)
+            placeholder.closed.connect(self._discard_placeholder)
+            pixmap = self.metadata.pixmap(placeholder.key)
+            if pixmap is not None:
+                placeholder.set_thumbnail(pixmap)
+            elif state["kind"] != "native":
+                # Los archivos locales y enlaces directos no tienen miniatura en YouTube
+                self.metadata.request(placeholder.key, state["url"])
+            self.placeholders.append(placeholder)
+            placeholder.show()
+        if entries:
+            # El foco sigue en el lanzador: ningún marcador se convierte en reproductor solo
+            self.activateWindow()
+            logging.info(f"Sesión restaurada: {len(entries)} ventanas (sin reproductor hasta usarlas)")
+            startup_trace.mark("Sesión restaurada")
+
+    def hydrate(self, placeholder):
+        """Sustituye el marcador por el reproductor real (VideoWindow, MosaicWindow o NativeVideoWindow) en la misma geometría y posición"""
+        state = placeholder.state
+        if state["kind"] != "native" and not self.ensure_webengine():
+            placeholder.hydrating = False
+            self.notify(QMessageBox.critical, "Error", "No se pudo cargar QtWebEngine. Instala PyQtWebEngine.")
+            return
+        geometry = placeholder.geometry()
+        if state["kind"] == "native":
+            source = direct_media_source(state["url"])
+            if source is None:
+                placeholder.hydrating = False
+                self.notify(QMessageBox.warning, "Error", f"El archivo ya no existe:\n{state['url']}")
+                return
+            window = self.create_native(source, geometry.width(), geometry.height(), start=state["position"])
+            if window is None:
+                placeholder.hydrating = False
+                return
+            if not state["pinned"]:
+                window.toggle_pin()
+        elif state["kind"] == "mosaic":
+            window = MosaicWindow(
+                state["urls"], geometry.width(), geometry.height(), self.autoplay, self.max_quality,
+                starts=state["positions"], focused=state["focused"]
+            )
+        else:
+            window = self.window_pool.acquire(
+                state["url"], geometry.width(), geometry.height(), self.autoplay, self.max_quality,
+                start=int(state["position"])
+            )
+            window.video_title = state["title"]
+            if not state["pinned"]:
+                window.toggle_pin()
+            window.videoInfo.connect(self.apply_video_info)
+        window.setGeometry(geometry)
+        window.setWindowOpacity(state["opacity"])
+        window.show()
+        window.raise_()
+        window.activateWindow()
+        self.player_manager.register(window)
+        self.placeholders.remove(placeholder)
+        placeholder.deleteLater()
+        placeholder.hide()
+
+    def _discard_placeholder(self, placeholder):
+        if placeholder in self.placeholders:
+            self.placeholders.remove(placeholder)
+            placeholder.deleteLater()
+
+    def _update_placeholder_title(self, key, meta):
+        for placeholder in self.placeholders:
+            # Un mosaico conserva su título aunque la miniatura sea la de su primer video
+            if placeholder.key == key and meta.get("title") and placeholder.state["kind"] == "video":
+                placeholder.set_title(meta["title"])
+
+    def _update_placeholder_thumbnail(self, key):
+        for placeholder in self.placeholders:
+            if placeholder.key == key:
+                pixmap = self.metadata.pixmap(key)
+                if pixmap is not None:
+                    placeholder.set_thumbnail(pixmap)
+
+    def save_session(self):
+        """Guarda las ventanas abiertas (y los marcadores sin usar) para el próximo arranque"""
+        if self._session_saved:
+            return
+        self._session_saved = True
+        entries = []
+        if self.restore_session:
+            entries = [state for state in (w.session_state() for w in self.player_manager.windows()) if state]
+            entries += [placeholder.state for placeholder in self.placeholders]
+        self.session.save(entries)
+
+    def closeEvent(self, event):
+        """Cerrar el lanzador cierra la aplicación; antes se guarda la sesión"""
+        self.save_session()
+        super().closeEvent(event)
+        for window in list(self.placeholders):
+            window.close()
+        self.player_manager.close_all()
+
+    def open_metrics(self):
+        if self.metrics_dialog is None:
+            self.metrics_dialog = MetricsDialog(self)
+        self.metrics_dialog.show()
+        self.metrics_dialog.raise_()
+
+    def toggle_profiler(self):
+        path = profiler_toggle.toggle()
+        state = f"guardado en {path}" if path else "iniciado"
+        self.profiler_label.setText(f"⏱ Perfil {state}")
+        self.profiler_label.show()
+
+    @timed("open_video")
     def open_video(self):
-        url = self.url_input.text().strip()
-        if url and url.startswith("http"):
-            video_window = VideoWindow(url, self.video_width, self.video_height, self.autoplay)
-            video_window.show()
-            self.floating_windows.append(video_window)
+        self.open_url(self.url_input.text().strip())
+
+    def open_incognito(self):
+        self.open_url(self.url_input.text().strip(), incognito=True)
+
+    def ask_mosaic(self):
+        """Pide los enlaces del mosaico (uno por línea), empezando por el del campo de URL"""
+        text, ok = QInputDialog.getMultiLineText(
+            self, "Mosaico", f"Enlaces de YouTube, uno por línea (hasta {MosaicWindow.MAX_TILES}):",
+            self.url_input.text().strip()
+        )
+        if ok:
+            self.open_mosaic(text.split(), interactive=True)
+
+    def open_mosaic(self, urls, interactive=False):
+        """Abre los videos de urls juntos en una MosaicWindow (una sola página y renderer)"""
+        urls = [url for url in urls if parse_youtube_url(url)]
+        if len(urls) < 2:
+            if interactive:
+                self.notify(QMessageBox.warning, "Error", "El mosaico necesita al menos dos enlaces válidos de YouTube")
+            else:
+                logging.warning("Mosaico ignorado: hacen falta al menos dos enlaces válidos")
+            return None
+        if not self.ensure_webengine():
+            if interactive:
+                self.notify(QMessageBox.critical, "Error", "No se pudo cargar QtWebEngine. Instala PyQtWebEngine.")
+            return None
+        if len(urls) > MosaicWindow.MAX_TILES:
+            logging.warning(f"El mosaico admite {MosaicWindow.MAX_TILES} videos; se ignoran {len(urls) - MosaicWindow.MAX_TILES}")
+        window = MosaicWindow(
+            urls, self.video_width * 2, self.video_height * 2, self.autoplay, self.max_quality
+        )
+        window.show()
+        self.player_manager.register(window)
+        for url in urls[:MosaicWindow.MAX_TILES]:
             self.add_to_history(url)
-            QMessageBox.information(self, "¡Éxito!", "Video abierto en ventana flotante\n\n💡 Puedes arrastrarla y moverla libremente")
+        return window
+
+    def open_url(self, url, interactive=True, incognito=False):
+        """Abre url en una ventana flotante (o en la reutilizable).
+
+        interactive=False se usa para URLs que llegan por línea de comandos o de
+        otra instancia: los errores van al log en lugar de a un diálogo modal.
+        incognito=True abre una ventana con perfil propio sin disco, fuera del
+        pool y sin pasar por el historial. Los archivos locales y enlaces
+        directos a video se abren con el reproductor nativo (open_native).
+        """
+        source = direct_media_source(url)
+        if source is not None:
+            self.open_native(source, interactive)
+            return
+        if url and parse_youtube_url(url):
+            if not self.ensure_webengine():
+                if interactive:
+                    self.notify(QMessageBox.critical, "Error", "No se pudo cargar QtWebEngine. Instala PyQtWebEngine.")
+                return
+            reusable = self.reusable_window() if self.reuse_window and not incognito else None
+            if reusable:
+                # Cambio de video en la misma ventana vía IFrame API
+                reusable.switch_video(url, self.autoplay)
+                if reusable.isMinimized():
+                    reusable.showNormal()
+                reusable.raise_()
+                self.add_to_history(url)
+                return
+            if incognito:
+                video_window = VideoWindow(
+                    url, self.video_width, self.video_height, self.autoplay, self.max_quality, incognito=True
+                )
+                video_window.setWindowTitle("🕶 " + video_window.windowTitle())
+            else:
+                video_window = self.window_pool.acquire(
+                    url, self.video_width, self.video_height, self.autoplay, self.max_quality
+                )
+            video_window.show()
+            self.player_manager.register(video_window)
+            if not incognito:
+                video_window.videoInfo.connect(self.apply_video_info)
+                self.add_to_history(url)
+            if interactive:
+                self.notify(QMessageBox.information, "¡Éxito!", "Video abierto en ventana flotante\n\n💡 Puedes arrastrarla y moverla libremente")
+            else:
+                video_window.raise_()
+                video_window.activateWindow()
+        elif interactive:
+            self.notify(QMessageBox.warning, "Error", "Por favor ingresa una URL válida de YouTube, un archivo de video o un enlace directo (.mp4, .webm...)")
         else:
-            QMessageBox.warning(self, "Error", "Por favor ingresa una URL válida de YouTube")
+            logging.warning(f"URL ignorada: {url!r}")
+
+    def open_native(self, source, interactive=True):
+        """Abre un archivo local o enlace directo en una NativeVideoWindow, sin Chromium"""
+        window = self.create_native(source, self.video_width, self.video_height, interactive=interactive)
+        if window is None:
+            return None
+        window.show()
+        self.player_manager.register(window)
+        if not interactive:
+            window.raise_()
+            window.activateWindow()
+        return window
 
+    def create_native(self, source, width, height, start=0, interactive=True):
+        """NativeVideoWindow todavía sin mostrar, o None si QtMultimedia no carga"""
+        try:
+            return NativeVideoWindow(source, width, height, self.autoplay, self.native_mmap, start=start)
+        except ImportError:
+            logging.exception("No se pudo cargar QtMultimedia")
+            if interactive:
+                self.notify(QMessageBox.critical, "Error", "No se pudo cargar QtMultimedia para reproducir el archivo.")
+            return None
+
+    def notify(self, show, title, text):
+        """Muestra el diálogo modal show (QMessageBox.information, ...) al volver al event loop.
+
+        Así las mediciones de open_video no incluyen el tiempo que el diálogo está abierto.
+        """
+        QTimer.singleShot(0, lambda: show(self, title, text))
+
+    def open_urls(self, urls):
+        if not urls:
+            # Otra invocación sin argumentos: traer el lanzador al frente
+            self.showNormal()
+            self.raise_()
+            self.activateWindow()
+        for url in urls:
+            self.open_url(url.strip(), interactive=False)
+
+    def update_players_label(self, stats):
+        self.players_label.setText(f"🎞 Reproductores abiertos: {stats['players']} · Renderers: {stats['renderers']}")
+
+    def reusable_window(self):
+        """Última ventana flotante todavía abierta, para el modo "reutilizar ventana" """
+        for window in reversed(self.player_manager.windows()):
+            if isinstance(window, VideoWindow) and window.isVisible() and not window.incognito:
+                return window
+        return None
+
+    @timed("save_settings")
     def save_settings(self):
         self.settings.setValue("video_width", self.video_width)
         self.settings.setValue("video_height", self.video_height)
+        self.settings.setValue("max_quality", self.max_quality)
         self.settings.setValue("autoplay", self.autoplay)
         self.settings.setValue("save_history", self.save_history)
         self.settings.setValue("bg_color", self.bg_color)
-        self.settings.setValue("video_history", self.video_history)
+        self.settings.setValue("pool_size", self.pool_size)
+        self.settings.setValue("reuse_window", self.reuse_window)
+        self.settings.setValue("max_players", self.max_players)
+        self.settings.setValue("background_freeze", self.background_freeze)
+        self.settings.setValue("freeze_delay", self.freeze_delay)
+        self.settings.setValue("discard_delay", self.discard_delay)
+        self.settings.setValue("load_timeout", self.load_timeout)
+        self.settings.setValue("race_hosts", self.race_hosts)
+        self.settings.setValue("cache_quota_mb", self.cache_quota_mb)
+        self.settings.setValue("runtime_profile", self.runtime_profile)
+        self.settings.setValue("restore_session", self.restore_session)
+        self.settings.setValue("native_mmap", self.native_mmap)
+
+# Nombre del socket local de la instancia principal (uno por usuario)
+INSTANCE_SERVER_NAME = f"YouTubeFloater-{getpass.getuser()}"
+
+def send_to_running_instance(urls, timeout_ms=500):
+    """Entrega urls a la instancia que ya está corriendo. Devuelve False si no hay ninguna"""
+    socket = QLocalSocket()
+    socket.connectToServer(INSTANCE_SERVER_NAME)
+    if not socket.waitForConnected(timeout_ms):
+        return False
+    socket.write(json.dumps({"urls": urls}).encode("utf-8") + b"\n")
+    socket.waitForBytesWritten(timeout_ms)
+    socket.disconnectFromServer()
+    return True
+
+class InstanceServer(QObject):
+    """Socket local de la instancia principal: recibe URLs de invocaciones posteriores.
+
+    Si el socket ya existe sólo se borra cuando nadie lo atiende; si hay una
+    instancia principal (aunque esté ocupada) queda owner_alive = True.
+    """
+    urlsReceived = pyqtSignal(list)
+
+    # Espera para decidir si el dueño del socket sigue vivo (más que el reenvío rápido)
+    PROBE_MS = 3000
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._buffers = {}
+        self.owner_alive = False
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        if not self.server.listen(INSTANCE_SERVER_NAME):
+            if self._probe_owner():
+                self.owner_alive = True
+                logging.warning("El socket de instancia única pertenece a otra instancia que sigue viva; no se sustituye")
+                return
+            # Socket huérfano de una ejecución que terminó mal
+            QLocalServer.removeServer(INSTANCE_SERVER_NAME)
+            if not self.server.listen(INSTANCE_SERVER_NAME):
+                logging.warning(f"No se pudo abrir el socket de instancia única: {self.server.errorString()}")
+
+    def _probe_owner(self):
+        """True salvo que conectar falle porque no hay nadie escuchando"""
+        socket = QLocalSocket()
+        socket.connectToServer(INSTANCE_SERVER_NAME)
+        if socket.waitForConnected(self.PROBE_MS):
+            socket.disconnectFromServer()
+            return True
+        return socket.error() not in (QLocalSocket.ServerNotFoundError, QLocalSocket.ConnectionRefusedError)
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket):
+        self._buffers[socket] += bytes(socket.readAll())
+
+    def _on_disconnected(self, socket):
+        data = self._buffers.pop(socket, b"") + bytes(socket.readAll())
+        socket.deleteLater()
+        for line in data.splitlines():
+            try:
+                urls = json.loads(line.decode("utf-8")).get("urls", [])
+            except ValueError:
+                logging.warning("Mensaje inválido en el socket de instancia única")
+                continue
+            logging.info(f"URLs recibidas de otra instancia: {urls}")
+            self.urlsReceived.emit(urls)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Reproductor flotante para videos de YouTube")
+    parser.add_argument("urls", nargs="*", help="videos (enlaces de YouTube, archivos o enlaces directos) a abrir al iniciar")
+    parser.add_argument("--startup-trace", action="store_true",
+                        help="mide y muestra el tiempo de cada fase del arranque")
+    parser.add_argument("--new-instance", action="store_true",
+                        help="no reenviar las URLs a una instancia ya abierta")
+    parser.add_argument("--runtime-profile", choices=["auto"] + list(RUNTIME_PROFILES),
+                        help="perfil de Chromium para esta ejecución (por defecto el de la configuración)")
+    parser.add_argument("--telemetry-file", metavar="RUTA",
+                        help="exporta la telemetría de reproducción a RUTA (.json o .prom) cada 15 s y al salir")
+    # Qt procesa sus propias opciones (-style, -platform, ...) desde argv
+    args, _ = parser.parse_known_args(argv[1:])
+    # Quedarse con lo que se sabe abrir (así se descartan valores sueltos de opciones
+    # de Qt como "-platform offscreen"); los archivos locales van con ruta absoluta
+    # por si se reenvían a otra instancia
+    urls = []
+    for url in args.urls:
+        if parse_youtube_url(url):
+            urls.append(url)
+            continue
+        source = direct_media_source(url)
+        if source is not None:
+            urls.append(source.toLocalFile() if source.isLocalFile() else url)
+    args.urls = urls
+    return args
 
 if __name__ == "__main__":
-    # Environment adjustments and logging for diagnostics
-    logging.basicConfig(level=logging.INFO)
-    os.environ.setdefault("QTWEBENGINE_DISABLE_SANDBOX", "1")
-    # Chromium flags: disable gpu for compatibility on some systems
-    os.environ.setdefault("QTWEBENGINE_CHROMIUM_FLAGS", "--disable-gpu")
+    args = parse_args(sys.argv)
+    # Log asíncrono (consola + perf.log) para no escribir desde el hilo de la interfaz
+    setup_logging(logging.INFO)
+    startup_trace.enabled = args.startup_trace
+    startup_trace.mark("Módulos importados")
+    if os.environ.get("YOUTUBE_FLOATER_PROFILE"):
+        profiler_toggle.start()
 
+    # Necesario para poder importar QtWebEngine después de crear la QApplication
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     app.setApplicationName("Reproductor Flotante YouTube")
+    startup_trace.mark("QApplication creada")
+    app.aboutToQuit.connect(profiler_toggle.stop)
+
+    # Instancia única: si ya hay una abierta, le pasamos las URLs y salimos
+    if not args.new_instance and send_to_running_instance(args.urls):
+        logging.info("Ya hay una instancia abierta; URLs reenviadas")
+        sys.exit(0)
+    instance_server = None if args.new_instance else InstanceServer(app)
+    if instance_server and instance_server.owner_alive:
+        # La instancia principal estaba ocupada: reintentar con más margen antes de ir por libre
+        if send_to_running_instance(args.urls, InstanceServer.PROBE_MS):
+            logging.info("Ya hay una instancia abierta; URLs reenviadas")
+            sys.exit(0)
+        instance_server = None
+
+    # Flags de Chromium: perfil de la línea de comandos o de la configuración (se prueba la GPU antes).
+    # Después del reenvío: un proceso que sólo pasa URLs no debe probar la GPU ni dejar la marca pendiente
+    chromium_runtime.select(args.runtime_profile or QSettings("BochisLine", "YouTubeFloater").value("runtime_profile", "auto"))
+    app.aboutToQuit.connect(chromium_runtime.confirm)
+
+    # Umbral del detector de bloqueos en ms (0 lo desactiva)
+    stall_env = os.environ.get("YOUTUBE_FLOATER_STALL_MS", "250")
+    try:
+        stall_ms = int(stall_env or 0)
+    except ValueError:
+        logging.warning(f"YOUTUBE_FLOATER_STALL_MS no es un número de ms ({stall_env!r}); se usa 250")
+        stall_ms = 250
+    if stall_ms > 0:
+        stall_detector = StallDetector(stall_ms, parent=app)
+        stall_detector.start()
+        app.aboutToQuit.connect(stall_detector.stop)
+
+    if args.telemetry_file:
+        telemetry_timer = QTimer(app)
+        telemetry_timer.setInterval(15000)
+        telemetry_timer.timeout.connect(lambda: playback_telemetry.export(args.telemetry_file))
+        telemetry_timer.start()
+        app.aboutToQuit.connect(lambda: playback_telemetry.export(args.telemetry_file))
+
     window = FloatingWindow()
     window.show()
+    startup_trace.mark("Lanzador visible")
+    if window.restore_session:
+        QTimer.singleShot(0, window.restore_windows)
+    if instance_server:
+        instance_server.urlsReceived.connect(window.open_urls)
+    if args.urls:
+        QTimer.singleShot(0, lambda: window.open_urls(args.urls))
     sys.exit(app.exec_())
@@ -0,0 +1,110 @@
+"""Micro-benchmark del parser de URLs (youtube_url) frente al bucle de regex anterior.
+
+Antes de medir comprueba que el parser da el resultado esperado para cada URL
+de youtube_url_corpus.json (el mismo corpus que usa tests/test_youtube_url.py).
+
+Se informa del parser con y sin memo: sin memo una URL nueva cuesta algo más
+que el bucle anterior; la ventaja está en las URLs repetidas (historial,
+deduplicación, embed), que salen del LRU.
+
+Uso:
+    python benchmarks/bench_url_parser.py [--repeat 20000]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import youtube_url  # noqa: E402
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "youtube_url_corpus.json")
+
+# Implementación anterior de VideoWindow.youtube_embed_url, como referencia
+_LEGACY_PATTERNS = [
+    r"youtu\.be/([a-zA-Z0-9_-]+)",
+    r"youtube\.com/watch\?v=([a-zA-Z0-9_-]+)",
+    r"youtube\.com/embed/([a-zA-Z0-9_-]+)",
+    r"youtube\.com/shorts/([a-zA-Z0-9_-]+)",
+]
+
+
+def legacy_video_id(url):
+    for pattern in _LEGACY_PATTERNS:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check_corpus(corpus):
+    failures = []
+    for case in corpus:
+        parsed = youtube_url.parse_youtube_url(case["url"])
+        if case.get("invalid"):
+            if parsed is not None:
+                failures.append((case["url"], "se esperaba None", parsed))
+            continue
+        got = (parsed.video_id, parsed.playlist_id, parsed.start) if parsed else None
+        expected = (case["video_id"], case["playlist_id"], case["start"])
+        if got != expected:
+            failures.append((case["url"], expected, got))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20000, help="llamadas por medición")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    failures = check_corpus(corpus)
+    for url, expected, got in failures:
+        print(f"FALLO {url!r}: esperado {expected}, obtenido {got}")
+    if failures:
+        return 1
+    print(f"Corpus OK ({len(corpus)} URLs)")
+
+    urls = [case["url"] for case in corpus]
+    rounds = max(1, args.repeat // len(urls))
+    calls = rounds * len(urls)
+
+    def run_legacy():
+        for url in urls:
+            legacy_video_id(url)
+
+    def run_uncached():
+        youtube_url.parse_youtube_url.cache_clear()
+        for url in urls:
+            youtube_url.parse_youtube_url(url)
+
+    def run_cached():
+        for url in urls:
+            youtube_url.parse_youtube_url(url)
+
+    def run_batch():
+        youtube_url.parse_many(urls)
+
+    results = {}
+    for name, func in [("legacy (4 regex)", run_legacy), ("parser sin memo", run_uncached),
+                       ("parser con memo", run_cached), ("parse_many", run_batch)]:
+        elapsed = timeit.timeit(func, number=rounds)
+        results[name] = elapsed / calls * 1e6
+        print(f"{name:<18} {results[name]:7.2f} µs/URL")
+    legacy = results["legacy (4 regex)"]
+    for name in ("parser sin memo", "parser con memo"):
+        print(f"{name} frente a legacy: x{legacy / results[name]:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
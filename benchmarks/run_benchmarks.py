@@ -0,0 +1,677 @@
+"""Benchmarks headless (QT_QPA_PLATFORM=offscreen) de las rutas críticas de la aplicación.
+
+El reproductor de YouTube se sustituye por un servidor local (standin_server),
+así que las medidas no dependen de la red. Se mide:
+
+  startup   arranque en frío del lanzador y tiempo hasta tener QtWebEngine listo
+  window    construcción de VideoWindow y tiempo de loadStarted a loadFinished
+  paths     página contenedora por floater:// y con setHtml frente a load() directo del embed
+  memory    memoria (proceso + renderers) por ventana abierta
+  history   operaciones del historial con 10, 1k y 100k entradas
+  metadata  miniaturas y metadatos del historial: red (oEmbed), caché en disco y en memoria
+  mosaic    N videos en un mosaico (una página) frente a N ventanas separadas
+  session   restaurar una sesión de 10 ventanas como marcadores (sin reproductor)
+  native    reproductor nativo (QtMultimedia) de un archivo local frente a una VideoWindow
+
+Los flags de Chromium salen del perfil de ejecución de la aplicación
+(--runtime-profile, "compat" por defecto). Con --profiles se repite la suite
+en un proceso por perfil y las métricas llevan el perfil como prefijo
+("low-memory.memory.per_window_mb"), para comparar su coste en CPU y memoria.
+
+Uso:
+    python benchmarks/run_benchmarks.py [--only startup,history] [--output resultados.json]
+    python benchmarks/run_benchmarks.py --compare baseline.json [--threshold 0.2]
+    python benchmarks/run_benchmarks.py --only startup,memory --profiles compat,low-memory,gpu,throughput
+
+Con --compare se marca como regresión toda métrica que empeore más que
+--threshold (20 % por defecto) y el proceso termina con código 1.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "Youtube Now.py")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin_server import StandInServer  # noqa: E402
+
+ALL_BENCHMARKS = ["startup", "window", "paths", "memory", "history", "metadata", "mosaic", "session", "native"]
+SAMPLE_URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+# Perfiles de ejecución de la aplicación (RUNTIME_PROFILES en "Youtube Now.py")
+RUNTIME_PROFILES = ["compat", "low-memory", "gpu", "throughput"]
+
+
+class Results:
+    """Métricas agrupadas por nombre; todas son 'menos es mejor'"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.skipped = {}
+
+    def add(self, name, samples, unit):
+        samples = [float(value) for value in samples if value is not None]
+        if not samples:
+            return
+        self.metrics[name] = {
+            "unit": unit,
+            "median": statistics.median(samples),
+            "min": min(samples),
+            "max": max(samples),
+            "samples": samples,
+        }
+        print(f"  {name:<44} {statistics.median(samples):10.2f} {unit}  (n={len(samples)})")
+
+    def merge(self, report, prefix):
+        """Incorpora las métricas de otro informe (p. ej. de otro perfil) con un prefijo"""
+        for name, metric in report["metrics"].items():
+            self.metrics[f"{prefix}.{name}"] = metric
+            print(f"  {prefix + '.' + name:<44} {metric['median']:10.2f} {metric['unit']}  (n={len(metric['samples'])})")
+        for benchmark, reason in report["skipped"].items():
+            self.skipped[f"{prefix}.{benchmark}"] = reason
+
+    def skip(self, benchmark, reason):
+        self.skipped[benchmark] = reason
+        print(f"  [{benchmark}] omitido: {reason}")
+
+    def to_json(self, args):
+        return {
+            "meta": {
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "repeat": args.repeat,
+                "runtime_profiles": args.profiles or [args.runtime_profile],
+            },
+            "metrics": self.metrics,
+            "skipped": self.skipped,
+        }
+
+
+# --- utilidades -------------------------------------------------------------
+
+def isolated_env(server, home):
+    env = dict(os.environ)
+    env.update(server.env())
+    env.update({
+        "HOME": home,
+        "XDG_CONFIG_HOME": os.path.join(home, ".config"),
+        "QT_QPA_PLATFORM": "offscreen",
+        "QTWEBENGINE_DISABLE_SANDBOX": "1",
+    })
+    # Los flags de Chromium los pone el perfil de ejecución (--runtime-profile)
+    env.pop("QTWEBENGINE_CHROMIUM_FLAGS", None)
+    return env
+
+
+def _proc_tree(pid):
+    """pid y sus descendientes según /proc (sin psutil)"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(ppid, []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def rss_tree_mb(pid=None):
+    """RSS del proceso y de sus descendientes (los renderers de Chromium), en MB"""
+    pid = pid or os.getpid()
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        procs = [proc] + proc.children(recursive=True)
+        return sum(p.memory_info().rss for p in procs) / 1e6
+    except ImportError:
+        pass
+    if not os.path.isdir("/proc"):
+        return None
+    total_kb = 0
+    for current in _proc_tree(pid):
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return total_kb / 1e3
+
+
+def cpu_tree_seconds(pid=None):
+    """Tiempo de CPU (usuario + sistema) del proceso y de sus descendientes, en segundos"""
+    pid = pid or os.getpid()
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        procs = [proc] + proc.children(recursive=True)
+        return sum(sum(p.cpu_times()[:2]) for p in procs)
+    except ImportError:
+        pass
+    if not os.path.isdir("/proc"):
+        return None
+    ticks = 0
+    for current in _proc_tree(pid):
+        try:
+            with open(f"/proc/{current}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])
+        except (OSError, IndexError, ValueError):
+            continue
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+def load_app_module():
+    spec = importlib.util.spec_from_file_location("youtube_now", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def wait_for(signal, timeout_ms=15000):
+    """Espera (procesando eventos) a que signal se emita; devuelve sus argumentos o None"""
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    received = []
+
+    def _on_signal(*args):
+        received.append(args)
+        loop.quit()
+
+    signal.connect(_on_signal)
+    QTimer.singleShot(timeout_ms, loop.quit)
+    loop.exec_()
+    signal.disconnect(_on_signal)
+    return received[0] if received else None
+
+
+def process_events_for(ms):
+    from PyQt5.QtCore import QEventLoop, QTimer
+    loop = QEventLoop()
+    QTimer.singleShot(ms, loop.quit)
+    loop.exec_()
+
+
+# --- benchmarks ---------------------------------------------------------------
+
+def bench_startup(results, server, args):
+    """Lanzador en frío en un proceso nuevo, leyendo las marcas de --startup-trace"""
+    visible, ready = [], []
+    marker = re.compile(r"\[startup\] (.+?): (\d+) ms")
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as home:
+            proc = subprocess.Popen(
+                [sys.executable, APP_PATH, "--new-instance", "--startup-trace",
+                 "--runtime-profile", args.runtime_profile],
+                env=isolated_env(server, home), stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True,
+            )
+            deadline = time.monotonic() + 30
+            try:
+                for line in proc.stderr:
+                    match = marker.search(line)
+                    if match and match.group(1) == "Lanzador visible":
+                        visible.append(int(match.group(2)))
+                    elif match and match.group(1) == "QtWebEngine listo":
+                        ready.append(int(match.group(2)))
+                        break
+                    elif "No se pudo cargar QtWebEngine" in line or time.monotonic() > deadline:
+                        break
+            finally:
+                proc.kill()
+                proc.wait()
+    results.add("startup.launcher_visible_ms", visible, "ms")
+    results.add("startup.webengine_ready_ms", ready, "ms")
+
+
+def bench_window(results, app, module, args):
+    shell, full, load_times = [], [], []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        window = module.VideoWindow()
+        shell.append((time.perf_counter() - start) * 1000)
+        window.release()
+
+        start = time.perf_counter()
+        window = module.VideoWindow(SAMPLE_URL)
+        full.append((time.perf_counter() - start) * 1000)
+        window.release()
+
+        window = module.VideoWindow()
+        window.show()
+        started = []
+        window.webview.loadStarted.connect(lambda: started.append(time.perf_counter()))
+        window.load_video(SAMPLE_URL)
+        if wait_for(window.webview.loadFinished) and started:
+            load_times.append((time.perf_counter() - started[0]) * 1000)
+        window.close()
+        window.release()
+        process_events_for(50)
+    results.add("window.construct_shell_ms", shell, "ms")
+    results.add("window.construct_with_video_ms", full, "ms")
+    results.add("window.load_started_to_finished_ms", load_times, "ms")
+
+
+def bench_paths(results, app, module, args):
+    from PyQt5.QtCore import QUrl
+    window = module.VideoWindow()
+    window.show()
+    scheme, set_html, direct = [], [], []
+    embed_url = window.youtube_embed_url(SAMPLE_URL)
+    scheme_supported = module.PLAYER_SCHEME_SUPPORTED
+    for _ in range(args.repeat):
+        if scheme_supported:
+            start = time.perf_counter()
+            window.load_video(SAMPLE_URL)
+            if wait_for(window.webview.loadFinished):
+                scheme.append((time.perf_counter() - start) * 1000)
+        # La ruta antigua sigue disponible como respaldo para Qt sin esquemas propios
+        module.PLAYER_SCHEME_SUPPORTED = False
+        try:
+            start = time.perf_counter()
+            window.load_video(SAMPLE_URL)
+            if wait_for(window.webview.loadFinished):
+                set_html.append((time.perf_counter() - start) * 1000)
+        finally:
+            module.PLAYER_SCHEME_SUPPORTED = scheme_supported
+        start = time.perf_counter()
+        window.webview.load(QUrl(embed_url))
+        if wait_for(window.webview.loadFinished):
+            direct.append((time.perf_counter() - start) * 1000)
+    window.close()
+    window.release()
+    results.add("paths.scheme_ms", scheme, "ms")
+    results.add("paths.set_html_ms", set_html, "ms")
+    results.add("paths.load_ms", direct, "ms")
+
+
+def bench_memory(results, app, module, args):
+    count = args.windows
+    process_events_for(500)
+    before = rss_tree_mb()
+    if before is None:
+        results.skip("memory", "no se puede medir RSS en esta plataforma")
+        return
+    windows = []
+    for _ in range(count):
+        window = module.VideoWindow(SAMPLE_URL)
+        window.show()
+        wait_for(window.webview.loadFinished)
+        windows.append(window)
+    process_events_for(1500)
+    after = rss_tree_mb()
+    results.add("memory.per_window_mb", [(after - before) / count], "MB")
+    # CPU de todo el árbol de procesos mientras las ventanas reproducen
+    cpu_before, start = cpu_tree_seconds(), time.perf_counter()
+    process_events_for(3000)
+    cpu_after, elapsed = cpu_tree_seconds(), time.perf_counter() - start
+    if cpu_before is not None:
+        results.add("memory.playback_cpu_percent", [(cpu_after - cpu_before) / elapsed * 100], "%")
+    for window in windows:
+        window.close()
+        window.release()
+    process_events_for(1500)
+    results.add("memory.retained_after_close_mb", [max(0.0, rss_tree_mb() - before)], "MB")
+
+
+def _playback_cost(open_windows):
+    """Memoria, CPU y tiempo de carga de las ventanas que abre open_windows(); las cierra al final"""
+    process_events_for(500)
+    before = rss_tree_mb()
+    start = time.perf_counter()
+    windows = open_windows()
+    load_ms = (time.perf_counter() - start) * 1000
+    process_events_for(1500)
+    after = rss_tree_mb()
+    cpu_before, start = cpu_tree_seconds(), time.perf_counter()
+    process_events_for(3000)
+    cpu_after, elapsed = cpu_tree_seconds(), time.perf_counter() - start
+    for window in windows:
+        window.close()
+        window.release()
+    process_events_for(1500)
+    cpu = None if cpu_before is None else (cpu_after - cpu_before) / elapsed * 100
+    return after - before, cpu, load_ms
+
+
+def bench_mosaic(results, app, module, args):
+    """N videos en un MosaicWindow frente a N VideoWindow separadas (memoria, CPU y carga)"""
+    if rss_tree_mb() is None:
+        results.skip("mosaic", "no se puede medir RSS en esta plataforma")
+        return
+    urls = [f"https://www.youtube.com/watch?v={index:011d}" for index in range(max(args.mosaic_sizes))]
+
+    def separate(count):
+        windows = []
+        for url in urls[:count]:
+            window = module.VideoWindow(url)
+            window.show()
+            wait_for(window.webview.loadFinished)
+            windows.append(window)
+        return windows
+
+    def mosaic(count):
+        window = module.MosaicWindow(urls[:count], 960, 540)
+        ready = set()
+        window.webview.page().playerEvent.connect(
+            lambda event_type, data: ready.add(data.get("tile")) if event_type == "ready" else None
+        )
+        window.show()
+        deadline = time.perf_counter() + 15
+        while len(ready) < count and time.perf_counter() < deadline:
+            process_events_for(20)
+        return [window]
+
+    for count in args.mosaic_sizes:
+        for mode, open_windows in (("separate", separate), ("mosaic", mosaic)):
+            memory_mb, cpu, load_ms = _playback_cost(lambda: open_windows(count))
+            results.add(f"mosaic.{mode}_{count}.memory_mb", [memory_mb], "MB")
+            results.add(f"mosaic.{mode}_{count}.playback_cpu_percent", [cpu], "%")
+            results.add(f"mosaic.{mode}_{count}.load_ms", [load_ms], "ms")
+
+
+def bench_history(results, app, module, args):
+    for size in args.history_sizes:
+        samples = {"add_us": [], "readd_existing_us": [], "load_ms": [],
+                   "first_search_ms": [], "refine_search_ms": []}
+        urls = [f"https://www.youtube.com/watch?v={i:011d}" for i in range(size)]
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "history.jsonl")
+                store = module.HistoryStore(path)
+                start = time.perf_counter()
+                for i, url in enumerate(urls):
+                    store.add(url, 1_000_000 + i)
+                samples["add_us"].append((time.perf_counter() - start) / size * 1e6)
+                start = time.perf_counter()
+                store.add(urls[0])
+                samples["readd_existing_us"].append((time.perf_counter() - start) * 1e6)
+                store.close()
+
+                start = time.perf_counter()
+                store = module.HistoryStore(path)
+                samples["load_ms"].append((time.perf_counter() - start) * 1000)
+
+                # La primera búsqueda incluye construir el índice
+                model = module.HistoryModel(store)
+                start = time.perf_counter()
+                model.set_filter("0000")
+                samples["first_search_ms"].append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                model.set_filter("00001")
+                samples["refine_search_ms"].append((time.perf_counter() - start) * 1000)
+                store.close()
+        label = f"{size // 1000}k" if size >= 1000 else str(size)
+        for name, values in samples.items():
+            results.add(f"history.{label}.{name}", values, "µs" if name.endswith("_us") else "ms")
+
+
+def bench_metadata(results, app, module, args):
+    """Tiempo hasta tener las miniaturas de 50 videos con la caché vacía, en disco y en memoria"""
+    keys = [f"{i:011d}" for i in range(50)]
+    samples = {"network_ms": [], "disk_ms": [], "memory_us": []}
+
+    def fetch_all(service):
+        pending = set(keys)
+        service.thumbnailReady.connect(pending.discard)
+        start = time.perf_counter()
+        for key in keys:
+            service.request(key, f"https://www.youtube.com/watch?v={key}")
+        deadline = time.monotonic() + 30
+        while pending and time.monotonic() < deadline:
+            app.processEvents()
+            time.sleep(0.001)
+        return (time.perf_counter() - start) * 1000 if not pending else None
+
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            service = module.MetadataService(tmp)
+            samples["network_ms"].append(fetch_all(service))
+            service._executor.shutdown(wait=True)
+            service = module.MetadataService(tmp)
+            samples["disk_ms"].append(fetch_all(service))
+            start = time.perf_counter()
+            for key in keys:
+                service.pixmap(key)
+            samples["memory_us"].append((time.perf_counter() - start) / len(keys) * 1e6)
+            service._executor.shutdown(wait=True)
+    results.add("metadata.50_thumbnails_network_ms", samples["network_ms"], "ms")
+    results.add("metadata.50_thumbnails_disk_ms", samples["disk_ms"], "ms")
+    results.add("metadata.memory_hit_us", samples["memory_us"], "µs")
+
+
+def bench_session(results, app, module, args):
+    """Restaurar 10 ventanas de la sesión anterior: tiempo hasta mostrarlas y memoria"""
+    count = 10
+    entries = [{"url": f"https://www.youtube.com/watch?v={index:011d}", "position": 60 * index,
+                "geometry": [40 * index, 40 * index, 480, 270], "pinned": True, "opacity": 1.0,
+                "title": f"Video {index}"} for index in range(count)]
+    samples = {"ms": [], "mb": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        store = module.SessionStore(os.path.join(tmp, "session.json"))
+        store.save(entries)
+        for _ in range(args.repeat):
+            process_events_for(200)
+            before = rss_tree_mb()
+            start = time.perf_counter()
+            placeholders = [module.SessionPlaceholder(state) for state in store.load()]
+            for placeholder in placeholders:
+                placeholder.show()
+            app.processEvents()
+            samples["ms"].append((time.perf_counter() - start) * 1000)
+            after = rss_tree_mb()
+            samples["mb"].append(None if before is None else after - before)
+            for placeholder in placeholders:
+                placeholder.close()
+                placeholder.deleteLater()
+            process_events_for(200)
+    results.add(f"session.restore_{count}_ms", samples["ms"], "ms")
+    results.add(f"session.restore_{count}_mb", samples["mb"], "MB")
+
+
+def sample_media_file(directory, seconds=10):
+    """WAV de prueba (un tono) para el reproductor nativo si no se pasa --media-file"""
+    path = os.path.join(directory, "sample.wav")
+    rate = 22050
+    period = [int(12000 * ((i % 50) / 25 - 1)) for i in range(50)]  # diente de sierra de 441 Hz
+    frames = b"".join(value.to_bytes(2, "little", signed=True) for value in period) * (rate * seconds // 50)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(frames)
+    return path
+
+
+def bench_native(results, app, module, args):
+    """NativeVideoWindow con un archivo local (con y sin mmap) frente a una VideoWindow de YouTube"""
+    try:
+        module.load_multimedia()
+    except ImportError as exc:
+        results.skip("native", f"QtMultimedia no disponible ({exc})")
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.media_file or sample_media_file(tmp)
+        source = module.direct_media_source(path)
+        if source is None:
+            results.skip("native", f"{path} no es un archivo de video/audio reconocido")
+            return
+        for label, use_mmap in (("native", False), ("native_mmap", True)):
+            samples = {"window_ms": [], "load_ms": [], "mb": []}
+            for _ in range(args.repeat):
+                process_events_for(300)
+                before = rss_tree_mb()
+                start = time.perf_counter()
+                window = module.NativeVideoWindow(source, autoplay=True, use_mmap=use_mmap)
+                samples["window_ms"].append((time.perf_counter() - start) * 1000)
+                window.show()
+                loaded = (module.QMediaPlayer.LoadedMedia, module.QMediaPlayer.BufferedMedia)
+                deadline = time.perf_counter() + 10
+                while window.player.mediaStatus() not in loaded and time.perf_counter() < deadline:
+                    process_events_for(5)
+                samples["load_ms"].append((time.perf_counter() - start) * 1000
+                                          if window.player.mediaStatus() in loaded else None)
+                process_events_for(1000)
+                samples["mb"].append(None if before is None else rss_tree_mb() - before)
+                window.close()
+                window.release()
+                process_events_for(300)
+            results.add(f"native.{label}.window_ms", samples["window_ms"], "ms")
+            results.add(f"native.{label}.load_ms", samples["load_ms"], "ms")
+            results.add(f"native.{label}.per_window_mb", samples["mb"], "MB")
+    if not module.webengine_loaded():
+        return
+    # Misma medida con una VideoWindow (reproductor embebido del servidor local)
+    process_events_for(300)
+    before = rss_tree_mb()
+    start = time.perf_counter()
+    window = module.VideoWindow(SAMPLE_URL)
+    window.show()
+    wait_for(window.webview.loadFinished)
+    results.add("native.webengine.load_ms", [(time.perf_counter() - start) * 1000], "ms")
+    process_events_for(1000)
+    if before is not None:
+        results.add("native.webengine.per_window_mb", [rss_tree_mb() - before], "MB")
+    window.close()
+    window.release()
+    process_events_for(300)
+
+
+# --- comparación ----------------------------------------------------------------
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["metrics"]
+    regressions = []
+    print(f"\nComparación con {baseline_path} (umbral {threshold:.0%}):")
+    for name, metric in sorted(current.items()):
+        if name not in baseline or not baseline[name]["median"]:
+            continue
+        old, new = baseline[name]["median"], metric["median"]
+        change = new / old - 1
+        flag = "REGRESIÓN" if change > threshold else ("mejora" if change < -threshold else "")
+        print(f"  {name:<44} {old:10.2f} -> {new:10.2f} {metric['unit']:<3} {change:+7.1%} {flag}")
+        if change > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def profile_list(value):
+    profiles = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in profiles if name not in RUNTIME_PROFILES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"perfiles desconocidos: {', '.join(unknown)}")
+    return profiles
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default=",".join(ALL_BENCHMARKS),
+                        help="benchmarks a ejecutar, separados por comas")
+    parser.add_argument("--repeat", type=int, default=5, help="repeticiones por medida")
+    parser.add_argument("--windows", type=int, default=3, help="ventanas abiertas en el benchmark de memoria")
+    parser.add_argument("--mosaic-sizes", type=lambda v: [int(x) for x in v.split(",")],
+                        default=[2, 4], help="número de videos a comparar en el benchmark de mosaico")
+    parser.add_argument("--history-sizes", type=lambda v: [int(x) for x in v.split(",")],
+                        default=[10, 1000, 100000], help="tamaños de historial a medir")
+    parser.add_argument("--media-file", help="archivo para el benchmark del reproductor nativo (por defecto un WAV generado)")
+    parser.add_argument("--output", help="guardar los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de referencia con el que comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="empeoramiento tolerado (0.2 = 20 %%)")
+    parser.add_argument("--runtime-profile", default="compat", choices=RUNTIME_PROFILES,
+                        help="perfil de Chromium de la aplicación")
+    parser.add_argument("--profiles", type=profile_list,
+                        help="repetir la suite con cada uno de estos perfiles (separados por comas), en procesos separados")
+    args = parser.parse_args()
+    selected = [name.strip() for name in args.only.split(",") if name.strip()]
+
+    if args.profiles:
+        results = Results()
+        for profile in args.profiles:
+            print(f"[perfil {profile}]")
+            with tempfile.TemporaryDirectory() as tmp:
+                output = os.path.join(tmp, "results.json")
+                command = [sys.executable, os.path.abspath(__file__), "--only", ",".join(selected),
+                           "--repeat", str(args.repeat), "--windows", str(args.windows),
+                           "--history-sizes", ",".join(map(str, args.history_sizes)),
+                           "--mosaic-sizes", ",".join(map(str, args.mosaic_sizes)),
+                           *(["--media-file", args.media_file] if args.media_file else []),
+                           "--runtime-profile", profile, "--output", output]
+                if subprocess.run(command, stdout=subprocess.DEVNULL).returncode != 0 or not os.path.exists(output):
+                    results.skip(profile, "la suite falló con este perfil")
+                    continue
+                with open(output, encoding="utf-8") as f:
+                    results.merge(json.load(f), profile)
+        return finish(results, args)
+
+    server = StandInServer().start()
+    results = Results()
+    home = tempfile.mkdtemp(prefix="floater-bench-")
+    try:
+        if "startup" in selected:
+            print("[startup]")
+            bench_startup(results, server, args)
+
+        in_process = [name for name in selected if name != "startup"]
+        if in_process:
+            # Entorno aislado antes de importar la aplicación (CACHE_DIR, QSettings, stand-in)
+            os.environ.update(isolated_env(server, home))
+            from PyQt5.QtCore import QCoreApplication, Qt
+            from PyQt5.QtWidgets import QApplication
+            module = load_app_module()
+            QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+            app = QApplication.instance() or QApplication(sys.argv[:1])
+            # En modo software se aplican los flags del perfil tal cual, sin probar la GPU
+            module.chromium_runtime.apply(args.runtime_profile)
+            try:
+                module.load_webengine()
+                webengine_error = None
+            except ImportError as exc:
+                webengine_error = f"QtWebEngine no disponible ({exc})"
+            for name in in_process:
+                print(f"[{name}]")
+                if name not in ("history", "metadata", "session", "native") and webengine_error:
+                    results.skip(name, webengine_error)
+                    continue
+                globals()[f"bench_{name}"](results, app, module, args)
+    finally:
+        server.stop()
+    return finish(results, args)
+
+
+def finish(results, args):
+    """Guarda y compara los resultados; devuelve el código de salida"""
+    report = results.to_json(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.output}")
+    if args.compare:
+        regressions = compare(results.metrics, args.compare, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regresiones: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
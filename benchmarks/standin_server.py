@@ -0,0 +1,209 @@
+"""Servidor HTTP local que hace de youtube-nocookie.com para los benchmarks.
+
+Sirve:
+  /embed/<id>   página de reproductor sintética (anima un canvas como si reprodujera)
+  /iframe_api   imitación mínima de la IFrame API de YouTube (YT.Player); como
+                la de verdad, no hace caso de setPlaybackQuality(Range) y elige
+                la calidad al cargar según el tamaño del reproductor
+  /oembed       metadatos oEmbed (título, canal, miniatura) de cualquier video
+                salvo los de missing (404, como un video borrado o privado)
+  /vi/<id>/hqdefault.jpg   miniatura sintética (PPM de color fijo por id)
+
+Se arranca en un hilo con StandInServer().start() y la aplicación se apunta a
+él con las variables de entorno de env(). requests y max_active cuentan
+las peticiones recibidas y cuántas llegó a atender a la vez.
+"""
+import http.server
+import json
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+PLAYER_PAGE = """<!doctype html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>html,body{margin:0;height:100%;background:#000}canvas{width:100%;height:100%;display:block}</style>
+</head>
+<body>
+<canvas id="c" width="640" height="360"></canvas>
+<script>
+  // Simula el trabajo de un reproductor: un frame nuevo por requestAnimationFrame
+  var ctx = document.getElementById('c').getContext('2d');
+  var frame = 0;
+  function draw() {
+    frame++;
+    ctx.fillStyle = 'hsl(' + (frame % 360) + ',60%,30%)';
+    ctx.fillRect(0, 0, 640, 360);
+    ctx.fillStyle = '#fff';
+    ctx.fillText('stand-in ' + location.pathname + ' frame ' + frame, 20, 30);
+    requestAnimationFrame(draw);
+  }
+  requestAnimationFrame(draw);
+</script>
+</body>
+</html>
+"""
+
+IFRAME_API = """
+(function () {
+  var PlayerState = {UNSTARTED: -1, ENDED: 0, PLAYING: 1, PAUSED: 2, BUFFERING: 3, CUED: 5};
+  var LEVELS = [[144, 'tiny'], [240, 'small'], [360, 'medium'], [480, 'large'],
+                [720, 'hd720'], [1080, 'hd1080'], [1440, 'hd1440'], [2160, 'hd2160']];
+  function Player(elementId, options) {
+    var self = this;
+    var events = (options && options.events) || {};
+    var state = PlayerState.UNSTARTED;
+    var startedAt = 0, offset = 0, quality = 'unknown', muted = false;
+    function setState(next) {
+      state = next;
+      if (events.onStateChange) { events.onStateChange({target: self, data: next}); }
+    }
+    // Altura de maquetación del iframe (sin transformaciones CSS) en píxeles físicos
+    function pickQuality() {
+      var frame = typeof elementId === 'string' ? document.getElementById(elementId) : elementId;
+      var height = ((frame && frame.offsetHeight) || 360) * (window.devicePixelRatio || 1);
+      var next = LEVELS[LEVELS.length - 1][1];
+      for (var i = 0; i < LEVELS.length; i++) {
+        if (LEVELS[i][0] >= height) { next = LEVELS[i][1]; break; }
+      }
+      if (next !== quality) {
+        quality = next;
+        if (events.onPlaybackQualityChange) { events.onPlaybackQualityChange({target: self, data: next}); }
+      }
+    }
+    self.getCurrentTime = function () {
+      return state === PlayerState.PLAYING ? offset + (performance.now() - startedAt) / 1000 : offset;
+    };
+    self.getDuration = function () { return 212; };
+    self.getPlayerState = function () { return state; };
+    self.getVideoLoadedFraction = function () { return Math.min(1, self.getCurrentTime() / 212 + 0.1); };
+    self.playVideo = function () { pickQuality(); startedAt = performance.now(); setState(PlayerState.PLAYING); };
+    self.pauseVideo = function () { offset = self.getCurrentTime(); setState(PlayerState.PAUSED); };
+    self.seekTo = function (seconds) { offset = seconds; startedAt = performance.now(); };
+    self.loadVideoById = function (args) {
+      offset = (args && args.startSeconds) || 0;
+      setState(PlayerState.BUFFERING);
+      setTimeout(self.playVideo, 50);
+    };
+    self.cueVideoById = function (args) { offset = (args && args.startSeconds) || 0; setState(PlayerState.CUED); };
+    self.setPlaybackQuality = function () {};
+    self.setPlaybackQualityRange = function () {};
+    self.getPlaybackQuality = function () { return quality; };
+    self.mute = function () { muted = true; };
+    self.unMute = function () { muted = false; };
+    self.isMuted = function () { return muted; };
+    self.setVolume = function () {};
+    setTimeout(function () {
+      if (events.onReady) { events.onReady({target: self}); }
+      self.loadVideoById({startSeconds: 0});
+    }, 20);
+  }
+  window.YT = {Player: Player, PlayerState: PlayerState};
+  if (window.onYouTubeIframeAPIReady) { setTimeout(window.onYouTubeIframeAPIReady, 0); }
+})();
+"""
+
+
+def thumbnail(video_id, width=480, height=360):
+    """Imagen PPM de un color derivado del id (Qt la decodifica igual que un JPEG)"""
+    seed = zlib.crc32(video_id.encode("utf-8"))
+    pixel = bytes(((seed >> shift) & 0xFF for shift in (0, 8, 16)))
+    return b"P6 %d %d 255\n" % (width, height) + pixel * (width * height)
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    # Retardo artificial por petición (segundos), configurable desde StandInServer
+    delay = 0.0
+    missing = frozenset()
+    owner = None
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        self.owner._started(path)
+        try:
+            self._get(path)
+        finally:
+            self.owner._finished()
+
+    def _get(self, path):
+        if self.delay:
+            time.sleep(self.delay)
+        if path.startswith("/embed/"):
+            self._reply(PLAYER_PAGE, "text/html; charset=utf-8")
+        elif path == "/iframe_api":
+            self._reply(IFRAME_API, "application/javascript")
+        elif path == "/oembed":
+            self._oembed()
+        elif path.startswith("/vi/"):
+            self._reply(thumbnail(path.split("/")[2]), "image/x-portable-pixmap")
+        else:
+            self.send_error(404)
+
+    def _oembed(self):
+        url = parse_qs(urlsplit(self.path).query).get("url", [""])[0]
+        query = parse_qs(urlsplit(url).query)
+        video_id = (query.get("v") or query.get("list") or [""])[0]
+        if not video_id or video_id in self.missing:
+            self.send_error(404)
+            return
+        host, port = self.server.server_address[:2]
+        self._reply(json.dumps({
+            "title": f"Stand-in {video_id}",
+            "author_name": "Canal de pruebas",
+            "thumbnail_url": f"http://{host}:{port}/vi/{video_id}/hqdefault.jpg",
+        }), "application/json")
+
+    def _reply(self, body, content_type):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInServer:
+    def __init__(self, host="127.0.0.1", port=0, delay=0.0, missing=()):
+        self.requests = []  # rutas pedidas, por orden de llegada
+        self.active = self.max_active = 0
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"delay": delay, "missing": frozenset(missing), "owner": self})
+        self.httpd = http.server.ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Variables de entorno que apuntan la aplicación a este servidor"""
+        return {
+            "YOUTUBE_FLOATER_EMBED_HOST": self.base_url,
+            "YOUTUBE_FLOATER_IFRAME_API": self.base_url + "/iframe_api",
+            "YOUTUBE_FLOATER_OEMBED": self.base_url + "/oembed",
+        }
+
+    def _started(self, path):
+        with self._lock:
+            self.requests.append(path)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _finished(self):
+        with self._lock:
+            self.active -= 1
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,266 @@
+"""Elección del dominio de embed y supervisión de la carga del reproductor.
+
+EmbedHostStats recuerda qué tal responde cada dominio de embed y
+LoadSupervisor lo usa para cargar primero el mejor, competir con los demás si
+tarda y reintentar con espera exponencial si ninguno responde.
+"""
+import json
+import logging
+import os
+import random
+import time
+
+from PyQt5.QtCore import QObject, QTimer
+
+from youtube_url import EMBED_HOSTS
+
+
+class EmbedHostStats:
+    """Historial de éxito y latencia de cada dominio de embed.
+
+    Con medias móviles exponenciales de la tasa de éxito y del tiempo hasta
+    que el reproductor responde; ranked() ordena los dominios para que la
+    siguiente carga empiece por el que mejor viene funcionando.
+
+    Se guardan en la configuración (SettingsService) tras cada carga; la
+    escritura diferida de SettingsService agrupa las de cargas seguidas.
+    Hasta que attach() le da la configuración sólo viven en memoria.
+    """
+    ALPHA = 0.3
+    DEFAULT_LATENCY_MS = 3000
+    SETTINGS_KEY = "embed_hosts"
+
+    def __init__(self, settings=None, legacy_path=None):
+        self.settings = settings
+        # Fichero JSON donde las versiones anteriores las guardaban al salir
+        self.legacy_path = legacy_path
+        self._hosts = None
+
+    def attach(self, settings):
+        self.settings = settings
+        if self._hosts is not None:
+            self._save()
+
+    @property
+    def hosts(self):
+        if self._hosts is None:
+            self._hosts = self._load()
+        return self._hosts
+
+    def _load(self):
+        if self.settings is not None:
+            stored = self.settings.value(self.SETTINGS_KEY, None)
+            if stored:
+                try:
+                    return json.loads(stored)
+                except (TypeError, ValueError):
+                    logging.debug("Estadísticas de dominios de embed ilegibles, se empieza de cero")
+                    return {}
+        if not self.legacy_path:
+            return {}
+        try:
+            with open(self.legacy_path, encoding="utf-8") as f:
+                hosts = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logging.debug("Estadísticas de dominios de embed ilegibles, se empieza de cero")
+            return {}
+        if self.settings is not None:
+            self.settings.setValue(self.SETTINGS_KEY, json.dumps(hosts))
+            try:
+                os.remove(self.legacy_path)
+            except OSError:
+                pass
+        return hosts
+
+    def record(self, host, ok, latency_ms=None, censored=False):
+        """Anota una carga desde host.
+
+        censored: la carga se cortó sin terminar (perdió la carrera). No cuenta
+        como éxito ni como fallo (ok se ignora) y latency_ms es sólo un mínimo:
+        únicamente puede subir la latencia estimada.
+        """
+        stats = self.hosts.setdefault(host, {"success_rate": 1.0, "latency_ms": None, "loads": 0, "failures": 0})
+        if censored:
+            current = stats["latency_ms"] if stats["latency_ms"] is not None else self.DEFAULT_LATENCY_MS
+            if latency_ms is not None and latency_ms > current:
+                stats["latency_ms"] = current + self.ALPHA * (latency_ms - current)
+                self._save()
+            return
+        stats["loads"] += 1
+        stats["failures"] += 0 if ok else 1
+        stats["success_rate"] += self.ALPHA * ((1.0 if ok else 0.0) - stats["success_rate"])
+        if latency_ms is not None:
+            previous = stats["latency_ms"]
+            stats["latency_ms"] = latency_ms if previous is None else previous + self.ALPHA * (latency_ms - previous)
+        self._save()
+
+    def score(self, host):
+        """Tiempo esperado hasta tener reproductor (menos es mejor)"""
+        stats = self.hosts.get(host)
+        if not stats:
+            return self.DEFAULT_LATENCY_MS
+        latency = stats["latency_ms"] if stats["latency_ms"] is not None else self.DEFAULT_LATENCY_MS
+        return latency / max(stats["success_rate"], 0.05)
+
+    def ranked(self, hosts):
+        # sorted es estable: sin historial se respeta el orden por defecto
+        return sorted(hosts, key=self.score)
+
+    def _save(self):
+        if self.settings is not None and self._hosts is not None:
+            self.settings.setValue(self.SETTINGS_KEY, json.dumps(self._hosts))
+
+
+class LoadSupervisor(QObject):
+    """Supervisa la carga del reproductor de una VideoWindow.
+
+    La página visible carga el dominio de embed mejor valorado por stats
+    (EmbedHostStats). Si a los RACE_DELAY_MS el reproductor todavía no
+    respondió (evento "ready" de la IFrame API), los otros dominios se cargan
+    en páginas ocultas y mudas y se queda la primera que responda. Si ninguna
+    responde en timeout_ms se reintenta con espera exponencial hasta
+    MAX_ATTEMPTS veces, así que el tiempo hasta el video queda acotado.
+
+    window sólo necesita webview.page(), create_page(), load_into(),
+    adopt_page(), on_player_event() y load_failed().
+    """
+    # Configurables desde el lanzador (configure)
+    timeout_ms = 8000
+    race = True
+    RACE_DELAY_MS = 1500
+    MAX_ATTEMPTS = 3
+    BACKOFF_MS = 1000
+    # Ruido relativo de la espera para que las ventanas no reintenten a la vez
+    JITTER = 0.2
+
+    @classmethod
+    def configure(cls, timeout_s, race):
+        cls.timeout_ms = max(1, int(timeout_s)) * 1000
+        cls.race = bool(race)
+
+    @classmethod
+    def backoff_ms(cls, attempt):
+        """Espera tras el intento fallido número attempt: exponencial, con ±JITTER de ruido"""
+        return cls.BACKOFF_MS * 2 ** (attempt - 1) * random.uniform(1 - cls.JITTER, 1 + cls.JITTER)
+
+    def __init__(self, window, stats, hosts=EMBED_HOSTS):
+        super().__init__(window)
+        self.window = window
+        self.stats = stats
+        self.hosts = tuple(hosts)
+        self.request = None  # (url, autoplay, start)
+        self.attempt = 0
+        self._hosts = []
+        self._racers = {}  # página -> (dominio, inicio de su carga)
+        self._frame_loaded = set()  # páginas cuyo iframe cargó aunque la IFrame API no respondiera
+        self._started = 0.0
+        self._watchdog = self._single_shot(self._on_timeout)
+        self._race_timer = self._single_shot(self._start_race)
+        self._retry_timer = self._single_shot(self._begin)
+
+    def _single_shot(self, slot):
+        timer = QTimer(self)
+        timer.setSingleShot(True)
+        timer.timeout.connect(slot)
+        return timer
+
+    @property
+    def loading(self):
+        return bool(self._racers) or self._retry_timer.isActive()
+
+    def start(self, url, autoplay, start):
+        self.cancel()
+        self.request = (url, autoplay, start)
+        self.attempt = 0
+        self._begin()
+
+    def cancel(self):
+        for timer in (self._watchdog, self._race_timer, self._retry_timer):
+            timer.stop()
+        self._drop_hidden()
+        self._racers.clear()
+        self._frame_loaded.clear()
+
+    def _begin(self):
+        self.attempt += 1
+        self._hosts = self.stats.ranked(self.hosts)
+        self._started = time.monotonic()
+        page = self.window.webview.page()
+        self._racers = {page: (self._hosts[0], self._started)}
+        self.window.load_into(page, self._hosts[0], *self.request)
+        self._watchdog.start(self.timeout_ms)
+        if self.race and len(self._hosts) > 1:
+            # En los reintentos ya sabemos que la red va mal: competir desde el principio
+            self._race_timer.start(self.RACE_DELAY_MS if self.attempt == 1 else 0)
+
+    def _start_race(self):
+        racing = {host for host, _ in self._racers.values()}
+        for host in self._hosts:
+            if host in racing:
+                continue
+            page = self.window.create_page()
+            page.setAudioMuted(True)
+            page.playerEvent.connect(lambda event_type, data, page=page: self.on_player_event(page, event_type, data))
+            self._racers[page] = (host, time.monotonic())
+            logging.info(f"El reproductor tarda en responder; probando también {host}")
+            self.window.load_into(page, host, *self.request)
+
+    def on_player_event(self, page, event_type, data):
+        if page not in self._racers:
+            return
+        if event_type == "ready":
+            self._win(page)
+        elif event_type == "frame":
+            self._frame_loaded.add(page)
+
+    def _win(self, page):
+        now = time.monotonic()
+        host, started = self._racers.pop(page)
+        self.stats.record(host, True, (now - started) * 1000)
+        # De las perdedoras sólo se sabe que tardan como mínimo lo que llevaban esperando
+        for other_host, other_started in self._racers.values():
+            self.stats.record(other_host, None, (now - other_started) * 1000, censored=True)
+        self._finish()
+        logging.debug(f"Reproductor listo desde {host} en {(now - self._started) * 1000:.0f} ms (intento {self.attempt})")
+        if page is not self.window.webview.page():
+            logging.info(f"{host} respondió antes; se usa esa página")
+            self.window.adopt_page(page)
+            self.window.on_player_event("ready", {})
+
+    def _finish(self):
+        for timer in (self._watchdog, self._race_timer, self._retry_timer):
+            timer.stop()
+        self._drop_hidden()
+        self._racers.clear()
+        self._frame_loaded.clear()
+
+    def _drop_hidden(self):
+        visible = self.window.webview.page()
+        for page in self._racers:
+            if page is not visible:
+                page.setAudioMuted(True)
+                page.deleteLater()
+
+    def _on_timeout(self):
+        visible = self.window.webview.page()
+        if visible in self._frame_loaded and visible in self._racers:
+            # El iframe cargó pero la IFrame API no (p. ej. iframe_api bloqueado):
+            # el video se puede ver igual, sólo sin control por API
+            host, started = self._racers[visible]
+            logging.warning(f"La IFrame API no respondió; se mantiene el reproductor de {host} sin API")
+            self.stats.record(host, True, (time.monotonic() - started) * 1000)
+            self._finish()
+            return
+        for host, _ in self._racers.values():
+            self.stats.record(host, False)
+        self._finish()
+        if self.attempt >= self.MAX_ATTEMPTS:
+            logging.error(f"El reproductor no respondió tras {self.attempt} intentos")
+            self.window.load_failed()
+            return
+        delay_ms = self.backoff_ms(self.attempt)
+        logging.warning(f"El reproductor no respondió en {self.timeout_ms / 1000:.0f} s; "
+                        f"reintento {self.attempt + 1}/{self.MAX_ATTEMPTS} en {delay_ms / 1000:.1f} s")
+        self._retry_timer.start(int(delay_ms))
@@ -0,0 +1,534 @@
+"""Historial de videos: diario en disco, índice de búsqueda y modelo para la vista."""
+import bisect
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt, QTimer
+from PyQt5.QtGui import QColor, QPixmap
+
+from youtube_url import parse_youtube_url
+
+
+def history_key(url):
+    """Clave de deduplicación del historial: id del video (o de la lista), o la URL si no es de YouTube"""
+    parsed = parse_youtube_url(url)
+    if parsed:
+        return parsed.video_id or parsed.playlist_id
+    return url
+
+
+class HistoryStore:
+    """Historial de videos en un diario append-only (una línea JSON por cambio).
+
+    En memoria se mantiene un índice por video id ordenado por última visita,
+    así que añadir una visita cuesta O(1) y escribe una sola línea. Cuando el
+    diario acumula muchas más líneas que entradas se reescribe compactado.
+    """
+    COMPACT_MIN_LINES = 500
+    COMPACT_RATIO = 4
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = OrderedDict()  # clave -> entrada, de visita más antigua a más reciente
+        self._journal_lines = 0
+        self._file = None
+        # La última línea quedó a medias (cierre brusco): la siguiente escritura empieza en una nueva
+        self._partial_tail = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._journal_lines += 1
+                    self._partial_tail = not line.endswith("\n")
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        # Línea a medio escribir (cierre brusco): se ignora
+                        logging.debug("Línea inválida en el historial, ignorada")
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logging.exception("No se pudo leer el historial")
+
+    def _apply(self, record):
+        op = record["op"]
+        key = record.get("key")
+        if op == "visit":
+            entry = self._entries.pop(key, None) or {
+                "url": record["url"], "title": None, "first_seen": record["ts"], "last_seen": record["ts"], "plays": 0
+            }
+            entry["url"] = record["url"]
+            entry["last_seen"] = record["ts"]
+            entry["plays"] += 1
+            self._entries[key] = entry
+        elif op == "entry":
+            self._entries.pop(key, None)
+            self._entries[key] = record["entry"]
+        elif op == "meta":
+            if key in self._entries:
+                self._entries[key].update(record["fields"])
+        elif op == "clear":
+            self._entries.clear()
+
+    def _append(self, record):
+        self._apply(record)
+        try:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+                if self._partial_tail:
+                    self._file.write("\n")
+                    self._partial_tail = False
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+            self._journal_lines += 1
+        except OSError:
+            logging.exception("No se pudo escribir en el historial")
+            return
+        if self._journal_lines > max(self.COMPACT_MIN_LINES, self.COMPACT_RATIO * len(self._entries)):
+            self.compact()
+
+    def add(self, url, timestamp=None):
+        """Registra una visita a url; si el video ya estaba pasa a ser el más reciente"""
+        self._append({"op": "visit", "key": history_key(url), "url": url, "ts": timestamp or time.time()})
+
+    def update_meta(self, key, **fields):
+        if key in self._entries:
+            self._append({"op": "meta", "key": key, "fields": fields})
+
+    def clear(self):
+        self._append({"op": "clear"})
+
+    def compact(self):
+        """Reescribe el diario con una línea por entrada (escritura atómica)"""
+        self.close()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for key, entry in self._entries.items():
+                    f.write(json.dumps({"op": "entry", "key": key, "entry": entry}, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, self.path)
+            self._journal_lines = len(self._entries)
+            self._partial_tail = False
+            logging.debug(f"Historial compactado: {len(self._entries)} entradas")
+        except OSError:
+            logging.exception("No se pudo compactar el historial")
+
+    def migrate(self, urls):
+        """Importa la lista antigua de QSettings (de más antigua a más reciente)"""
+        now = time.time()
+        for offset, url in enumerate(urls):
+            self.add(url, now - len(urls) + offset)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def keys_recent(self):
+        """Claves de la más reciente a la más antigua"""
+        return reversed(self._entries.keys())
+
+    def recent(self, limit=None):
+        """Entradas de la más reciente a la más antigua"""
+        result = []
+        for entry in reversed(self._entries.values()):
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(entry)
+        return result
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, url):
+        return history_key(url) in self._entries
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+# Partes de URL que comparten casi todas las entradas: no aportan nada al buscar
+_URL_STOPWORDS = frozenset({"http", "https", "www", "m", "youtube", "youtu", "be", "com", "watch", "v", "embed", "shorts"})
+
+
+def search_tokens(text):
+    return {token for token in _TOKEN_RE.findall((text or "").lower()) if token not in _URL_STOPWORDS}
+
+
+def entry_tokens(key, entry):
+    text = " ".join(filter(None, (key, entry.get("url"), entry.get("title"), entry.get("channel"))))
+    tokens = search_tokens(text)
+    tokens.add(key.lower())
+    return tokens
+
+
+class HistorySearchIndex:
+    """Índice de búsqueda por prefijo de palabra sobre id, título y URL del historial.
+
+    Guarda token -> claves y una lista ordenada de tokens para resolver prefijos
+    con bisect. Si la consulta nueva sólo alarga la anterior (el caso al teclear)
+    se filtra el resultado previo en vez de volver a buscar en todo el índice.
+    """
+
+    def __init__(self):
+        self._postings = {}  # token -> set(claves)
+        self._sorted_tokens = []
+        self._key_tokens = {}  # clave -> set(tokens)
+        self._last_terms = None
+        self._last_result = None
+        # True si la última búsqueda sólo refinó (redujo) el resultado anterior
+        self.last_was_refinement = False
+
+    def add(self, key, entry):
+        tokens = entry_tokens(key, entry)
+        old_tokens = self._key_tokens.get(key, set())
+        if tokens == old_tokens:
+            return
+        for token in old_tokens - tokens:
+            keys = self._postings.get(token)
+            keys.discard(key)
+            if not keys:
+                del self._postings[token]
+                self._sorted_tokens.pop(bisect.bisect_left(self._sorted_tokens, token))
+        for token in tokens - old_tokens:
+            if token not in self._postings:
+                self._postings[token] = set()
+                bisect.insort(self._sorted_tokens, token)
+            self._postings[token].add(key)
+        self._key_tokens[key] = tokens
+        self._last_terms = self._last_result = None
+
+    def bulk_add(self, items):
+        """Carga en bloque de (clave, entrada) sin ordenar tokens; cerrar con finish_bulk()"""
+        postings = self._postings
+        for key, entry in items:
+            tokens = entry_tokens(key, entry)
+            for token in tokens:
+                postings.setdefault(token, set()).add(key)
+            self._key_tokens[key] = tokens
+
+    def finish_bulk(self):
+        self._sorted_tokens = sorted(self._postings)
+        self._last_terms = self._last_result = None
+
+    def _prefix_matches(self, term):
+        keys = set()
+        start = bisect.bisect_left(self._sorted_tokens, term)
+        for token in self._sorted_tokens[start:]:
+            if not token.startswith(term):
+                break
+            keys |= self._postings[token]
+        return keys
+
+    def search(self, query):
+        """Claves cuyas palabras empiezan por todos los términos de query (None = sin filtro)"""
+        terms = sorted(search_tokens(query))
+        self.last_was_refinement = False
+        if not terms:
+            self._last_terms = self._last_result = None
+            return None
+        previous = self._last_terms
+        if previous is not None and len(previous) == len(terms) and all(
+            new.startswith(old) for old, new in zip(previous, terms)
+        ):
+            # Refinamiento incremental: cada término sólo se ha alargado, así que
+            # basta con intersectar el resultado anterior con los términos que cambiaron
+            result = self._last_result
+            for old, new in zip(previous, terms):
+                if new != old:
+                    result = result & self._prefix_matches(new)
+            self.last_was_refinement = True
+        else:
+            result = None
+            for term in sorted(terms, key=len, reverse=True):
+                matches = self._prefix_matches(term)
+                result = matches if result is None else result & matches
+                if not result:
+                    break
+        self._last_terms = terms
+        self._last_result = result
+        return result
+
+
+class HistoryModel(QAbstractListModel):
+    """Modelo del historial para una QListView virtualizada, con filtro de búsqueda.
+
+    Las filas son claves del HistoryStore de la más reciente a la más antigua.
+    Las visitas y los cambios de filtro emiten inserciones, movimientos y
+    borrados de filas concretas en lugar de reiniciar el modelo.
+
+    Con un MetadataService, las filas que la vista pinta piden su miniatura;
+    hasta que llega se muestra un marcador de posición, y las que se quedan
+    sin datos se marcan como no disponibles en vez de "Cargando…".
+    """
+    UrlRole = Qt.UserRole
+    KeyRole = Qt.UserRole + 1
+
+    def __init__(self, store, parent=None, metadata=None):
+        super().__init__(parent)
+        self.store = store
+        self.metadata = metadata
+        self._placeholder = None
+        if metadata is not None:
+            metadata.thumbnailReady.connect(self.refresh_row)
+            metadata.metadataFailed.connect(self.refresh_row)
+        # El índice se construye por tramos en segundo plano (prepare_index) o,
+        # como muy tarde, en la primera búsqueda; así no retrasa el arranque
+        self.search_index = None
+        self._pending = None  # (índice a medio construir, claves pendientes, claves modificadas)
+        self._filter_keys = None
+        self._query = ""
+        self._rows = list(store.keys_recent())
+        self._reindex_rows()
+
+    INDEX_CHUNK = 1000
+
+    def prepare_index(self):
+        """Empieza a construir el índice de búsqueda en los ratos libres del event loop"""
+        if self.search_index is not None or self._pending is not None:
+            return
+        self._pending = (HistorySearchIndex(), list(self.store.keys_recent()), set())
+        QTimer.singleShot(0, self._index_step)
+
+    def _index_step(self):
+        if self._pending is None:
+            return
+        index, keys, _ = self._pending
+        chunk, keys[:] = keys[:self.INDEX_CHUNK], keys[self.INDEX_CHUNK:]
+        index.bulk_add((key, self.store.get(key)) for key in chunk if self.store.get(key) is not None)
+        if keys:
+            QTimer.singleShot(0, self._index_step)
+        else:
+            self._finish_index()
+
+    def _finish_index(self):
+        index, keys, touched = self._pending
+        if keys:
+            index.bulk_add((key, self.store.get(key)) for key in keys if self.store.get(key) is not None)
+        index.finish_bulk()
+        self._pending = None
+        self.search_index = index
+        # Entradas que cambiaron mientras se construía
+        for key in touched:
+            if self.store.get(key) is not None:
+                index.add(key, self.store.get(key))
+
+    def _ensure_index(self):
+        if self.search_index is None:
+            if self._pending is None:
+                self._pending = (HistorySearchIndex(), list(self.store.keys_recent()), set())
+            self._finish_index()
+        return self.search_index
+
+    def _index_entry(self, key):
+        if self.search_index is not None:
+            self.search_index.add(key, self.store.get(key))
+        elif self._pending is not None:
+            self._pending[2].add(key)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        key = self._rows[index.row()]
+        entry = self.store.get(key)
+        if entry is None:
+            return None
+        if role == Qt.DisplayRole:
+            if self.metadata is None:
+                return f"🎥 {entry.get('title') or entry['url']}"
+            status = ""
+            if not entry.get("title"):
+                status = "No disponible" if self.metadata.unavailable(key) else "Cargando…"
+            details = [entry.get("channel") or status]
+            if entry.get("duration"):
+                details.append(format_duration(entry["duration"]))
+            return f"{entry.get('title') or entry['url']}\n{' · '.join(filter(None, details))}"
+        if role == Qt.DecorationRole and self.metadata is not None:
+            pixmap = self.metadata.pixmap(key)
+            if pixmap is None:
+                self.metadata.request(key, entry["url"])
+                return self._placeholder_pixmap()
+            return pixmap
+        if role == Qt.ToolTipRole:
+            last_seen = datetime.fromtimestamp(entry["last_seen"]).strftime("%d/%m/%Y %H:%M")
+            return f"{entry['url']}\nÚltima vez: {last_seen} · Reproducciones: {entry['plays']}"
+        if role == self.UrlRole:
+            return entry["url"]
+        if role == self.KeyRole:
+            return key
+        return None
+
+    def _matches(self, key):
+        return self._filter_keys is None or key in self._filter_keys
+
+    def record_visit(self, url):
+        """Añade la visita al store y mueve/inserta sólo la fila afectada"""
+        key = history_key(url)
+        self.store.add(url)
+        self._index_entry(key)
+        if self._query:
+            self._filter_keys = self._ensure_index().search(self._query)
+        self._place_on_top(key)
+
+    def _placeholder_pixmap(self):
+        if self._placeholder is None:
+            self._placeholder = QPixmap(self.metadata.THUMB_SIZE)
+            self._placeholder.fill(QColor("#2d3561"))
+        return self._placeholder
+
+    def _reindex_rows(self):
+        # clave -> posición; la fila es posición - _row_base. Así insertar arriba
+        # es O(1) y mover o quitar una fila sólo toca las del lado más corto
+        self._row_base = 0
+        self._row_of = {key: row for row, key in enumerate(self._rows)}
+
+    def row_of(self, key):
+        """Fila de key en la vista, o -1 si no está (filtrada o desconocida)"""
+        position = self._row_of.get(key)
+        return -1 if position is None else position - self._row_base
+
+    def _shift_rows(self, row):
+        """Suma 1 a las filas de 0..row-1 (las de después no cambian)"""
+        if row <= len(self._rows) // 2:
+            for key in self._rows[:row]:
+                self._row_of[key] += 1
+        else:
+            self._row_base -= 1
+            for key in self._rows[row + 1:]:
+                self._row_of[key] -= 1
+
+    def refresh_row(self, key):
+        """Repinta la fila de key (p. ej. al llegar su miniatura)"""
+        row = self.row_of(key)
+        if row >= 0:
+            self.dataChanged.emit(self.createIndex(row, 0), self.createIndex(row, 0))
+
+    def refresh_key(self, key):
+        """Re-indexa una entrada cuyos datos cambiaron (p. ej. título) y repinta su fila"""
+        entry = self.store.get(key)
+        if entry is None:
+            return
+        self._index_entry(key)
+        self.refresh_row(key)
+
+    def _place_on_top(self, key):
+        row = self.row_of(key)
+        if not self._matches(key):
+            if row >= 0:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                # Quitar la fila = subir la de key a la posición 0 y descontar esa
+                self._shift_rows(row)
+                self._row_base += 1
+                del self._row_of[key]
+                del self._rows[row]
+                self.endRemoveRows()
+            return
+        if row == 0:
+            self.dataChanged.emit(self.createIndex(0, 0), self.createIndex(0, 0))
+        elif row > 0:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+            self._shift_rows(row)
+            self._row_of[key] = self._row_base
+            del self._rows[row]
+            self._rows.insert(0, key)
+            self.endMoveRows()
+        else:
+            self.beginInsertRows(QModelIndex(), 0, 0)
+            self._row_base -= 1
+            self._row_of[key] = self._row_base
+            self._rows.insert(0, key)
+            self.endInsertRows()
+
+    def set_filter(self, query):
+        self._query = query.strip()
+        index = self._ensure_index()
+        self._filter_keys = index.search(self._query)
+        if self._filter_keys is None:
+            new_rows = list(self.store.keys_recent())
+        elif index.last_was_refinement:
+            # El resultado sólo puede encoger: filtrar las filas actuales
+            new_rows = [key for key in self._rows if key in self._filter_keys]
+        else:
+            new_rows = [key for key in self.store.keys_recent() if key in self._filter_keys]
+        self._apply_rows(new_rows)
+
+    def reload(self):
+        """Reconstruye índice y filas desde el store (tras cambios externos)"""
+        self.beginResetModel()
+        self.search_index = self._pending = None
+        self._filter_keys = self._ensure_index().search(self._query) if self._query else None
+        self._rows = [key for key in self.store.keys_recent() if self._matches(key)]
+        self._reindex_rows()
+        self.endResetModel()
+
+    # Con más tramos que esto un reset es más barato para la vista que tantas señales
+    MAX_INCREMENTAL_RANGES = 200
+
+    def _apply_rows(self, new_rows):
+        """Pasa de las filas actuales a new_rows con inserciones/borrados por tramos.
+
+        Ambas listas siguen el orden del store, así que basta un recorrido lineal.
+        """
+        old_set = set(self._rows)
+        new_set = set(new_rows)
+        if self._count_ranges(self._rows, new_set) + self._count_ranges(new_rows, old_set) > self.MAX_INCREMENTAL_RANGES:
+            self.beginResetModel()
+            self._rows = new_rows
+            self._reindex_rows()
+            self.endResetModel()
+            return
+        i = j = 0
+        while i < len(self._rows) or j < len(new_rows):
+            if i < len(self._rows) and self._rows[i] not in new_set:
+                end = i
+                while end < len(self._rows) and self._rows[end] not in new_set:
+                    end += 1
+                self.beginRemoveRows(QModelIndex(), i, end - 1)
+                del self._rows[i:end]
+                self.endRemoveRows()
+            elif j < len(new_rows) and new_rows[j] not in old_set:
+                end = j
+                while end < len(new_rows) and new_rows[end] not in old_set:
+                    end += 1
+                self.beginInsertRows(QModelIndex(), i, i + end - j - 1)
+                self._rows[i:i] = new_rows[j:end]
+                self.endInsertRows()
+                i += end - j
+                j = end
+            else:
+                i += 1
+                j += 1
+        self._reindex_rows()
+
+    @staticmethod
+    def _count_ranges(rows, keep):
+        """Número de tramos contiguos de rows que no están en keep"""
+        ranges = 0
+        inside = False
+        for key in rows:
+            missing = key not in keep
+            if missing and not inside:
+                ranges += 1
+            inside = missing
+        return ranges
+
+
+def format_duration(seconds):
+    seconds = int(seconds or 0)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
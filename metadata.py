@@ -0,0 +1,285 @@
+"""Metadatos (título, canal) y miniaturas de los videos del historial."""
+import functools
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+from PyQt5.QtCore import QObject, QSize, Qt, QTimer, QUrl, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from PyQt5.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+from youtube_url import parse_youtube_url
+
+
+# Endpoint oEmbed (título, canal y miniatura); se puede apuntar a un servidor de pruebas
+OEMBED_URL = os.environ.get("YOUTUBE_FLOATER_OEMBED", "https://www.youtube.com/oembed")
+
+
+class MetadataService(QObject):
+    """Título, canal y miniatura de los videos del historial, en segundo plano.
+
+    Dos niveles de caché: en memoria un LRU de QPixmap con presupuesto en bytes
+    y en disco, por clave (id del video), un .json con los metadatos y un .jpg
+    con la miniatura ya reducida. Lo que no está en disco se pide por oEmbed
+    con un QNetworkAccessManager compartido y como mucho MAX_CONCURRENT
+    peticiones a la vez; las peticiones repetidas de una clave se agrupan.
+
+    La lectura de disco y la decodificación de imágenes se hacen en un hilo
+    aparte: el hilo de la interfaz sólo convierte QImage -> QPixmap.
+
+    Si una clave se queda sin miniatura (video borrado o privado, error de
+    red, URL que no es de YouTube) se emite metadataFailed y unavailable()
+    lo indica hasta el final de la sesión.
+    """
+    metadataReady = pyqtSignal(str, dict)
+    thumbnailReady = pyqtSignal(str)
+    metadataFailed = pyqtSignal(str)
+
+    MAX_CONCURRENT = 4
+    PIXMAP_BUDGET = 8 * 1024 * 1024
+    THUMB_SIZE = QSize(128, 72)
+    REQUEST_TIMEOUT_MS = 10000
+    # Videos borrados/privados: no volver a preguntar hasta pasado este tiempo
+    RETRY_MISSING_AFTER = 86400
+
+    # Señales internas desde el hilo de disco (llegan encoladas al de la interfaz)
+    _loaded = pyqtSignal(str, str, object, object)  # clave, url, metadatos, QImage
+    _decoded = pyqtSignal(str, object)  # clave, QImage
+
+    def __init__(self, directory, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self._network = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata")
+        self._pixmaps = OrderedDict()  # clave -> QPixmap, de menos a más reciente
+        self._pixmap_bytes = 0
+        self._pending = set()  # claves en curso (agrupa peticiones repetidas)
+        self._unavailable = set()  # claves sin metadatos en esta sesión
+        self._queue = deque()  # (clave, url, metadatos ya conocidos) esperando turno de red
+        self._active = 0
+        self._replies = {}  # QNetworkReply en curso -> callback(reply)
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "network_fetches": 0, "failures": 0}
+        self._loaded.connect(self._on_loaded)
+        self._decoded.connect(self._on_decoded)
+
+    def _manager(self):
+        if self._network is None:
+            self._network = QNetworkAccessManager(self)
+        return self._network
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, key + ext)
+
+    def pixmap(self, key):
+        """Miniatura en memoria, o None (en ese caso conviene llamar a request())"""
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            self.stats["memory_hits"] += 1
+        return pixmap
+
+    def request(self, key, url):
+        """Pide metadatos y miniatura de key; el resultado llega por señales. No bloquea nunca"""
+        if key in self._pixmaps or key in self._pending or key in self._unavailable:
+            return
+        if not re.fullmatch(r"[A-Za-z0-9_-]+", key or "") or parse_youtube_url(url) is None:
+            self._unavailable.add(key)
+            # Diferido: request() se llama mientras la vista pinta la fila
+            QTimer.singleShot(0, functools.partial(self.metadataFailed.emit, key))
+            return
+        self._pending.add(key)
+        self._executor.submit(self._load_from_disk, key, url)
+
+    # --- disco (hilo de fondo) ---
+
+    def _load_from_disk(self, key, url):
+        meta = image = None
+        try:
+            with open(self._path(key, ".json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if not meta.get("error"):
+                image = QImage(self._path(key, ".jpg"))
+                image = None if image.isNull() else image
+        except (OSError, ValueError):
+            meta = None
+        self._loaded.emit(key, url, meta, image)
+
+    def _store(self, key, meta, data):
+        image = None
+        if data:
+            image = QImage.fromData(data)
+            if image.isNull():
+                image = None
+                meta = dict(meta, thumbnail_failed_at=time.time())
+            else:
+                meta = {name: value for name, value in meta.items() if name != "thumbnail_failed_at"}
+                # hqdefault es 4:3 con bandas negras: escalar y recortar al centro en 16:9
+                image = image.scaled(self.THUMB_SIZE, Qt.KeepAspectRatioByExpanding, Qt.SmoothTransformation)
+                size = self.THUMB_SIZE
+                image = image.copy((image.width() - size.width()) // 2, (image.height() - size.height()) // 2,
+                                   size.width(), size.height())
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            if image is not None:
+                image.save(self._path(key, ".jpg"), "JPG", 85)
+            with open(self._path(key, ".json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+        except OSError:
+            logging.debug(f"No se pudo guardar la caché de metadatos de {key}")
+        self._decoded.emit(key, image)
+
+    # --- hilo de la interfaz ---
+
+    def _on_loaded(self, key, url, meta, image):
+        if meta and meta.get("error"):
+            if time.time() - meta.get("fetched_at", 0) < self.RETRY_MISSING_AFTER:
+                self._mark_unavailable(key)
+                return
+            meta = None
+        if meta:
+            self.metadataReady.emit(key, meta)
+        if meta and image is None and self._thumbnail_missing(meta):
+            self._mark_unavailable(key)
+            return
+        if meta and image is not None:
+            self.stats["disk_hits"] += 1
+            self._on_decoded(key, image)
+            return
+        self._queue.append((key, url, meta))
+        self._pump()
+
+    def _thumbnail_missing(self, meta):
+        """El video no tiene miniatura (o dio error al pedirla) y aún no toca volver a probar"""
+        checked = meta.get("thumbnail_failed_at") if meta.get("thumbnail_url") else meta.get("fetched_at")
+        return bool(checked) and time.time() - checked < self.RETRY_MISSING_AFTER
+
+    def _pump(self):
+        while self._active < self.MAX_CONCURRENT and self._queue:
+            key, url, meta = self._queue.popleft()
+            self._active += 1
+            if meta and meta.get("thumbnail_url"):
+                self._fetch_thumbnail(key, meta)
+            else:
+                self._fetch_oembed(key, url)
+
+    def _get(self, url, callback):
+        request = QNetworkRequest(QUrl(url))
+        request.setAttribute(QNetworkRequest.RedirectPolicyAttribute, QNetworkRequest.NoLessSafeRedirectPolicy)
+        if hasattr(request, "setTransferTimeout"):
+            request.setTransferTimeout(self.REQUEST_TIMEOUT_MS)
+            reply = self._manager().get(request)
+        else:
+            # Qt < 5.15: abortar a mano; el temporizador muere con la respuesta
+            reply = self._manager().get(request)
+            timer = QTimer(reply)
+            timer.setSingleShot(True)
+            timer.timeout.connect(reply.abort)
+            timer.start(self.REQUEST_TIMEOUT_MS)
+        # La respuesta y su callback viven en _replies hasta que termina
+        self._replies[reply] = callback
+        reply.finished.connect(self._on_reply_finished)
+
+    def _on_reply_finished(self):
+        reply = self.sender()
+        callback = self._replies.pop(reply, None)
+        if callback is not None:
+            callback(reply)
+
+    def _fetch_oembed(self, key, url):
+        parsed = parse_youtube_url(url)
+        if parsed.video_id:
+            canonical = f"https://www.youtube.com/watch?v={parsed.video_id}"
+        else:
+            canonical = f"https://www.youtube.com/playlist?list={parsed.playlist_id}"
+        self.stats["network_fetches"] += 1
+        self._get(f"{OEMBED_URL}?format=json&url={quote(canonical, safe='')}", functools.partial(self._on_oembed, key))
+
+    def _on_oembed(self, key, reply):
+        reply.deleteLater()
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if reply.error() != QNetworkReply.NoError:
+            self._fail(key, status)
+            return
+        try:
+            data = json.loads(bytes(reply.readAll()).decode("utf-8"))
+        except ValueError:
+            self._fail(key, status)
+            return
+        meta = {
+            "title": data.get("title"),
+            "channel": data.get("author_name"),
+            "thumbnail_url": data.get("thumbnail_url"),
+            "fetched_at": time.time(),
+        }
+        self.metadataReady.emit(key, meta)
+        if meta["thumbnail_url"]:
+            self._fetch_thumbnail(key, meta)
+        else:
+            self._executor.submit(self._store, key, meta, None)
+            self._finish_fetch()
+
+    def _fetch_thumbnail(self, key, meta):
+        self._get(meta["thumbnail_url"], functools.partial(self._on_thumbnail, key, meta))
+
+    def _on_thumbnail(self, key, meta, reply):
+        reply.deleteLater()
+        data = None
+        if reply.error() == QNetworkReply.NoError:
+            data = bytes(reply.readAll())
+        elif reply.attribute(QNetworkRequest.HttpStatusCodeAttribute) in (403, 404, 410):
+            # Miniatura que no existe: recordarlo; los errores de red sí se reintentan
+            meta = dict(meta, thumbnail_failed_at=time.time())
+        self._executor.submit(self._store, key, meta, data)
+        self._finish_fetch()
+
+    def _fail(self, key, status):
+        self.stats["failures"] += 1
+        self._mark_unavailable(key)
+        if status in (401, 403, 404):
+            # Video privado o borrado: recordarlo en disco para no preguntar en cada arranque
+            self._executor.submit(self._store, key, {"error": status, "fetched_at": time.time()}, None)
+        self._finish_fetch()
+
+    def _finish_fetch(self):
+        self._active -= 1
+        self._pump()
+
+    def _mark_unavailable(self, key):
+        self._pending.discard(key)
+        if key in self._unavailable:
+            return  # p. ej. al terminar de guardar en disco el error de un 404
+        self._unavailable.add(key)
+        self.metadataFailed.emit(key)
+
+    def unavailable(self, key):
+        """True si key se quedó sin miniatura en esta sesión (no hay nada más que esperar)"""
+        return key in self._unavailable
+
+    def _on_decoded(self, key, image):
+        if image is None:
+            self._mark_unavailable(key)
+            return
+        self._pending.discard(key)
+        pixmap = QPixmap.fromImage(image)
+        old = self._pixmaps.pop(key, None)
+        if old is not None:
+            self._pixmap_bytes -= self._pixmap_size(old)
+        self._pixmaps[key] = pixmap
+        self._pixmap_bytes += self._pixmap_size(pixmap)
+        while self._pixmap_bytes > self.PIXMAP_BUDGET and len(self._pixmaps) > 1:
+            _, evicted = self._pixmaps.popitem(last=False)
+            self._pixmap_bytes -= self._pixmap_size(evicted)
+        self.thumbnailReady.emit(key)
+
+    @staticmethod
+    def _pixmap_size(pixmap):
+        return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+    @property
+    def pixmap_bytes(self):
+        return self._pixmap_bytes
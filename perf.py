@@ -0,0 +1,59 @@
+"""Métricas de rendimiento de la aplicación.
+
+perf_metrics acumula por nombre de operación cuántas veces se hizo y cuánto
+tardó; timed() lo aplica a una función entera. Las operaciones lentas se
+anotan además en el log de rendimiento (perf_log).
+"""
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Log de rendimiento; setup_logging() del script principal lo manda también a un fichero
+perf_log = logging.getLogger("youtube_floater.perf")
+
+
+class PerfMetrics:
+    """Tiempos por operación (número, total, máximo, último); seguro entre hilos"""
+    # Las operaciones que tarden más que esto se anotan también en el log
+    SLOW_MS = 50
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed_ms):
+        with self._lock:
+            stats = self._stats.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "last_ms": 0.0})
+            stats["count"] += 1
+            stats["total_ms"] += elapsed_ms
+            stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+            stats["last_ms"] = elapsed_ms
+        if elapsed_ms >= self.SLOW_MS:
+            perf_log.info(f"Operación lenta: {name} tardó {elapsed_ms:.0f} ms")
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+perf_metrics = PerfMetrics()
+
+
+def timed(name):
+    """Decorador: registra en perf_metrics cuánto tarda cada llamada"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with perf_metrics.measure(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,141 @@
+"""Ventanas de reproductor abiertas: límite de reproductores y ciclo de vida.
+
+PlayerManager y PlayerLifecyclePolicy no conocen las clases de ventana; les
+basta con que cada una tenga:
+
+  closed, activated       señales (window) al cerrarse y al usarse
+  lifecycle_state         "active", "frozen", "paused" o "discarded"
+  can_discard             si discard() libera de verdad el renderer
+  is_backgrounded()       si no se ve (minimizada, oculta o tapada)
+  freeze(), discard(), wake(), close(), release()
+  render_process_pid()    pid del renderer, o None si no tiene
+"""
+import logging
+import time
+from collections import OrderedDict
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class PlayerLifecyclePolicy(QObject):
+    """Mueve los reproductores que no se ven por Active -> Frozen -> Discarded.
+
+    Cada pocos segundos revisa las ventanas del PlayerManager: las que llevan
+    freeze_delay segundos en segundo plano se congelan y, tras discard_delay,
+    se descartan (liberando el renderer) si la ventana lo permite. En Qt sin
+    estados de ciclo de vida freeze() pausa el video mediante la IFrame API.
+    """
+    CHECK_INTERVAL_MS = 2000
+
+    def __init__(self, manager, enabled=True, freeze_delay=10, discard_delay=600, parent=None):
+        super().__init__(parent)
+        self.manager = manager
+        self.enabled = enabled
+        self.freeze_delay = freeze_delay
+        self.discard_delay = discard_delay
+        self._hidden_since = {}  # id(window) -> time.monotonic()
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.CHECK_INTERVAL_MS)
+        self._timer.timeout.connect(self.evaluate)
+        self.set_enabled(enabled)
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if enabled:
+            self._timer.start()
+        else:
+            self._timer.stop()
+            self._hidden_since.clear()
+            for window in self.manager.windows():
+                window.wake()
+
+    def evaluate(self):
+        now = time.monotonic()
+        alive = set()
+        for window in self.manager.windows():
+            key = id(window)
+            alive.add(key)
+            if not window.is_backgrounded():
+                self._hidden_since.pop(key, None)
+                window.wake()
+                continue
+            hidden_for = now - self._hidden_since.setdefault(key, now)
+            if window.can_discard and hidden_for >= self.discard_delay and window.lifecycle_state == "frozen":
+                window.discard()
+            elif hidden_for >= self.freeze_delay and window.lifecycle_state == "active":
+                window.freeze()
+        for key in list(self._hidden_since):
+            if key not in alive:
+                del self._hidden_since[key]
+
+
+class PlayerManager(QObject):
+    """Ciclo de vida de las ventanas flotantes abiertas.
+
+    Libera las ventanas cerradas y mantiene como máximo max_players vivas,
+    cerrando la usada hace más tiempo (LRU). max_players = 0 desactiva el límite.
+    """
+    statsChanged = pyqtSignal(dict)
+
+    def __init__(self, max_players=4, parent=None):
+        super().__init__(parent)
+        self.max_players = max(0, max_players)
+        self._windows = OrderedDict()  # id(window) -> window, de menos a más reciente
+
+    def register(self, window):
+        window.closed.connect(self.release)
+        window.activated.connect(self.touch)
+        self._windows[id(window)] = window
+        self.enforce_limit()
+        self._emit_stats()
+
+    def touch(self, window):
+        if id(window) in self._windows:
+            self._windows.move_to_end(id(window))
+
+    def set_max_players(self, max_players):
+        self.max_players = max(0, max_players)
+        self.enforce_limit()
+        self._emit_stats()
+
+    def enforce_limit(self):
+        """Mantiene como mucho max_players reproductores con renderer vivo.
+
+        Primero descarta los que están en segundo plano (siguen abiertos y se
+        recargan al mostrarse); si no basta, cierra el menos usado.
+        """
+        if not self.max_players:
+            return
+        live = [w for w in self._windows.values() if w.lifecycle_state != "discarded"]
+        while len(live) > self.max_players:
+            oldest = live.pop(0)
+            if oldest.can_discard and oldest.is_backgrounded():
+                logging.info(f"Límite de {self.max_players} reproductores alcanzado, descartando uno en segundo plano")
+                oldest.discard()
+            else:
+                logging.info(f"Límite de {self.max_players} reproductores alcanzado, cerrando el menos usado")
+                # close() emite closed -> release() lo saca de la lista
+                oldest.close()
+                self._windows.pop(id(oldest), None)
+
+    def release(self, window):
+        if self._windows.pop(id(window), None) is None:
+            return
+        window.release()
+        self._emit_stats()
+
+    def windows(self):
+        return list(self._windows.values())
+
+    def stats(self):
+        pids = {pid for pid in (w.render_process_pid() for w in self._windows.values()) if pid}
+        return {"players": len(self._windows), "renderers": len(pids)}
+
+    def _emit_stats(self):
+        stats = self.stats()
+        logging.info(f"Reproductores vivos: {stats['players']}, renderers: {stats['renderers']}")
+        self.statsChanged.emit(stats)
+
+    def close_all(self):
+        for window in self.windows():
+            window.close()
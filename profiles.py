@@ -0,0 +1,446 @@
+"""Perfiles de QtWebEngine y su caché en disco.
+
+QtWebEngine se importa bajo demanda en el script principal (load_webengine),
+así que aquí sólo se importa dentro de los métodos que lo usan: el módulo se
+puede cargar (y probar) sin Chromium.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _last_used(path):
+    """Último acceso aproximado (mtime más reciente) de un fichero o carpeta"""
+    if not os.path.isdir(path):
+        return os.path.getmtime(path)
+    latest = os.path.getmtime(path)
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                latest = max(latest, os.path.getmtime(os.path.join(root, name)))
+            except OSError:
+                pass
+    return latest
+
+
+def _remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+
+class ProfileCacheManager(QObject):
+    """Caché HTTP y almacenamiento del perfil de QtWebEngine con cuota de disco.
+
+    configure() ajusta el perfil una sola vez: rutas propias para la caché HTTP
+    y el almacenamiento persistente, y un tamaño máximo para la caché HTTP (que
+    Chromium recorta por su cuenta). El resto de la cuota es para el
+    almacenamiento: al arrancar, en un hilo aparte, se borran las entradas por
+    origen/script que llevan STALE_DAYS sin usarse y, si aún se supera la
+    cuota, las usadas hace más tiempo (LRU). Cookies y Local Storage no se tocan.
+    Los perfiles que llegan mientras dura el recorte se configuran al terminar,
+    sin esperar por él en el hilo de la interfaz.
+
+    Aciertos y fallos: el perfil lleva un script (RESOURCE_TIMING_JS) que se
+    ejecuta en cada iframe, también en el del reproductor de YouTube, cuyos
+    recursos no ve la página contenedora. Clasifica las entradas de Resource
+    Timing de su propio documento y las manda en lotes por la consola con
+    REPORT_PREFIX; la página se las pasa a record_report().
+    """
+    statsChanged = pyqtSignal(dict)
+
+    HTTP_CACHE_SHARE = 0.6
+    STALE_DAYS = 30
+    # Carpetas del almacenamiento de Chromium cuyos elementos se pueden borrar uno a uno
+    EVICTABLE = (
+        "IndexedDB", os.path.join("Service Worker", "CacheStorage"), os.path.join("Service Worker", "ScriptCache"),
+        os.path.join("Code Cache", "js"), os.path.join("Code Cache", "wasm"), "File System", "GPUCache",
+    )
+    # Lo que las versiones anteriores dejaban directamente en CACHE_DIR
+    LEGACY_STORAGE = (
+        "Cookies", "Cookies-journal", "Local Storage", "Session Storage", "IndexedDB", "Service Worker",
+        "Code Cache", "GPUCache", "File System", "databases", "blob_storage", "QuotaManager",
+        "QuotaManager-journal", "Visited Links", "Network Persistent State", "TransportSecurity",
+        "Platform Notifications", "Origin Bound Certs", "Origin Bound Certs-journal", "user_prefs.json",
+    )
+
+    # Marca para vaciar el almacenamiento en el próximo arranque (con el perfil cerrado)
+    CLEAR_MARKER = "clear-storage"
+
+    REPORT_PREFIX = "__floater_cache__"
+    REPORT_DELAY_MS = 2000
+    # En un mundo aislado (no interfiere con la página) y sólo en iframes: la
+    # página contenedora se sirve desde memoria. transferSize 0 = servido desde
+    # caché; menor que el cuerpo = revalidado (304); sin decodedBodySize el
+    # recurso es de otro origen sin Timing-Allow-Origin y no se puede saber
+    RESOURCE_TIMING_JS = """
+    (function () {
+      if (window.top === window || !window.PerformanceObserver) { return; }
+      var counts = null;
+      function flush() {
+        console.debug('%s' + JSON.stringify(counts));
+        counts = null;
+      }
+      new PerformanceObserver(function (list) {
+        if (!counts) {
+          counts = {hits: 0, revalidated: 0, misses: 0, opaque: 0};
+          setTimeout(flush, %d);
+        }
+        list.getEntries().forEach(function (e) {
+          if (!e.decodedBodySize) { counts.opaque++; }
+          else if (e.transferSize === 0) { counts.hits++; }
+          else if (e.transferSize < e.encodedBodySize) { counts.revalidated++; }
+          else { counts.misses++; }
+        });
+      }).observe({type: 'resource', buffered: true});
+    })();
+    """ % (REPORT_PREFIX, REPORT_DELAY_MS)
+    RESOURCE_KINDS = ("hits", "revalidated", "misses", "opaque")
+
+    # Emitidas desde el hilo de mantenimiento; llegan encoladas al hilo de la interfaz
+    _scanned = pyqtSignal(dict)
+    _trimmed = pyqtSignal()
+
+    def __init__(self, root, quota_mb=500, parent=None):
+        super().__init__(parent)
+        self.root = root
+        self.http_cache_path = os.path.join(root, "http-cache")
+        self.storage_path = os.path.join(root, "storage")
+        self.quota_mb = quota_mb
+        self._profiles = []
+        self._pending = []  # perfiles a la espera de que termine el recorte
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cache-maintenance")
+        self._trim_future = None
+        self._stats = {
+            "http_bytes": None, "storage_bytes": None, "evicted_entries": 0, "evicted_bytes": 0,
+            "hits": 0, "revalidated": 0, "misses": 0, "opaque": 0,
+        }
+        self._scanned.connect(self._on_scanned)
+        self._trimmed.connect(self._configure_pending)
+
+    @property
+    def quota_bytes(self):
+        return self.quota_mb * 1024 * 1024
+
+    @property
+    def http_cache_max_bytes(self):
+        return int(self.quota_bytes * self.HTTP_CACHE_SHARE)
+
+    def configure(self, profile):
+        """Aplica rutas y límites al perfil (sólo la primera vez para cada perfil)"""
+        if any(known is profile for known in self._profiles + self._pending):
+            return
+        if self._trim_future is not None and not self._trim_future.done():
+            # No abrir el almacenamiento a medio borrar: se configura al terminar el recorte
+            self._pending.append(profile)
+            return
+        self._apply(profile)
+
+    def _configure_pending(self):
+        pending, self._pending = self._pending, []
+        for profile in pending:
+            self._apply(profile)
+
+    def _apply(self, profile):
+        from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+        try:
+            os.makedirs(self.http_cache_path, exist_ok=True)
+            os.makedirs(self.storage_path, exist_ok=True)
+            # Preferir almacenamiento persistente para cookies/credenciales
+            profile.setPersistentCookiesPolicy(QWebEngineProfile.ForcePersistentCookies)
+            profile.setCachePath(self.http_cache_path)
+            profile.setPersistentStoragePath(self.storage_path)
+            profile.setHttpCacheType(QWebEngineProfile.DiskHttpCache)
+            profile.setHttpCacheMaximumSize(self.http_cache_max_bytes)
+        except Exception:
+            logging.debug("No se pudo configurar almacenamiento persistente del perfil")
+        try:
+            self._install_resource_timing(profile)
+        except Exception:
+            logging.debug("No se pudo instalar el script de aciertos de caché")
+        self._profiles.append(profile)
+
+    def _install_resource_timing(self, profile):
+        from PyQt5.QtWebEngineWidgets import QWebEngineScript
+        script = QWebEngineScript()
+        script.setName("cache-resource-timing")
+        script.setSourceCode(self.RESOURCE_TIMING_JS)
+        script.setInjectionPoint(QWebEngineScript.DocumentCreation)
+        script.setWorldId(QWebEngineScript.ApplicationWorld)
+        script.setRunsOnSubFrames(True)
+        profile.scripts().insert(script)
+
+    def record_report(self, payload):
+        """Suma un lote de RESOURCE_TIMING_JS (el JSON que va tras REPORT_PREFIX)"""
+        try:
+            counts = json.loads(payload)
+        except ValueError:
+            logging.debug("Informe de caché inválido")
+            return
+        if not isinstance(counts, dict):
+            return
+        for kind in self.RESOURCE_KINDS:
+            value = counts.get(kind)
+            if isinstance(value, int) and value > 0:
+                self._stats[kind] += value
+        self.statsChanged.emit(self.stats())
+
+    def set_quota(self, quota_mb):
+        """Nueva cuota: la caché HTTP se ajusta ya, el almacenamiento en el próximo arranque"""
+        self.quota_mb = max(50, int(quota_mb))
+        for profile in self._profiles:
+            profile.setHttpCacheMaximumSize(self.http_cache_max_bytes)
+
+    def start_maintenance(self):
+        """Migra la disposición antigua y recorta el almacenamiento, en segundo plano"""
+        if self._trim_future is None:
+            self._trim_future = self._executor.submit(self._maintain)
+            self._trim_future.add_done_callback(lambda _: self._trimmed.emit())
+
+    def _maintain(self):
+        try:
+            self._migrate_legacy()
+            marker = os.path.join(self.root, self.CLEAR_MARKER)
+            clear_all = os.path.exists(marker)
+            evicted, freed = self._trim_storage(everything=clear_all)
+            if clear_all:
+                os.remove(marker)
+            logging.debug(f"Caché: {evicted} entradas de almacenamiento eliminadas ({freed / 1e6:.1f} MB)")
+            self._scan(evicted, freed)
+        except Exception:
+            logging.exception("Error en el mantenimiento de la caché")
+
+    def _migrate_legacy(self):
+        legacy_http = os.path.join(self.root, "Cache")
+        if os.path.isdir(legacy_http) and not os.path.exists(os.path.join(self.http_cache_path, "Cache")):
+            os.makedirs(self.http_cache_path, exist_ok=True)
+            os.replace(legacy_http, os.path.join(self.http_cache_path, "Cache"))
+        for name in self.LEGACY_STORAGE:
+            source = os.path.join(self.root, name)
+            target = os.path.join(self.storage_path, name)
+            if os.path.exists(source) and not os.path.exists(target):
+                os.makedirs(self.storage_path, exist_ok=True)
+                os.replace(source, target)
+
+    def _evictable_entries(self):
+        """(último uso, tamaño, ruta) de cada elemento borrable del almacenamiento"""
+        entries = []
+        for container in self.EVICTABLE:
+            folder = os.path.join(self.storage_path, container)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    size = _dir_size(path) if os.path.isdir(path) else os.path.getsize(path)
+                    entries.append((_last_used(path), size, path))
+                except OSError:
+                    continue
+        return sorted(entries)
+
+    def _trim_storage(self, everything=False):
+        entries = self._evictable_entries()
+        storage_budget = self.quota_bytes - self.http_cache_max_bytes
+        total = _dir_size(self.storage_path)
+        stale_before = time.time() - self.STALE_DAYS * 86400
+        evicted = freed = 0
+        for last_used, size, path in entries:
+            if not everything and last_used >= stale_before and total <= storage_budget:
+                break
+            try:
+                _remove_path(path)
+            except OSError:
+                continue
+            evicted += 1
+            freed += size
+            total -= size
+        return evicted, freed
+
+    def _scan(self, evicted=0, freed=0):
+        self._scanned.emit({
+            "http_bytes": _dir_size(self.http_cache_path),
+            "storage_bytes": _dir_size(self.storage_path),
+            "evicted_entries": evicted,
+            "evicted_bytes": freed,
+        })
+
+    def _on_scanned(self, sizes):
+        sizes["evicted_entries"] += self._stats["evicted_entries"]
+        sizes["evicted_bytes"] += self._stats["evicted_bytes"]
+        self._stats.update(sizes)
+        self.statsChanged.emit(self.stats())
+
+    def refresh_stats(self):
+        """Recalcula los tamaños en segundo plano; el resultado llega por statsChanged"""
+        self._executor.submit(self._scan)
+
+    def clear(self):
+        """Vacía la caché HTTP ya y deja el almacenamiento borrable marcado para el próximo arranque.
+
+        Chromium tiene abiertos IndexedDB, CacheStorage, etc. mientras el perfil
+        vive, así que esos se borran en el mantenimiento del siguiente inicio.
+        Cookies y Local Storage se conservan.
+        """
+        for profile in self._profiles:
+            profile.clearHttpCache()
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, self.CLEAR_MARKER), "w", encoding="utf-8"):
+                pass
+        except OSError:
+            logging.exception("No se pudo marcar el almacenamiento para vaciarlo")
+        QTimer.singleShot(1000, self.refresh_stats)
+
+    @property
+    def storage_clear_pending(self):
+        return os.path.exists(os.path.join(self.root, self.CLEAR_MARKER))
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["storage_clear_pending"] = self.storage_clear_pending
+        stats["quota_bytes"] = self.quota_bytes
+        # Revalidado (304) también es acierto: el cuerpo salió de la caché
+        known = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["revalidated"]) / known if known else None
+        return stats
+
+
+class ProfileManager(QObject):
+    """Perfiles de QtWebEngine de la aplicación y las páginas que salen de ellos.
+
+    El perfil principal (con nombre, persistente) se crea y configura una sola
+    vez: rutas y cuota de caché (ProfileCacheManager), User Agent y ajustes por
+    defecto de las páginas. Las ventanas de incógnito reciben cada una un perfil
+    sin disco (off-the-record) que se destruye con la ventana.
+
+    Las decisiones de permisos se guardan por (origen, permiso): sólo la
+    primera petición de cada origen pasa por decide_permission() y el log.
+
+    La clase de las páginas (page_class) y el manejador del esquema del
+    reproductor (install_scheme) los pone el script principal al cargar
+    QtWebEngine.
+    """
+    # Emitida al crear y configurar el perfil principal
+    profileCreated = pyqtSignal()
+
+    PROFILE_NAME = "YouTubeFloater"
+    USER_AGENT = (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36"
+    )
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self._profile = None
+        self.page_class = None  # QWebEnginePage por defecto
+        self._scheme = None  # (esquema, clase del manejador)
+        self._scheme_handler = None
+        self._permissions = {}  # (origen, permiso) -> política
+        self.permission_requests = 0
+        self.permission_cache_hits = 0
+        self.incognito_profiles = 0
+
+    def install_scheme(self, scheme, handler_class):
+        """Instala handler_class (uno solo, compartido) para scheme en todos los perfiles"""
+        self._scheme = (scheme, handler_class)
+
+    def profile(self, incognito=False, owner=None):
+        """Perfil compartido, o uno nuevo de incógnito que vive lo que owner"""
+        from PyQt5.QtWebEngineWidgets import QWebEngineProfile
+        if incognito:
+            profile = QWebEngineProfile(self)  # sin nombre: off-the-record
+            self._configure(profile)
+            self.incognito_profiles += 1
+            if owner is not None:
+                # Diferido: las páginas del perfil se borran antes que él
+                owner.destroyed.connect(lambda *_: self._release_incognito(profile))
+            return profile
+        if self._profile is None:
+            self._profile = QWebEngineProfile(self.PROFILE_NAME, self)
+            self.cache.configure(self._profile)
+            self._configure(self._profile)
+            self.profileCreated.emit()
+        return self._profile
+
+    def _release_incognito(self, profile):
+        self.incognito_profiles -= 1
+        QTimer.singleShot(0, profile.deleteLater)
+
+    def _configure(self, profile):
+        from PyQt5.QtWebEngineWidgets import QWebEngineProfile, QWebEngineSettings
+        try:
+            profile.setHttpUserAgent(self.USER_AGENT)
+        except Exception:
+            logging.debug("No se pudo establecer User Agent en el perfil")
+        if profile.isOffTheRecord():
+            profile.setHttpCacheType(QWebEngineProfile.MemoryHttpCache)
+        if self._scheme is not None:
+            scheme, handler_class = self._scheme
+            # Un único manejador para todos los perfiles
+            if self._scheme_handler is None:
+                self._scheme_handler = handler_class(self)
+            profile.installUrlSchemeHandler(scheme, self._scheme_handler)
+
+        # Ajustes por defecto de todas las páginas del perfil
+        settings = profile.settings()
+        settings.setAttribute(QWebEngineSettings.FullScreenSupportEnabled, True)
+        settings.setAttribute(QWebEngineSettings.PlaybackRequiresUserGesture, False)
+        settings.setAttribute(QWebEngineSettings.PluginsEnabled, True)
+        settings.setAttribute(QWebEngineSettings.LocalStorageEnabled, True)
+        # Permitir que contenido local cargue recursos remotos (para setHtml baseUrl)
+        try:
+            settings.setAttribute(QWebEngineSettings.LocalContentCanAccessRemoteUrls, True)
+            settings.setAttribute(QWebEngineSettings.LocalContentCanAccessFileUrls, True)
+        except Exception:
+            logging.debug("Some LocalContent settings not available on this Qt version")
+
+    def create_page(self, profile, parent):
+        if self.page_class is None:
+            from PyQt5.QtWebEngineWidgets import QWebEnginePage
+            page = QWebEnginePage(profile, parent)
+        else:
+            page = self.page_class(profile, parent)
+        try:
+            page.featurePermissionRequested.connect(self._on_permission_requested)
+        except Exception:
+            logging.debug("featurePermissionRequested not available in this Qt version")
+        return page
+
+    def decide_permission(self, origin, feature):
+        # Permitir automáticamente permisos solicitados por la página (audio, cámara, geolocation)
+        from PyQt5.QtWebEngineWidgets import QWebEnginePage
+        return QWebEnginePage.PermissionGrantedByUser
+
+    def _on_permission_requested(self, origin, feature):
+        from PyQt5.QtWebEngineWidgets import QWebEnginePage
+        page = self.sender()
+        self.permission_requests += 1
+        key = (origin.toString(), int(feature))
+        policy = self._permissions.get(key)
+        if policy is None:
+            policy = self._permissions[key] = self.decide_permission(origin, feature)
+            logging.info(f"Permiso {int(feature)} para {key[0]}: {'concedido' if policy == QWebEnginePage.PermissionGrantedByUser else 'denegado'}")
+        else:
+            self.permission_cache_hits += 1
+        try:
+            page.setFeaturePermission(origin, feature, policy)
+        except Exception:
+            logging.debug("Could not set feature permission")
@@ -0,0 +1,117 @@
+"""Configuración persistente con escritura diferida (SettingsService)."""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5.QtCore import QCoreApplication, QObject, QSettings, QTimer, pyqtSignal
+
+from perf import perf_metrics
+
+
+class SettingsService(QObject):
+    """QSettings con escritura diferida y agrupada.
+
+    setValue() sólo marca la clave como pendiente (si el valor cambió); tras
+    QUIET_MS sin cambios todas las pendientes se escriben de una vez en un
+    hilo de fondo. Al salir (aboutToQuit) se vuelca todo de forma síncrona.
+    La API de lectura imita a QSettings para poder sustituirlo sin más.
+    """
+    QUIET_MS = 400
+    _REMOVED = object()
+    # Emitida desde el hilo de escritura; llega al hilo de la interfaz encolada
+    _written = pyqtSignal()
+
+    def __init__(self, organization, application, parent=None):
+        super().__init__(parent)
+        self._names = (organization, application)
+        self._settings = QSettings(organization, application)
+        self._known = {}  # último valor conocido por clave (leído o escrito)
+        # Todo el estado se toca sólo desde el hilo de la interfaz; el hilo de
+        # escritura recibe una copia (snapshot) de las claves a guardar
+        self._pending = {}  # clave -> valor (o _REMOVED) aún sin escribir
+        self._in_flight = {}  # última copia enviada al hilo de escritura
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="settings-writer")
+        self._last_future = None
+        self.changes_requested = 0
+        self.keys_written = 0
+        self.flushes = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.QUIET_MS)
+        self._timer.timeout.connect(self.flush)
+        self._written.connect(self._clear_in_flight)
+        QCoreApplication.instance().aboutToQuit.connect(self.flush_now)
+
+    @property
+    def writes_saved(self):
+        """Cambios que no llegaron a escribirse por haberse agrupado con otros"""
+        return self.changes_requested - self.keys_written - len(self._pending)
+
+    def value(self, key, default=None, type=None):
+        for unsaved in (self._pending, self._in_flight):
+            if key in unsaved:
+                return default if unsaved[key] is self._REMOVED else unsaved[key]
+        if type is None:
+            result = self._settings.value(key, default)
+        else:
+            result = self._settings.value(key, default, type=type)
+        self._known[key] = result
+        return result
+
+    def setValue(self, key, value):
+        if self._known.get(key, self._REMOVED) == value:
+            return
+        self._known[key] = value
+        self._pending[key] = value
+        self.changes_requested += 1
+        self._timer.start()
+
+    def remove(self, key):
+        self._known.pop(key, None)
+        self._pending[key] = self._REMOVED
+        self.changes_requested += 1
+        self._timer.start()
+
+    def _write(self, snapshot):
+        # Cada hilo usa su propia instancia: QSettings es reentrante, no compartible
+        with perf_metrics.measure("escritura de configuración"):
+            settings = QSettings(*self._names)
+            for key, value in snapshot.items():
+                if value is self._REMOVED:
+                    settings.remove(key)
+                else:
+                    settings.setValue(key, value)
+            settings.sync()
+        logging.debug(f"Configuración guardada: {len(snapshot)} claves")
+        self._written.emit()
+
+    def flush(self):
+        """Escribe las claves pendientes en el hilo de fondo"""
+        snapshot, self._pending = self._pending, {}
+        if not snapshot:
+            return
+        self.keys_written += len(snapshot)
+        self.flushes += 1
+        self._in_flight = snapshot
+        self._last_future = self._executor.submit(self._write, snapshot)
+
+    def _clear_in_flight(self):
+        if self._last_future is not None and self._last_future.done():
+            self._in_flight = {}
+
+    def flush_now(self):
+        """Volcado síncrono (al salir): espera también a las escrituras en curso"""
+        self._timer.stop()
+        self.flush()
+        if self._last_future is not None:
+            self._last_future.result()
+            self._in_flight = {}
+        self._settings.sync()
+        logging.debug(f"Configuración: {self.writes_saved} escrituras ahorradas al agrupar cambios")
+
+    def stats(self):
+        return {
+            "changes_requested": self.changes_requested,
+            "keys_written": self.keys_written,
+            "flushes": self.flushes,
+            "writes_saved": self.writes_saved,
+        }
@@ -0,0 +1,237 @@
+"""Telemetría de reproducción: arranque, paradas a cargar, calidad y errores.
+
+Los eventos llegan de las páginas del reproductor en lotes; PlaybackTelemetry
+los reparte en una PlaybackSession por video y ventana y los exporta a JSON o
+al formato de texto de Prometheus. No depende de Qt.
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+
+
+class PlaybackSession:
+    """Métricas de una reproducción (un video en una ventana), calculadas a partir
+    de los eventos de telemetría de la página: (tipo, ms de performance.now(), datos)"""
+    PLAYING, BUFFERING = 1, 3
+
+    def __init__(self, window_id, video_id):
+        self.window_id = window_id
+        self.video_id = video_id
+        self.created_at = time.time()
+        self.startup_ms = None
+        self.rebuffers = 0
+        self.rebuffer_ms = 0.0
+        self.playing_ms = 0.0
+        self.quality = None
+        self.quality_changes = 0
+        self.dropped_frames = None
+        self.total_frames = None
+        self.errors = 0
+        self._loaded_at = None
+        self._state = None
+        self._state_since = None
+
+    def feed(self, kind, t, data):
+        if kind == "load":
+            self._loaded_at = t
+        elif kind == "state":
+            self._advance(t)
+            state = data.get("state")
+            if state == self.PLAYING and self.startup_ms is None and self._loaded_at is not None:
+                self.startup_ms = t - self._loaded_at
+            elif state == self.BUFFERING and self.startup_ms is not None:
+                self.rebuffers += 1
+            self._state = state
+        elif kind in ("quality", "sample"):
+            self._advance(t)
+            quality = data.get("quality")
+            if quality and quality != self.quality:
+                self.quality_changes += self.quality is not None
+                self.quality = quality
+            if "frames" in data:
+                self.dropped_frames = data.get("dropped")
+                self.total_frames = data.get("frames")
+        elif kind == "error":
+            self.errors += 1
+
+    def _advance(self, t):
+        # Acumula el tiempo pasado en el estado actual hasta t
+        if self._state_since is not None:
+            elapsed = max(0, t - self._state_since)
+            if self._state == self.PLAYING:
+                self.playing_ms += elapsed
+            elif self._state == self.BUFFERING and self.startup_ms is not None:
+                self.rebuffer_ms += elapsed
+        self._state_since = t
+
+    def as_dict(self):
+        return {
+            "window": self.window_id,
+            "video": self.video_id,
+            "started": datetime.fromtimestamp(self.created_at).isoformat(timespec="seconds"),
+            "startup_ms": self.startup_ms,
+            "rebuffers": self.rebuffers,
+            "rebuffer_ms": round(self.rebuffer_ms),
+            "playing_ms": round(self.playing_ms),
+            "quality": self.quality,
+            "quality_changes": self.quality_changes,
+            "dropped_frames": self.dropped_frames,
+            "total_frames": self.total_frames,
+            "errors": self.errors,
+        }
+
+
+def _escape_label(value):
+    """Valor de etiqueta para el formato de texto de Prometheus: escapa barras, comillas y saltos de línea"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class PlaybackTelemetry:
+    """Telemetría de reproducción por ventana y de toda la sesión.
+
+    Las páginas envían los eventos en lotes (TelemetryBridge); cada "load"
+    abre una PlaybackSession nueva para la ventana. Se conservan las
+    MAX_SESSIONS más recientes y se exportan a JSON o al formato de texto de
+    Prometheus (export() elige por la extensión del fichero).
+    """
+    MAX_SESSIONS = 200
+
+    def __init__(self):
+        self.sessions = deque(maxlen=self.MAX_SESSIONS)
+        self._current = {}  # id de ventana -> PlaybackSession en curso
+        self.batches = 0
+        self.events = 0
+        # Renderers caídos o colgados (RecoverySupervisor): por motivo y por ventana abierta
+        self.renderer_failures = {}
+        self._window_failures = {}
+
+    def ingest(self, window_id, video_id, events):
+        self.batches += 1
+        self.events += len(events)
+        for event in events:
+            try:
+                kind, t, data = event
+            except (TypeError, ValueError):
+                continue
+            session = self._current.get(window_id)
+            if kind == "load" or session is None:
+                session = PlaybackSession(window_id, video_id)
+                self._current[window_id] = session
+                self.sessions.append(session)
+            session.feed(kind, t, data if isinstance(data, dict) else {})
+
+    def close_window(self, window_id):
+        self._current.pop(window_id, None)
+        self._window_failures.pop(window_id, None)
+
+    def record_renderer_failure(self, window_id, reason):
+        """reason: "crash" (renderer terminado) o "hang" (no responde al ping)"""
+        self.renderer_failures[reason] = self.renderer_failures.get(reason, 0) + 1
+        self._window_failures[window_id] = self._window_failures.get(window_id, 0) + 1
+
+    def windows(self):
+        return {
+            window_id: {**session.as_dict(), "renderer_failures": self._window_failures.get(window_id, 0)}
+            for window_id, session in self._current.items()
+        }
+
+    def totals(self):
+        sessions = list(self.sessions)
+        startups = sorted(s.startup_ms for s in sessions if s.startup_ms is not None)
+        playing_ms = sum(s.playing_ms for s in sessions)
+        rebuffer_ms = sum(s.rebuffer_ms for s in sessions)
+        qualities = {}
+        for session in sessions:
+            if session.quality:
+                qualities[session.quality] = qualities.get(session.quality, 0) + 1
+        return {
+            "sessions": len(sessions),
+            "startup_ms_median": startups[len(startups) // 2] if startups else None,
+            "startup_ms_max": startups[-1] if startups else None,
+            "rebuffers": sum(s.rebuffers for s in sessions),
+            "rebuffer_ms": round(rebuffer_ms),
+            "playing_ms": round(playing_ms),
+            "rebuffer_ratio": rebuffer_ms / (playing_ms + rebuffer_ms) if playing_ms + rebuffer_ms else 0.0,
+            "dropped_frames": sum(s.dropped_frames or 0 for s in sessions),
+            "total_frames": sum(s.total_frames or 0 for s in sessions),
+            "errors": sum(s.errors for s in sessions),
+            "qualities": qualities,
+            "renderer_failures": dict(self.renderer_failures),
+            "batches": self.batches,
+            "events": self.events,
+        }
+
+    def to_json(self):
+        return {
+            "generated_at": datetime.now().isoformat(timespec="seconds"),
+            "session": self.totals(),
+            "windows": self.windows(),
+            "recent": [session.as_dict() for session in self.sessions],
+        }
+
+    def to_prometheus(self):
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{_escape_label(value_)}"' for key, value_ in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        current = list(self._current.values())
+
+        def per_window(attr, scale=1):
+            return [({"window": s.window_id, "video": s.video_id}, getattr(s, attr) * scale)
+                    for s in current if getattr(s, attr) is not None]
+
+        totals = self.totals()
+        metric("floater_playback_sessions", "gauge", f"Reproducciones registradas (últimas {self.MAX_SESSIONS})",
+               [({}, totals["sessions"])])
+        startups = [s.startup_ms for s in self.sessions if s.startup_ms is not None]
+        metric("floater_playback_startup_seconds", "summary", "Tiempo hasta empezar a reproducir",
+               [({"quantile": "0.5"}, (totals["startup_ms_median"] or 0) / 1000)])
+        lines.append(f"floater_playback_startup_seconds_sum {sum(startups) / 1000}")
+        lines.append(f"floater_playback_startup_seconds_count {len(startups)}")
+        metric("floater_playback_rebuffers_total", "counter", "Veces que el video se detuvo a cargar",
+               [({}, totals["rebuffers"])])
+        metric("floater_playback_rebuffer_seconds_total", "counter", "Tiempo detenido cargando",
+               [({}, totals["rebuffer_ms"] / 1000)])
+        metric("floater_playback_playing_seconds_total", "counter", "Tiempo reproduciendo",
+               [({}, totals["playing_ms"] / 1000)])
+        metric("floater_playback_dropped_frames_total", "counter", "Frames descartados (si el reproductor los expone)",
+               [({}, totals["dropped_frames"])])
+        metric("floater_playback_errors_total", "counter", "Errores del reproductor", [({}, totals["errors"])])
+        metric("floater_renderer_failures_total", "counter", "Renderers caídos o colgados y recuperados",
+               [({"reason": reason}, count) for reason, count in sorted(self.renderer_failures.items())])
+        metric("floater_window_startup_seconds", "gauge", "Arranque del video actual de cada ventana",
+               per_window("startup_ms", 0.001))
+        metric("floater_window_rebuffers", "gauge", "Paradas a cargar del video actual de cada ventana",
+               per_window("rebuffers"))
+        metric("floater_window_renderer_failures", "gauge", "Fallos de renderer de cada ventana abierta",
+               [({"window": window_id}, count) for window_id, count in sorted(self._window_failures.items())])
+        metric("floater_window_quality", "gauge", "Calidad actual de cada ventana (1 = en uso)",
+               [({"window": s.window_id, "video": s.video_id, "quality": s.quality}, 1)
+                for s in current if s.quality])
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """Escribe la telemetría en path (.prom/.txt: Prometheus, si no JSON) de forma atómica"""
+        if path.endswith((".prom", ".txt")):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.to_json(), indent=1, ensure_ascii=False)
+        try:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, path)
+            return True
+        except OSError:
+            logging.exception(f"No se pudo exportar la telemetría a {path}")
+            return False
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+try:
+    # QtWebEngine tiene que importarse antes de crear la QApplication
+    from PyQt5 import QtWebEngineWidgets  # noqa: F401
+    WEBENGINE_ERROR = None
+except ImportError as exc:
+    WEBENGINE_ERROR = exc
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """QApplication sin pantalla compartida por las pruebas que necesitan event loop"""
+    from PyQt5.QtCore import QCoreApplication, Qt
+    from PyQt5.QtWidgets import QApplication
+    # Lo exige QtWebEngine si alguna prueba lo carga después
+    QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def wait_until(condition, timeout_ms=3000):
+    """Procesa eventos hasta que condition() sea cierta; devuelve su último valor"""
+    from PyQt5.QtCore import QCoreApplication, QEventLoop
+    deadline = time.monotonic() + timeout_ms / 1000
+    while not condition() and time.monotonic() < deadline:
+        QCoreApplication.processEvents(QEventLoop.AllEvents, 20)
+        time.sleep(0.005)
+    return condition()
+
+
+def run_js(window, script, timeout_ms=5000):
+    """Resultado de script en la página de window (procesando eventos mientras llega)"""
+    result = []
+    window.webview.page().runJavaScript(script, lambda value: result.append(value))
+    assert wait_until(lambda: result, timeout_ms)
+    return result[0]
+
+
+@pytest.fixture(scope="session")
+def app_module(qapp):
+    """El script principal cargado contra el servidor de benchmarks/standin_server.py.
+
+    Necesita QtWebEngine; si no se puede importar, la prueba se salta.
+    """
+    if WEBENGINE_ERROR is not None:
+        pytest.skip(f"QtWebEngine no disponible ({WEBENGINE_ERROR})")
+    import run_benchmarks
+    from standin_server import StandInServer
+    server = StandInServer().start()
+    saved = dict(os.environ)
+    with tempfile.TemporaryDirectory() as home:
+        os.environ.update(run_benchmarks.isolated_env(server, home))
+        module = run_benchmarks.load_app_module()
+        module.chromium_runtime.apply("compat")
+        module.load_webengine()
+        yield module
+        qapp.processEvents()
+        os.environ.clear()
+        os.environ.update(saved)
+    server.stop()
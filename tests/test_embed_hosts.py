@@ -0,0 +1,195 @@
+import json
+import random
+
+import pytest
+from PyQt5.QtCore import QObject, QSettings, pyqtSignal
+
+from conftest import wait_until
+from embed_hosts import EmbedHostStats, LoadSupervisor
+from settings_service import SettingsService
+
+FAST, SLOW, OTHER = "https://fast.example", "https://slow.example", "https://other.example"
+
+
+class FakeSettings:
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.writes = 0
+
+    def value(self, key, default=None):
+        return self.values.get(key, default)
+
+    def setValue(self, key, value):
+        self.values[key] = value
+        self.writes += 1
+
+
+def test_ranking_without_history_keeps_default_order():
+    assert EmbedHostStats().ranked([SLOW, FAST, OTHER]) == [SLOW, FAST, OTHER]
+
+
+def test_ranking_prefers_fast_and_reliable_hosts():
+    stats = EmbedHostStats()
+    for _ in range(3):
+        stats.record(FAST, True, 400)
+        stats.record(SLOW, True, 2500)
+        stats.record(OTHER, False)
+    assert stats.ranked([OTHER, SLOW, FAST]) == [FAST, SLOW, OTHER]
+    assert stats.hosts[OTHER]["failures"] == 3
+    # Una racha de fallos hunde al dominio rápido por debajo del lento
+    for _ in range(6):
+        stats.record(FAST, False)
+    assert stats.ranked([FAST, SLOW]) == [SLOW, FAST]
+
+
+def test_censored_load_only_raises_latency():
+    stats = EmbedHostStats()
+    stats.record(SLOW, True, 1000)
+    stats.record(SLOW, None, 500, censored=True)
+    assert stats.hosts[SLOW]["latency_ms"] == 1000
+    assert stats.hosts[SLOW]["loads"] == 1
+    stats.record(SLOW, None, 5000, censored=True)
+    assert stats.hosts[SLOW]["latency_ms"] == pytest.approx(1000 + EmbedHostStats.ALPHA * 4000)
+    assert stats.hosts[SLOW]["success_rate"] == 1.0
+
+
+def test_every_update_is_handed_to_settings():
+    settings = FakeSettings()
+    stats = EmbedHostStats(settings)
+    stats.record(FAST, True, 300)
+    stats.record(SLOW, None, 100, censored=True)  # no cambia nada: no se guarda
+    stats.record(SLOW, False)
+    assert settings.writes == 2
+    assert EmbedHostStats(settings).hosts == stats.hosts
+
+
+def test_memory_only_until_attached():
+    stats = EmbedHostStats()
+    stats.record(FAST, True, 300)
+    settings = FakeSettings()
+    stats.attach(settings)
+    assert json.loads(settings.values[EmbedHostStats.SETTINGS_KEY])[FAST]["loads"] == 1
+
+
+def test_legacy_file_is_migrated(tmp_path):
+    legacy = tmp_path / "embed_hosts.json"
+    legacy.write_text(json.dumps({FAST: {"success_rate": 0.5, "latency_ms": 800, "loads": 4, "failures": 2}}))
+    settings = FakeSettings()
+    stats = EmbedHostStats(settings, legacy_path=str(legacy))
+    assert stats.hosts[FAST]["loads"] == 4
+    assert not legacy.exists()
+    assert EmbedHostStats(settings, legacy_path=str(legacy)).hosts == stats.hosts
+
+
+def test_updates_are_coalesced_by_settings_service(qapp, tmp_path):
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(tmp_path))
+    service = SettingsService("PruebasFloater", "EmbedHosts")
+    stats = EmbedHostStats(service)
+    for latency in range(100, 1100, 100):
+        stats.record(FAST, True, latency)
+    assert wait_until(lambda: service.flushes == 1 and service._last_future.done())
+    assert service.keys_written == 1
+    stored = json.loads(QSettings("PruebasFloater", "EmbedHosts").value(EmbedHostStats.SETTINGS_KEY))
+    assert stored[FAST]["loads"] == 10
+    service.flush_now()
+
+
+def test_backoff_is_exponential_with_bounded_jitter(monkeypatch):
+    monkeypatch.setattr(random, "uniform", lambda low, high: 1.0)
+    assert [LoadSupervisor.backoff_ms(attempt) for attempt in (1, 2, 3)] == [1000, 2000, 4000]
+
+    monkeypatch.undo()
+    random.seed(3)
+    delays = [LoadSupervisor.backoff_ms(2) for _ in range(200)]
+    low, high = 2000 * (1 - LoadSupervisor.JITTER), 2000 * (1 + LoadSupervisor.JITTER)
+    assert all(low <= delay <= high for delay in delays)
+    # Con ruido de verdad: las ventanas no reintentan todas a la vez
+    assert max(delays) - min(delays) > 2000 * LoadSupervisor.JITTER
+
+
+class StubPage(QObject):
+    playerEvent = pyqtSignal(str, dict)
+
+    def __init__(self):
+        super().__init__()
+        self.muted = False
+
+    def setAudioMuted(self, muted):
+        self.muted = muted
+
+
+class StubView:
+    def __init__(self):
+        self._page = StubPage()
+
+    def page(self):
+        return self._page
+
+
+class StubWindow(QObject):
+    """Lo que LoadSupervisor usa de una VideoWindow, sin QtWebEngine"""
+
+    def __init__(self):
+        super().__init__()
+        self.webview = StubView()
+        self.loads = []  # (página, dominio)
+        self.events = []
+        self.failed = False
+
+    def create_page(self):
+        return StubPage()
+
+    def load_into(self, page, host, url, autoplay, start):
+        self.loads.append((page, host))
+
+    def adopt_page(self, page):
+        self.webview._page = page
+
+    def on_player_event(self, event_type, data):
+        self.events.append(event_type)
+
+    def load_failed(self):
+        self.failed = True
+
+
+@pytest.fixture
+def fast_supervisor(qapp, monkeypatch):
+    monkeypatch.setattr(LoadSupervisor, "timeout_ms", 60)
+    monkeypatch.setattr(LoadSupervisor, "RACE_DELAY_MS", 20)
+    monkeypatch.setattr(LoadSupervisor, "BACKOFF_MS", 10)
+    monkeypatch.setattr(LoadSupervisor, "race", True)
+
+
+def test_retries_with_backoff_then_gives_up(fast_supervisor, monkeypatch):
+    window = StubWindow()
+    stats = EmbedHostStats()
+    supervisor = LoadSupervisor(window, stats, hosts=[FAST])
+    delays = []
+    original = LoadSupervisor.backoff_ms.__func__
+    monkeypatch.setattr(LoadSupervisor, "backoff_ms",
+                        classmethod(lambda cls, attempt: delays.append(attempt) or original(cls, attempt)))
+    supervisor.start("https://youtu.be/aaaaaaaaaaa", True, 0)
+    assert wait_until(lambda: window.failed)
+    assert supervisor.attempt == LoadSupervisor.MAX_ATTEMPTS
+    assert delays == list(range(1, LoadSupervisor.MAX_ATTEMPTS))
+    assert [host for _, host in window.loads] == [FAST] * LoadSupervisor.MAX_ATTEMPTS
+    assert stats.hosts[FAST]["failures"] == LoadSupervisor.MAX_ATTEMPTS
+    assert not supervisor.loading
+
+
+def test_race_adopts_first_host_to_answer(fast_supervisor):
+    window = StubWindow()
+    stats = EmbedHostStats()
+    supervisor = LoadSupervisor(window, stats, hosts=[SLOW, FAST])
+    supervisor.start("https://youtu.be/aaaaaaaaaaa", True, 0)
+    assert wait_until(lambda: len(window.loads) == 2, 1000)
+    hidden, host = window.loads[1]
+    assert host == FAST and hidden.muted
+    hidden.playerEvent.emit("ready", {})
+    assert window.webview.page() is hidden
+    assert window.events == ["ready"]
+    assert stats.hosts[FAST]["loads"] == 1
+    # El perdedor no cuenta como fallo: sólo se sabe que tarda más
+    assert stats.hosts[SLOW]["loads"] == 0 and stats.hosts[SLOW]["failures"] == 0
+    assert stats.ranked([SLOW, FAST]) == [FAST, SLOW]
+    assert not supervisor.loading
@@ -0,0 +1,153 @@
+import random
+
+import pytest
+
+from history import HistoryModel, HistorySearchIndex, HistoryStore
+
+try:
+    from PyQt5.QtTest import QAbstractItemModelTester
+except ImportError:  # Qt < 5.11
+    QAbstractItemModelTester = None
+
+
+def url(n, extra=""):
+    return f"https://www.youtube.com/watch?v=video{n:06d}{extra}"
+
+
+def key(n):
+    return f"video{n:06d}"
+
+
+ENTRIES = {
+    "aaaaaaaaaaa": {"url": "https://youtu.be/aaaaaaaaaaa", "title": "Foo Fighters - Everlong", "channel": "Foo"},
+    "bbbbbbbbbbb": {"url": "https://youtu.be/bbbbbbbbbbb", "title": "Bar de tapas", "channel": "Cocina"},
+    "ccccccccccc": {"url": "https://youtu.be/ccccccccccc", "title": "Football highlights", "channel": "Deportes"},
+}
+
+
+@pytest.fixture
+def index():
+    index = HistorySearchIndex()
+    for k, entry in ENTRIES.items():
+        index.add(k, entry)
+    return index
+
+
+def test_index_prefix_and_terms(index):
+    assert index.search("fo") == {"aaaaaaaaaaa", "ccccccccccc"}
+    assert index.search("foo ever") == {"aaaaaaaaaaa"}
+    assert index.search("cocina") == {"bbbbbbbbbbb"}
+    assert index.search("bbbbb") == {"bbbbbbbbbbb"}
+    assert index.search("nada") == set()
+
+
+def test_index_ignores_url_stopwords(index):
+    assert index.search("  ") is None
+    assert index.search("youtube watch") is None
+
+
+def test_index_refines_previous_result(index):
+    assert index.search("f") == {"aaaaaaaaaaa", "ccccccccccc"}
+    assert not index.last_was_refinement
+    assert index.search("foot") == {"ccccccccccc"}
+    assert index.last_was_refinement
+    assert index.search("bar") == {"bbbbbbbbbbb"}
+    assert not index.last_was_refinement
+
+
+def test_index_update_drops_old_tokens(index):
+    index.search("foo")
+    index.add("aaaaaaaaaaa", dict(ENTRIES["aaaaaaaaaaa"], title="Otra cosa", channel="Nadie"))
+    assert index.search("foo") == {"ccccccccccc"}
+    assert index.search("otra") == {"aaaaaaaaaaa"}
+
+
+def test_bulk_load_matches_incremental(index):
+    bulk = HistorySearchIndex()
+    bulk.bulk_add(ENTRIES.items())
+    bulk.finish_bulk()
+    for query in ("f", "foo", "bar tapas", "deportes", "x"):
+        assert bulk.search(query) == index.search(query)
+
+
+class SignalLog:
+    def __init__(self, model):
+        self.events = []
+        model.rowsInserted.connect(lambda _, first, last: self.events.append(("insert", first, last)))
+        model.rowsRemoved.connect(lambda _, first, last: self.events.append(("remove", first, last)))
+        model.rowsMoved.connect(lambda _, start, end, __, row: self.events.append(("move", start, row)))
+        model.modelReset.connect(lambda: self.events.append(("reset",)))
+
+    def take(self):
+        events, self.events = self.events, []
+        return events
+
+
+@pytest.fixture
+def model(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.jsonl"))
+    for n in range(5):
+        store.add(url(n), n)
+    model = HistoryModel(store)
+    if QAbstractItemModelTester is not None:
+        model.tester = QAbstractItemModelTester(model, QAbstractItemModelTester.FailureReportingMode.Warning)
+    yield model
+    store.close()
+
+
+def rows(model):
+    return [model.index(row).data(HistoryModel.KeyRole) for row in range(model.rowCount())]
+
+
+def assert_rows_indexed(model):
+    for row, k in enumerate(rows(model)):
+        assert model.row_of(k) == row
+
+
+def test_visit_inserts_and_moves_single_rows(model):
+    log = SignalLog(model)
+    model.record_visit(url(9))
+    assert log.take() == [("insert", 0, 0)]
+    assert rows(model)[:2] == [key(9), key(4)]
+
+    model.record_visit(url(2))
+    assert log.take() == [("move", 3, 0)]
+    assert rows(model) == [key(2), key(9), key(4), key(3), key(1), key(0)]
+    assert_rows_indexed(model)
+    assert model.row_of("desconocida") == -1
+
+
+def test_visit_removes_row_that_stops_matching(model):
+    model.record_visit(url(3, "&list=PLlista"))
+    model.set_filter("pllista")
+    assert rows(model) == [key(3)]
+    log = SignalLog(model)
+    # La misma clave con otra URL ya no contiene el término buscado
+    model.record_visit(url(3))
+    assert log.take() == [("remove", 0, 0)]
+    assert rows(model) == []
+
+
+def test_filter_changes_are_incremental(model):
+    log = SignalLog(model)
+    model.set_filter("video00000")
+    assert ("reset",) not in log.take()
+    assert rows(model) == [key(4), key(3), key(2), key(1), key(0)]
+    model.set_filter("video000003")
+    assert log.take() == [("remove", 0, 0), ("remove", 1, 3)]
+    assert_rows_indexed(model)
+    model.set_filter("")
+    assert log.take() == [("insert", 0, 0), ("insert", 2, 4)]
+    assert_rows_indexed(model)
+
+
+def test_row_index_stays_consistent(model):
+    rng = random.Random(7)
+    for _ in range(300):
+        if rng.random() < 0.15:
+            model.set_filter(rng.choice(["", "video00001", "video0000", "lista"]))
+        else:
+            model.record_visit(url(rng.randrange(40), rng.choice(["", "&list=PLlista"])))
+        assert_rows_indexed(model)
+    store_order = [k for k in model.store.keys_recent()]
+    assert rows(model) == [k for k in store_order if k in set(rows(model))]
@@ -0,0 +1,95 @@
+import json
+
+from history import HistoryStore
+
+A = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+B = "https://youtu.be/bbbbbbbbbbb"
+C = "https://www.youtube.com/watch?v=ccccccccccc&t=30"
+
+
+def journal_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_add_appends_one_line_and_reloads(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path)
+    store.add(A, 100)
+    store.add(B, 200)
+    store.add(A, 300)
+    store.update_meta("aaaaaaaaaaa", title="Video A")
+    store.close()
+    assert len(journal_lines(path)) == 4
+
+    again = HistoryStore(path)
+    assert list(again.keys_recent()) == ["aaaaaaaaaaa", "bbbbbbbbbbb"]
+    entry = again.get("aaaaaaaaaaa")
+    assert (entry["plays"], entry["first_seen"], entry["last_seen"], entry["title"]) == (2, 100, 300, "Video A")
+    assert B in again and C not in again
+
+
+def test_clear_is_persisted(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path)
+    store.add(A)
+    store.clear()
+    store.add(B)
+    store.close()
+    assert [entry["url"] for entry in HistoryStore(path).recent()] == [B]
+
+
+def test_compaction_rewrites_one_line_per_entry(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path)
+    store.COMPACT_MIN_LINES = 10
+    for i in range(30):
+        store.add((A, B)[i % 2], i)
+    store.close()
+    # Nunca más de COMPACT_MIN_LINES líneas: al pasarse se reescribe con una por entrada
+    assert len(journal_lines(path)) <= 10
+    assert all(json.loads(line)["op"] in ("entry", "visit") for line in journal_lines(path))
+    again = HistoryStore(path)
+    assert list(again.keys_recent()) == ["bbbbbbbbbbb", "aaaaaaaaaaa"]
+    assert again.get("aaaaaaaaaaa")["plays"] == 15
+    assert not (tmp_path / "history.jsonl.tmp").exists()
+
+
+def test_truncated_last_line_is_ignored_and_next_append_survives(tmp_path):
+    path = tmp_path / "history.jsonl"
+    store = HistoryStore(str(path))
+    store.add(A, 100)
+    store.close()
+    # Cierre brusco a mitad de escribir la segunda línea
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"op": "visit", "key": "bbbbbbbbbbb", "url": "https://yo')
+
+    again = HistoryStore(str(path))
+    assert list(again.keys_recent()) == ["aaaaaaaaaaa"]
+    again.add(C, 200)
+    again.close()
+    assert list(HistoryStore(str(path)).keys_recent()) == ["ccccccccccc", "aaaaaaaaaaa"]
+
+
+def test_corrupt_lines_are_skipped(tmp_path):
+    path = tmp_path / "history.jsonl"
+    records = [
+        {"op": "visit", "key": "aaaaaaaaaaa", "url": A, "ts": 1},
+        "esto no es JSON",
+        {"op": "visit", "url": B},  # sin ts
+        {"op": "visit", "key": "ccccccccccc", "url": C, "ts": 3},
+    ]
+    path.write_text("\n".join(r if isinstance(r, str) else json.dumps(r) for r in records) + "\n", encoding="utf-8")
+    assert list(HistoryStore(str(path)).keys_recent()) == ["ccccccccccc", "aaaaaaaaaaa"]
+
+
+def test_migrate_from_legacy_list(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    store = HistoryStore(path)
+    # La lista de QSettings de versiones anteriores va de más antigua a más reciente
+    store.migrate([A, B, C])
+    store.close()
+    again = HistoryStore(path)
+    assert [entry["url"] for entry in again.recent()] == [C, B, A]
+    assert [entry["url"] for entry in again.recent(limit=2)] == [C, B]
+    assert len(again) == 3
@@ -0,0 +1,161 @@
+"""MetadataService contra el servidor local de benchmarks/standin_server.py"""
+import pytest
+from PyQt5.QtCore import Qt
+
+import metadata
+from conftest import wait_until
+from history import HistoryModel, HistoryStore
+from metadata import MetadataService
+from standin_server import StandInServer
+
+MISSING = "gone0000000"
+
+
+def video(n):
+    video_id = f"meta{n:07d}"
+    return video_id, f"https://www.youtube.com/watch?v={video_id}"
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = StandInServer(missing={MISSING}).start()
+    monkeypatch.setattr(metadata, "OEMBED_URL", server.env()["YOUTUBE_FLOATER_OEMBED"])
+    yield server
+    server.stop()
+
+
+class Recorder:
+    def __init__(self, service):
+        self.meta, self.thumbnails, self.failed = {}, [], []
+        service.metadataReady.connect(lambda key, meta: self.meta.setdefault(key, meta))
+        service.thumbnailReady.connect(self.thumbnails.append)
+        service.metadataFailed.connect(self.failed.append)
+
+
+@pytest.fixture
+def make_service(qapp, tmp_path):
+    services = []
+
+    def make():
+        service = MetadataService(str(tmp_path / "metadata"))
+        services.append(service)
+        return service, Recorder(service)
+
+    yield make
+    for service in services:
+        service._executor.shutdown(wait=True)
+        service.deleteLater()
+
+
+def test_network_fetch_then_memory_hit(server, make_service):
+    service, seen = make_service()
+    key, url = video(1)
+    service.request(key, url)
+    assert wait_until(lambda: key in seen.thumbnails)
+    assert seen.meta[key]["title"] == f"Stand-in {key}"
+    assert seen.meta[key]["channel"] == "Canal de pruebas"
+    pixmap = service.pixmap(key)
+    assert (pixmap.width(), pixmap.height()) == (MetadataService.THUMB_SIZE.width(), MetadataService.THUMB_SIZE.height())
+    assert service.stats == {"memory_hits": 1, "disk_hits": 0, "network_fetches": 1, "failures": 0}
+    assert server.requests == ["/oembed", f"/vi/{key}/hqdefault.jpg"]
+
+
+def test_repeated_requests_are_coalesced(server, make_service):
+    service, seen = make_service()
+    key, url = video(2)
+    for _ in range(5):
+        service.request(key, url)
+    assert wait_until(lambda: key in seen.thumbnails)
+    service.request(key, url)
+    assert server.requests == ["/oembed", f"/vi/{key}/hqdefault.jpg"]
+    assert seen.thumbnails == [key]
+
+
+def test_concurrency_is_limited(qapp, make_service, monkeypatch):
+    server = StandInServer(delay=0.15).start()
+    monkeypatch.setattr(metadata, "OEMBED_URL", server.env()["YOUTUBE_FLOATER_OEMBED"])
+    try:
+        service, seen = make_service()
+        keys = []
+        for n in range(10):
+            key, url = video(100 + n)
+            keys.append(key)
+            service.request(key, url)
+        assert wait_until(lambda: len(seen.thumbnails) == len(keys), 10000)
+        assert 1 < server.max_active <= MetadataService.MAX_CONCURRENT
+        assert len(server.requests) == 2 * len(keys)
+    finally:
+        server.stop()
+
+
+def test_disk_cache_avoids_network(server, make_service):
+    first, seen = make_service()
+    key, url = video(3)
+    first.request(key, url)
+    assert wait_until(lambda: key in seen.thumbnails)
+    first._executor.shutdown(wait=True)
+    requests = list(server.requests)
+
+    second, seen = make_service()
+    second.request(key, url)
+    assert wait_until(lambda: key in seen.thumbnails)
+    assert seen.meta[key]["title"] == f"Stand-in {key}"
+    assert second.stats["disk_hits"] == 1 and second.stats["network_fetches"] == 0
+    assert server.requests == requests
+
+
+def test_memory_tier_respects_budget(server, make_service):
+    service, seen = make_service()
+    thumb = MetadataService.THUMB_SIZE
+    one = thumb.width() * thumb.height() * 4
+    service.PIXMAP_BUDGET = 2 * one
+    keys = []
+    for n in range(4):
+        key, url = video(200 + n)
+        keys.append(key)
+        service.request(key, url)
+        assert wait_until(lambda: key in seen.thumbnails)
+    assert service.pixmap_bytes <= service.PIXMAP_BUDGET
+    # LRU: sólo quedan en memoria las más recientes; las demás se vuelven a leer de disco
+    assert service.pixmap(keys[0]) is None
+    assert service.pixmap(keys[-1]) is not None
+
+
+def test_missing_video_fails_and_is_remembered(server, make_service):
+    service, seen = make_service()
+    url = f"https://www.youtube.com/watch?v={MISSING}"
+    service.request(MISSING, url)
+    assert wait_until(lambda: MISSING in seen.failed)
+    assert service.unavailable(MISSING)
+    assert service.stats["failures"] == 1
+    assert server.requests == ["/oembed"]
+    service._executor.shutdown(wait=True)
+
+    # El 404 queda en disco: el siguiente arranque no vuelve a preguntar
+    again, seen = make_service()
+    again.request(MISSING, url)
+    assert wait_until(lambda: MISSING in seen.failed)
+    assert server.requests == ["/oembed"]
+
+
+def test_non_youtube_url_fails_without_network(server, make_service):
+    service, seen = make_service()
+    service.request("https://example.com/video.mp4", "https://example.com/video.mp4")
+    assert wait_until(lambda: seen.failed)
+    assert server.requests == []
+
+
+def test_history_row_shows_unavailable(server, make_service, tmp_path):
+    service, seen = make_service()
+    store = HistoryStore(str(tmp_path / "history.jsonl"))
+    store.add(f"https://www.youtube.com/watch?v={MISSING}")
+    model = HistoryModel(store, metadata=service)
+    changed = []
+    model.dataChanged.connect(lambda first, last: changed.append(first.row()))
+    index = model.index(0)
+    assert "Cargando…" in index.data(Qt.DisplayRole)
+    index.data(Qt.DecorationRole)  # la vista pide la miniatura al pintar
+    assert wait_until(lambda: MISSING in seen.failed)
+    assert changed == [0]
+    assert "No disponible" in index.data(Qt.DisplayRole)
+    store.close()
@@ -0,0 +1,86 @@
+"""MosaicWindow contra el reproductor de benchmarks/standin_server.py. Necesita QtWebEngine."""
+import pytest
+
+from conftest import run_js, wait_until
+
+URLS = [f"https://www.youtube.com/watch?v=mosaic{index:05d}" for index in range(4)]
+
+
+@pytest.fixture
+def open_mosaic(app_module):
+    # Como en la aplicación: el PlayerManager cierra y libera las ventanas
+    manager = app_module.PlayerManager(max_players=0)
+
+    class RecordingMosaic(app_module.MosaicWindow):
+        def on_player_event(self, event_type, data):
+            self.events.append((event_type, data))
+            super().on_player_event(event_type, data)
+
+    def open_mosaic(urls=URLS, **kwargs):
+        window = RecordingMosaic(urls, 960, 540, **kwargs)
+        window.events = []
+        window.show()
+        manager.register(window)
+        assert wait_until(lambda: sum(kind == "ready" for kind, _ in window.events) == len(window.parsed), 15000)
+        return window
+
+    open_mosaic.manager = manager
+    yield open_mosaic
+    manager.close_all()
+
+
+def tile_qualities(window):
+    return run_js(window, "floaterTiles.map(function (tile) { return tile.player.getPlaybackQuality(); })")
+
+
+def test_other_tiles_are_capped(open_mosaic):
+    window = open_mosaic()
+    # Celdas de 270 px: la enfocada se queda en medium, las demás bajan a OTHER_QUALITY
+    assert wait_until(lambda: tile_qualities(window) == ["medium"] + [window.OTHER_QUALITY] * 3, 8000)
+    capped = sorted(data["tile"] for kind, data in window.events if kind == "quality_capped")
+    assert capped == [1, 2, 3]
+
+
+def test_mosaic_counts_for_the_player_limit(open_mosaic):
+    manager = open_mosaic.manager
+    first = open_mosaic(URLS[:2])
+    second = open_mosaic(URLS[2:])
+    assert manager.stats()["players"] == 2
+    manager.set_max_players(1)
+    assert manager.windows() == [second]
+    assert not first.isVisible()
+    second.close()
+    assert manager.stats() == {"players": 0, "renderers": 0}
+
+
+def test_session_round_trip(app_module, open_mosaic, tmp_path):
+    window = open_mosaic()
+    window.order = [2, 0, 1, 3]
+    window.focused_tile = 1
+    window.remember_position([10.0, 20.0, 30.0, None])
+    state = window.session_state()
+    store = app_module.SessionStore(str(tmp_path / "session.json"))
+    store.save([state])
+    [loaded] = store.load()
+    assert loaded["kind"] == "mosaic"
+    assert loaded["urls"] == [URLS[2], URLS[0], URLS[1], URLS[3]]
+    assert loaded["positions"] == [30.0, 10.0, 20.0, 0.0]
+    assert loaded["focused"] == 1 and loaded["position"] == 20.0
+
+    restored = open_mosaic(loaded["urls"], starts=loaded["positions"], focused=loaded["focused"])
+    assert restored.focused_tile == 1
+    assert run_js(restored, "floaterFocused") == 1
+
+
+def test_invalid_mosaic_entries_are_dropped(app_module, tmp_path):
+    store = app_module.SessionStore(str(tmp_path / "session.json"))
+    base = {"geometry": [0, 0, 960, 540], "position": 0, "pinned": True, "opacity": 1.0, "title": "Mosaico"}
+    store.save([
+        {**base, "kind": "mosaic", "url": URLS[0], "urls": [URLS[0], "https://example.com/x"], "positions": [1, 2]},
+        {**base, "kind": "mosaic", "url": URLS[0], "urls": URLS[:2], "positions": [5, -3], "focused": 7},
+        {**base, "kind": "otro", "url": URLS[0]},
+        {**base, "url": URLS[1]},
+    ])
+    mosaic, video = store.load()
+    assert (mosaic["positions"], mosaic["focused"]) == ([5.0, 0.0], 1)
+    assert video["kind"] == "video"
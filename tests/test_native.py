@@ -0,0 +1,77 @@
+"""NativeVideoWindow con el PlayerManager y en la sesión. Necesita QtWebEngine (app_module)."""
+import pytest
+
+import run_benchmarks
+from conftest import wait_until
+
+
+@pytest.fixture
+def media_file(tmp_path):
+    return run_benchmarks.sample_media_file(str(tmp_path), seconds=5)
+
+
+@pytest.fixture
+def open_native(app_module, media_file):
+    try:
+        app_module.load_multimedia()
+    except ImportError as exc:
+        pytest.skip(f"QtMultimedia no disponible ({exc})")
+    manager = app_module.PlayerManager(max_players=0)
+    loaded = (app_module.QMediaPlayer.LoadedMedia, app_module.QMediaPlayer.BufferedMedia)
+
+    def open_native(**kwargs):
+        window = app_module.NativeVideoWindow(app_module.direct_media_source(media_file), **kwargs)
+        window.show()
+        manager.register(window)
+        assert wait_until(lambda: window.player.mediaStatus() in loaded, 10000)
+        return window
+
+    open_native.manager = manager
+    yield open_native
+    manager.close_all()
+
+
+def test_discard_releases_media_and_wake_resumes(app_module, open_native):
+    window = open_native(autoplay=False, start=2)
+    assert wait_until(lambda: window.player.position() >= 2000, 5000)
+    window.freeze()
+    assert window.lifecycle_state == "frozen"
+    window.discard()
+    assert window.lifecycle_state == "discarded"
+    assert window.player.media().isNull() and window.last_position == pytest.approx(2, abs=0.5)
+    window.wake()
+    assert window.lifecycle_state == "active"
+    assert wait_until(lambda: window.player.position() >= 1500, 10000)
+    assert window.player.state() != app_module.QMediaPlayer.PlayingState
+
+
+def test_closing_goes_through_the_manager(open_native):
+    manager = open_native.manager
+    window = open_native()
+    assert manager.stats() == {"players": 1, "renderers": 0}
+    window.close()
+    assert manager.windows() == []
+    assert window.player.media().isNull()
+
+
+def test_session_round_trip(app_module, open_native, media_file, tmp_path):
+    window = open_native(autoplay=False, start=3)
+    state = window.session_state()
+    assert state["kind"] == "native" and state["title"] == "sample.wav"
+    store = app_module.SessionStore(str(tmp_path / "session.json"))
+    store.save([state])
+    [loaded] = store.load()
+    assert app_module.direct_media_source(loaded["url"]).toLocalFile() == media_file
+    assert loaded["position"] == pytest.approx(3, abs=0.5)
+
+
+def test_native_entries_need_a_playable_source(app_module, media_file, tmp_path):
+    store = app_module.SessionStore(str(tmp_path / "session.json"))
+    base = {"geometry": [0, 0, 480, 270], "position": 0, "pinned": True, "opacity": 1.0, "title": ""}
+    store.save([
+        {**base, "kind": "native", "url": media_file},
+        {**base, "kind": "native", "url": str(tmp_path / "borrado.mp4")},
+        {**base, "kind": "native", "url": "https://www.youtube.com/watch?v=native00001"},
+        {**base, "kind": "video", "url": media_file},
+    ])
+    assert [entry["url"] for entry in store.load()] == [media_file]
@@ -0,0 +1,45 @@
+"""Abrir y cerrar N reproductores con PlayerManager devuelve la memoria (offscreen).
+
+Necesita QtWebEngine; si no se puede importar, se salta.
+"""
+import pytest
+
+import run_benchmarks
+
+WINDOWS = 4
+# Memoria que se tolera retenida tras cerrar todo: cachés de Chromium, fragmentación del heap...
+TOLERANCE_MB = 30
+
+
+def open_and_close(module, manager, count):
+    windows = []
+    for _ in range(count):
+        window = module.VideoWindow(run_benchmarks.SAMPLE_URL)
+        manager.register(window)
+        window.show()
+        run_benchmarks.wait_for(window.webview.loadFinished)
+        windows.append(window)
+    run_benchmarks.process_events_for(1500)
+    peak = run_benchmarks.rss_tree_mb()
+    for window in windows:
+        window.close()
+    # deleteLater y la salida de los renderers necesitan unas vueltas del event loop
+    run_benchmarks.process_events_for(2000)
+    return peak
+
+
+def test_closed_players_free_memory(app_module):
+    manager = app_module.PlayerManager(max_players=0)
+    # Una primera ronda paga el arranque de Chromium (perfil, caché, proceso GPU)
+    open_and_close(app_module, manager, 1)
+    before = run_benchmarks.rss_tree_mb()
+    if before is None:
+        pytest.skip("no se puede medir RSS en esta plataforma")
+
+    peak = open_and_close(app_module, manager, WINDOWS)
+    after = run_benchmarks.rss_tree_mb()
+
+    assert manager.stats() == {"players": 0, "renderers": 0}
+    assert peak > before
+    assert after - before < TOLERANCE_MB, (
+        f"{after - before:.1f} MB retenidos tras cerrar {WINDOWS} ventanas (pico {peak - before:.1f} MB)")
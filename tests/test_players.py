@@ -0,0 +1,157 @@
+"""PlayerManager y PlayerLifecyclePolicy con ventanas de mentira (sin QtWebEngine)"""
+import itertools
+
+import pytest
+from PyQt5.QtCore import QObject, pyqtSignal
+
+import players
+from players import PlayerLifecyclePolicy, PlayerManager
+
+_pids = itertools.count(1000)
+
+
+class StubWindow(QObject):
+    closed = pyqtSignal(object)
+    activated = pyqtSignal(object)
+
+    def __init__(self, name, backgrounded=False, can_discard=True, shared_pid=None):
+        super().__init__()
+        self.name = name
+        self.backgrounded = backgrounded
+        self.can_discard = can_discard
+        self.lifecycle_state = "active"
+        self.pid = shared_pid or next(_pids)
+        self.calls = []
+
+    def __repr__(self):
+        return f"<{self.name}>"
+
+    def is_backgrounded(self):
+        return self.backgrounded
+
+    def freeze(self):
+        self.calls.append("freeze")
+        self.lifecycle_state = "frozen"
+
+    def discard(self):
+        self.calls.append("discard")
+        self.lifecycle_state = "discarded"
+
+    def wake(self):
+        if self.lifecycle_state != "active":
+            self.calls.append("wake")
+        self.lifecycle_state = "active"
+
+    def close(self):
+        self.calls.append("close")
+        # Como FloatingPlayerBase.closeEvent
+        self.closed.emit(self)
+
+    def release(self):
+        self.calls.append("release")
+
+    def render_process_pid(self):
+        return None if self.lifecycle_state == "discarded" else self.pid
+
+
+@pytest.fixture
+def manager(qapp):
+    manager = PlayerManager(max_players=2)
+    manager.emitted = []
+    manager.statsChanged.connect(manager.emitted.append)
+    return manager
+
+
+def test_limit_closes_least_recently_used(manager):
+    a, b, c = StubWindow("a"), StubWindow("b"), StubWindow("c")
+    manager.register(a)
+    manager.register(b)
+    a.activated.emit(a)  # a pasa a ser la más reciente: la menos usada es b
+    manager.register(c)
+    assert b.calls == ["close", "release"]
+    assert manager.windows() == [a, c]
+    assert a.calls == c.calls == []
+    assert manager.emitted[-1] == {"players": 2, "renderers": 2}
+
+
+def test_backgrounded_player_is_discarded_not_closed(manager):
+    a, b, c = StubWindow("a", backgrounded=True), StubWindow("b"), StubWindow("c")
+    for window in (a, b, c):
+        manager.register(window)
+    assert a.calls == ["discard"]
+    # Sigue abierta (se recarga al volver a verse), pero ya sin renderer
+    assert manager.windows() == [a, b, c]
+    assert manager.stats() == {"players": 3, "renderers": 2}
+    # Las descartadas no cuentan para el límite
+    d = StubWindow("d")
+    manager.register(d)
+    assert b.calls == ["close", "release"]
+    assert manager.windows() == [a, c, d]
+
+
+def test_window_that_cannot_discard_is_closed(manager):
+    a = StubWindow("a", backgrounded=True, can_discard=False)
+    manager.register(a)
+    manager.register(StubWindow("b"))
+    manager.register(StubWindow("c"))
+    assert a.calls == ["close", "release"]
+
+
+def test_closing_releases_once(manager):
+    a = StubWindow("a")
+    manager.register(a)
+    a.close()
+    a.closed.emit(a)
+    assert a.calls == ["close", "release"]
+    assert manager.windows() == []
+    assert manager.emitted[-1] == {"players": 0, "renderers": 0}
+
+
+def test_lowering_the_limit_applies_immediately(manager):
+    windows = [StubWindow(name) for name in "abc"]
+    manager.set_max_players(0)
+    for window in windows:
+        manager.register(window)
+    assert manager.stats() == {"players": 3, "renderers": 3}
+    manager.set_max_players(1)
+    assert [w.calls for w in windows] == [["close", "release"], ["close", "release"], []]
+    assert manager.emitted[-1] == {"players": 1, "renderers": 1}
+
+
+def test_stats_count_shared_renderers_once(manager):
+    manager.set_max_players(0)
+    for name in "ab":
+        manager.register(StubWindow(name, shared_pid=42))
+    manager.register(StubWindow("c"))
+    assert manager.stats() == {"players": 3, "renderers": 2}
+
+
+def test_close_all(manager):
+    windows = [StubWindow(name) for name in "ab"]
+    for window in windows:
+        manager.register(window)
+    manager.close_all()
+    assert all(window.calls == ["close", "release"] for window in windows)
+    assert manager.windows() == []
+
+
+def test_lifecycle_policy_freezes_then_discards(manager, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(players.time, "monotonic", lambda: now[0])
+    policy = PlayerLifecyclePolicy(manager, freeze_delay=10, discard_delay=60)
+    hidden, visible = StubWindow("hidden", backgrounded=True), StubWindow("visible")
+    manager.register(hidden)
+    manager.register(visible)
+
+    policy.evaluate()
+    now[0] += 10
+    policy.evaluate()
+    assert hidden.lifecycle_state == "frozen" and visible.calls == []
+    now[0] += 50
+    policy.evaluate()
+    assert hidden.calls == ["freeze", "discard"]
+
+    hidden.backgrounded = False
+    policy.evaluate()
+    assert hidden.calls[-1] == "wake" and hidden.lifecycle_state == "active"
+    policy.set_enabled(False)
@@ -0,0 +1,78 @@
+"""ProfileCacheManager sin QtWebEngine: recuentos de aciertos y recorte del almacenamiento"""
+import json
+import os
+import time
+
+import pytest
+
+from profiles import ProfileCacheManager
+
+
+@pytest.fixture
+def cache(qapp, tmp_path):
+    cache = ProfileCacheManager(str(tmp_path / "cache"), quota_mb=50)
+    cache.emitted = []
+    cache.statsChanged.connect(cache.emitted.append)
+    yield cache
+    cache._executor.shutdown(wait=True)
+
+
+def report(**counts):
+    return json.dumps(counts)
+
+
+def test_hit_rate_counts_revalidated_as_hits(cache):
+    assert cache.stats()["hit_rate"] is None
+    cache.record_report(report(hits=6, revalidated=2, misses=2, opaque=5))
+    cache.record_report(report(hits=2, misses=8))
+    stats = cache.stats()
+    assert (stats["hits"], stats["revalidated"], stats["misses"], stats["opaque"]) == (8, 2, 10, 5)
+    assert stats["hit_rate"] == pytest.approx(10 / 20)
+    assert cache.emitted[-1]["hit_rate"] == stats["hit_rate"]
+
+
+def test_only_opaque_resources_give_no_rate(cache):
+    cache.record_report(report(opaque=12))
+    assert cache.stats()["hit_rate"] is None
+    assert cache.stats()["opaque"] == 12
+
+
+@pytest.mark.parametrize("payload", [
+    "no es json", "[1, 2]", report(hits=-4), report(hits="7"), report(hits=1.5), report(unknown=3),
+])
+def test_invalid_reports_are_ignored(cache, payload):
+    cache.record_report(payload)
+    stats = cache.stats()
+    assert stats["hits"] == stats["revalidated"] == stats["misses"] == stats["opaque"] == 0
+
+
+def test_report_script_uses_the_prefix():
+    script = ProfileCacheManager.RESOURCE_TIMING_JS
+    assert f"'{ProfileCacheManager.REPORT_PREFIX}'" in script
+    assert str(ProfileCacheManager.REPORT_DELAY_MS) in script
+    assert "%" not in script
+
+
+def write(path, size, age_days=0):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    stamp = time.time() - age_days * 86400
+    os.utime(path, (stamp, stamp))
+    os.utime(os.path.dirname(path), (stamp, stamp))
+
+
+def test_trim_drops_stale_then_least_recently_used(cache):
+    idb = os.path.join(cache.storage_path, "IndexedDB")
+    write(os.path.join(idb, "viejo", "data"), 1000, age_days=40)
+    write(os.path.join(idb, "usado", "data"), 1000, age_days=1)
+    write(os.path.join(idb, "nuevo", "data"), 1000)
+    write(os.path.join(cache.storage_path, "Cookies"), 1000, age_days=90)
+    assert cache._trim_storage() == (1, 1000)
+    assert sorted(os.listdir(idb)) == ["nuevo", "usado"]
+
+    # Por encima de la cuota también caen las recientes, de la más antigua a la más nueva
+    cache.quota_mb = 0
+    assert cache._trim_storage() == (2, 2000)
+    assert os.listdir(idb) == []
+    assert os.path.exists(os.path.join(cache.storage_path, "Cookies"))
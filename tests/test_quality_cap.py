@@ -0,0 +1,66 @@
+"""El límite de calidad se cumple contra el reproductor de benchmarks/standin_server.py.
+
+Como el de YouTube, el reproductor de pruebas no hace caso de setPlaybackQuality
+y elige la calidad por el tamaño del iframe. Necesita QtWebEngine.
+"""
+import pytest
+
+import run_benchmarks
+from conftest import run_js, wait_until
+
+
+@pytest.fixture
+def open_window(app_module):
+    windows = []
+
+    class RecordingWindow(app_module.VideoWindow):
+        def on_player_event(self, event_type, data):
+            self.events.append((event_type, data))
+            super().on_player_event(event_type, data)
+
+    def open_window(max_quality):
+        # Vacía al crearla (también la página que gane la carrera de dominios avisa a on_player_event)
+        window = RecordingWindow(None, width=960, height=540, max_quality=max_quality)
+        window.events = []
+        window.show()
+        window.load_video(run_benchmarks.SAMPLE_URL)
+        windows.append(window)
+        assert wait_until(lambda: window.player_ready, 15000)
+        return window
+
+    yield open_window
+    for window in windows:
+        window.close()
+
+
+def playing_quality(window):
+    assert wait_until(lambda: run_js(window, "player.getPlayerState()") == 1, 5000)
+    return run_js(window, "player.getPlaybackQuality()")
+
+
+def test_quality_above_cap_shrinks_player_and_reloads(open_window):
+    window = open_window("small")
+    assert wait_until(lambda: any(kind == "quality_capped" for kind, _ in window.events), 5000)
+    capped = dict(window.events)["quality_capped"]
+    assert capped["cap"] == "small" and capped["quality"] != "small"
+    assert wait_until(lambda: playing_quality(window) == "small", 5000)
+    # El reproductor sigue ocupando toda la ventana, sólo que escalado
+    width = run_js(window, "document.getElementById('player').getBoundingClientRect().width")
+    assert width == pytest.approx(window.webview.width(), abs=2)
+
+
+def test_quality_within_cap_is_left_alone(open_window):
+    window = open_window("auto")
+    assert playing_quality(window) == window.target_quality()
+    assert not any(kind == "quality_capped" for kind, _ in window.events)
+
+
+def test_removing_the_cap_restores_full_size(open_window):
+    window = open_window("small")
+    assert wait_until(lambda: playing_quality(window) == "small", 8000)
+    window.max_quality = "auto"
+    full = window.target_quality()
+    window.set_max_quality("none")
+    assert wait_until(lambda: run_js(window, "document.getElementById('player').style.transform") == "", 5000)
+    # Al crecer el reproductor se recarga el video y YouTube vuelve a elegir por tamaño
+    assert wait_until(lambda: playing_quality(window) == full, 5000)
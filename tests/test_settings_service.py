@@ -0,0 +1,69 @@
+import pytest
+from PyQt5.QtCore import QSettings
+
+from conftest import wait_until
+from settings_service import SettingsService
+
+ORGANIZATION, APPLICATION = "PruebasFloater", "SettingsService"
+
+
+@pytest.fixture
+def settings(qapp, tmp_path):
+    QSettings.setPath(QSettings.NativeFormat, QSettings.UserScope, str(tmp_path))
+    QSettings.setPath(QSettings.IniFormat, QSettings.UserScope, str(tmp_path))
+    service = SettingsService(ORGANIZATION, APPLICATION)
+    yield service
+    service.flush_now()
+    service.deleteLater()
+
+
+def on_disk(key):
+    return QSettings(ORGANIZATION, APPLICATION).value(key)
+
+
+def test_changes_within_quiet_period_are_written_once(settings):
+    for volume in range(10):
+        settings.setValue("volume", volume)
+    settings.setValue("theme", "dark")
+    # Lo pendiente se lee ya, aunque aún no esté en disco
+    assert settings.value("volume") == 9
+    assert on_disk("volume") is None
+
+    assert wait_until(lambda: settings.flushes == 1 and settings._last_future.done())
+    assert settings.stats() == {"changes_requested": 11, "keys_written": 2, "flushes": 1, "writes_saved": 9}
+    assert (int(on_disk("volume")), on_disk("theme")) == (9, "dark")
+
+
+def test_unchanged_value_is_not_rewritten(settings):
+    settings.setValue("theme", "dark")
+    settings.flush_now()
+    settings.setValue("theme", "dark")
+    assert settings.stats()["changes_requested"] == 1
+
+
+def test_flush_now_writes_pending_values_without_event_loop(settings):
+    settings.setValue("theme", "dark")
+    settings.remove("gone")
+    settings.flush_now()
+    assert on_disk("theme") == "dark"
+    assert settings.stats()["flushes"] == 1
+
+
+def test_flush_now_keeps_the_latest_value(settings):
+    settings.setValue("volume", 1)
+    # Una escritura en curso y un cambio más nuevo aún pendiente: al salir gana el último
+    settings.flush()
+    settings.setValue("volume", 2)
+    assert settings.value("volume") == 2
+    settings.flush_now()
+    assert int(on_disk("volume")) == 2
+    assert settings.value("volume") == 2
+
+
+def test_remove_hides_value_until_written(settings):
+    settings.setValue("theme", "dark")
+    settings.flush_now()
+    settings.remove("theme")
+    assert settings.value("theme", "light") == "light"
+    settings.flush_now()
+    assert on_disk("theme") is None
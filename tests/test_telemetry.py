@@ -0,0 +1,154 @@
+import json
+import re
+
+import pytest
+
+from telemetry import PlaybackTelemetry
+
+SAMPLE_RE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL_RE = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\\n]|\\["\\n])*)"(,|$)')
+
+
+def parse_exposition(text):
+    """Comprueba el formato de texto de Prometheus y devuelve {(nombre, etiquetas): valor}"""
+    assert text.endswith("\n")
+    families = {}
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name = line.split(" ")[2]
+            assert name not in families, f"familia repetida: {name}"
+            families[name] = None
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            assert name in families and families[name] is None, f"TYPE sin HELP: {name}"
+            assert kind in ("counter", "gauge", "summary", "histogram", "untyped")
+            families[name] = kind
+        else:
+            match = SAMPLE_RE.match(line)
+            assert match, f"línea inválida: {line!r}"
+            name, _, label_text, value = match.groups()
+            family = name
+            if name not in families:
+                family = re.sub(r"_(sum|count)$", "", name)
+                assert families.get(family) == "summary", f"muestra sin familia: {name}"
+            if families[family] == "counter":
+                assert name.endswith("_total")
+            labels = {}
+            if label_text:
+                consumed = 0
+                for label in LABEL_RE.finditer(label_text):
+                    assert label.start() == consumed, f"etiquetas inválidas: {label_text!r}"
+                    labels[label.group(1)] = label.group(2)
+                    consumed = label.end()
+                assert consumed == len(label_text), f"etiquetas inválidas: {label_text!r}"
+            float(value)
+            samples[(name, tuple(sorted(labels.items())))] = float(value)
+    return samples
+
+
+def play(telemetry, window_id="w1", video_id="aaaaaaaaaaa"):
+    telemetry.ingest(window_id, video_id, [
+        ["load", 0, {}],
+        ["state", 400, {"state": 3}],
+        ["state", 1000, {"state": 1}],  # arranque: 1 s
+        ["quality", 1000, {"quality": "hd720"}],
+        ["state", 5000, {"state": 3}],  # 4 s reproduciendo
+        ["state", 5500, {"state": 1}],  # 0,5 s detenido cargando
+        ["sample", 9500, {"quality": "hd720", "frames": 240, "dropped": 3}],
+        ["error", 9600, {}],
+    ])
+
+
+@pytest.fixture
+def telemetry():
+    telemetry = PlaybackTelemetry()
+    play(telemetry)
+    return telemetry
+
+
+def test_session_metrics(telemetry):
+    totals = telemetry.totals()
+    assert (totals["sessions"], totals["startup_ms_median"], totals["rebuffers"]) == (1, 1000, 1)
+    assert (totals["playing_ms"], totals["rebuffer_ms"]) == (8000, 500)
+    assert totals["rebuffer_ratio"] == pytest.approx(500 / 8500)
+    assert (totals["dropped_frames"], totals["total_frames"], totals["errors"]) == (3, 240, 1)
+    assert totals["qualities"] == {"hd720": 1}
+    assert (totals["batches"], totals["events"]) == (1, 8)
+
+
+def test_prometheus_exposition(telemetry):
+    telemetry.record_renderer_failure("w1", "crash")
+    telemetry.record_renderer_failure("w1", "hang")
+    telemetry.record_renderer_failure("w1", "crash")
+    samples = parse_exposition(telemetry.to_prometheus())
+    assert samples[("floater_playback_sessions", ())] == 1
+    assert samples[("floater_playback_startup_seconds", (("quantile", "0.5"),))] == 1.0
+    assert samples[("floater_playback_startup_seconds_sum", ())] == 1.0
+    assert samples[("floater_playback_startup_seconds_count", ())] == 1
+    assert samples[("floater_playback_rebuffers_total", ())] == 1
+    assert samples[("floater_playback_rebuffer_seconds_total", ())] == 0.5
+    assert samples[("floater_playback_playing_seconds_total", ())] == 8.0
+    assert samples[("floater_playback_dropped_frames_total", ())] == 3
+    assert samples[("floater_playback_errors_total", ())] == 1
+    assert samples[("floater_renderer_failures_total", (("reason", "crash"),))] == 2
+    assert samples[("floater_renderer_failures_total", (("reason", "hang"),))] == 1
+    window = (("video", "aaaaaaaaaaa"), ("window", "w1"))
+    assert samples[("floater_window_startup_seconds", window)] == 1.0
+    assert samples[("floater_window_rebuffers", window)] == 1
+    assert samples[("floater_window_renderer_failures", (("window", "w1"),))] == 3
+    assert samples[("floater_window_quality", (("quality", "hd720"),) + window)] == 1
+
+
+def test_prometheus_without_sessions_is_valid():
+    samples = parse_exposition(PlaybackTelemetry().to_prometheus())
+    assert samples[("floater_playback_sessions", ())] == 0
+    assert samples[("floater_playback_startup_seconds_count", ())] == 0
+
+
+def test_prometheus_escapes_label_values():
+    telemetry = PlaybackTelemetry()
+    telemetry.ingest("w1", "aaaaaaaaaaa", [["load", 0, {}], ["quality", 10, {"quality": 'raro"\\\nx'}]])
+    samples = parse_exposition(telemetry.to_prometheus())
+    labels = [dict(labels) for name, labels in samples if name == "floater_window_quality"]
+    assert labels == [{"quality": 'raro\\"\\\\\\nx', "video": "aaaaaaaaaaa", "window": "w1"}]
+
+
+def test_closed_windows_leave_per_window_metrics(telemetry):
+    play(telemetry, "w2", "bbbbbbbbbbb")
+    telemetry.close_window("w1")
+    samples = parse_exposition(telemetry.to_prometheus())
+    windows = {dict(labels)["window"] for name, labels in samples if name == "floater_window_startup_seconds"}
+    assert windows == {"w2"}
+    assert samples[("floater_playback_sessions", ())] == 2
+
+
+def test_json_export(telemetry, tmp_path):
+    path = tmp_path / "telemetry" / "playback.json"
+    assert telemetry.export(str(path))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert set(data) == {"generated_at", "session", "windows", "recent"}
+    assert data["session"]["sessions"] == 1
+    assert data["windows"]["w1"]["startup_ms"] == 1000
+    assert data["windows"]["w1"]["renderer_failures"] == 0
+    assert [session["video"] for session in data["recent"]] == ["aaaaaaaaaaa"]
+    assert not (tmp_path / "telemetry" / "playback.json.tmp").exists()
+
+
+def test_export_picks_format_by_extension(telemetry, tmp_path):
+    path = tmp_path / "playback.prom"
+    assert telemetry.export(str(path))
+    assert path.read_text(encoding="utf-8") == telemetry.to_prometheus()
+
+
+def test_export_failure_is_reported(telemetry, tmp_path):
+    blocker = tmp_path / "fichero"
+    blocker.write_text("")
+    assert not telemetry.export(str(blocker / "playback.json"))
+
+
+def test_malformed_events_are_skipped():
+    telemetry = PlaybackTelemetry()
+    telemetry.ingest("w1", "aaaaaaaaaaa", [["load", 0, {}], "basura", ["state"], ["state", 10, None]])
+    assert telemetry.totals()["sessions"] == 1
+    assert telemetry.events == 4
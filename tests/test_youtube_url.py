@@ -0,0 +1,50 @@
+import json
+import os
+
+import pytest
+
+import youtube_url
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "benchmarks", "youtube_url_corpus.json")
+
+with open(CORPUS_PATH, encoding="utf-8") as f:
+    CORPUS = json.load(f)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[repr(case["url"]) for case in CORPUS])
+def test_corpus(case):
+    parsed = youtube_url.parse_youtube_url(case["url"])
+    if case.get("invalid"):
+        assert parsed is None
+    else:
+        assert (parsed.video_id, parsed.playlist_id, parsed.start) == (
+            case["video_id"], case["playlist_id"], case["start"])
+
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if not case.get("invalid")],
+                         ids=lambda case: repr(case["url"]))
+def test_generated_urls_parse_back(case):
+    # Las URLs que genera la aplicación (embed canónico y del reproductor) vuelven a dar lo mismo
+    parsed = youtube_url.parse_youtube_url(case["url"])
+    for url in (parsed.embed_url, parsed.player_url(enablejsapi=1)):
+        again = youtube_url.parse_youtube_url(url)
+        assert (again.video_id, again.playlist_id) == (parsed.video_id, parsed.playlist_id)
+
+
+def test_playlist_embed_is_not_a_video_id():
+    parsed = youtube_url.parse_youtube_url("https://www.youtube.com/embed/videoseries?list=PLabc")
+    assert parsed.video_id is None
+    assert parsed.playlist_id == "PLabc"
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("90", 90), ("90s", 90), ("1m30s", 90), ("1h2m3s", 3723), ("", 0), ("abc", 0),
+])
+def test_parse_time(value, seconds):
+    assert youtube_url.parse_time(value) == seconds
+
+
+def test_parse_many_matches_single_calls():
+    urls = [case["url"] for case in CORPUS]
+    assert youtube_url.parse_many(urls) == [youtube_url.parse_youtube_url(url) for url in urls]
@@ -0,0 +1,133 @@
+"""Parser de URLs de YouTube.
+
+Un único patrón precompilado reconoce todas las formas de enlace que usa la
+aplicación (watch, youtu.be, embed, shorts, live, playlist, m./music.) y
+devuelve un resultado estructurado. Los resultados se memorizan con un LRU,
+así que volver a analizar la misma URL (historial, deduplicación, embed) es
+prácticamente gratis; parse_many() sirve para importaciones masivas.
+"""
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+# Dominio por defecto del reproductor embebido (los benchmarks lo apuntan a un servidor local)
+EMBED_HOST = os.environ.get("YOUTUBE_FLOATER_EMBED_HOST", "https://www.youtube-nocookie.com")
+
+
+def _embed_hosts():
+    hosts = [host.strip() for host in os.environ.get("YOUTUBE_FLOATER_EMBED_HOSTS", "").split(",") if host.strip()]
+    if hosts:
+        return tuple(hosts)
+    if "YOUTUBE_FLOATER_EMBED_HOST" in os.environ:
+        return (EMBED_HOST,)
+    return ("https://www.youtube-nocookie.com", "https://www.youtube.com")
+
+
+# Dominios de embed alternativos entre los que puede elegir (o competir) la carga
+EMBED_HOSTS = _embed_hosts()
+
+_VIDEO_ID = r"[A-Za-z0-9_-]{11}"
+
+_URL_RE = re.compile(
+    r"""
+    ^(?:https?://)?
+    (?:
+        (?:(?:www|m|music)\.)?youtube(?:-nocookie)?\.com
+        (?:
+            /(?:embed|shorts|live|v|e)/(?!videoseries(?![A-Za-z0-9_-]))(?P<path_id>""" + _VIDEO_ID + r""")(?![A-Za-z0-9_-])
+          | /embed/videoseries(?![A-Za-z0-9_-])
+          | /(?:watch|playlist)/?(?=[?#]|$)
+          | /?(?=[?#]|$)
+        )
+      | youtu\.be/(?P<short_id>""" + _VIDEO_ID + r""")(?![A-Za-z0-9_-])
+    )
+    (?P<rest>[/?#].*)?$
+    """,
+    re.VERBOSE | re.IGNORECASE,
+)
+
+# Parámetros de query o fragmento que interesan (v= puede ir en cualquier posición)
+_PARAM_RE = re.compile(r"[?&#](v|list|t|start|time_continue)=([^&#]*)")
+_PARAM_VIDEO_ID_RE = re.compile(_VIDEO_ID + r"$")
+_PLAYLIST_ID_RE = re.compile(r"[A-Za-z0-9_-]+$")
+_TIME_RE = re.compile(r"^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?$", re.IGNORECASE)
+
+
+class ParsedUrl(NamedTuple):
+    """Resultado de parse_youtube_url()"""
+    video_id: Optional[str]
+    playlist_id: Optional[str]
+    start: int
+    embed_url: str
+
+    def player_url(self, autoplay=True, host=None, start=None, **params):
+        """URL del reproductor embebido con parámetros de reproducción (vq, enablejsapi, ...).
+
+        start sustituye al inicio que venía en la URL original; los parámetros
+        con valor None se omiten.
+        """
+        start = self.start if start is None else int(start)
+        query = {"autoplay": "1" if autoplay else "0"}
+        if self.playlist_id:
+            query["list"] = self.playlist_id
+        if start:
+            query["start"] = str(start)
+        query.update((key, str(value)) for key, value in params.items() if value is not None)
+        path = self.video_id or "videoseries"
+        return f"{host or EMBED_HOST}/embed/{path}?" + "&".join(f"{key}={value}" for key, value in query.items())
+
+
+def parse_time(value):
+    """Segundos de un parámetro t=/start= ("90", "90s", "1m30s", "1h2m3s"); 0 si no es válido"""
+    match = _TIME_RE.match(value or "")
+    if not match or not any(match.groups()):
+        return 0
+    hours, minutes, seconds = (int(group or 0) for group in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def _canonical_embed_url(video_id, playlist_id, start):
+    if video_id:
+        url = f"{EMBED_HOST}/embed/{video_id}"
+        query = []
+        if playlist_id:
+            query.append(f"list={playlist_id}")
+        if start:
+            query.append(f"start={start}")
+        return url + ("?" + "&".join(query) if query else "")
+    return f"{EMBED_HOST}/embed/videoseries?list={playlist_id}"
+
+
+@lru_cache(maxsize=4096)
+def parse_youtube_url(url):
+    """Analiza una URL de YouTube. Devuelve ParsedUrl, o None si no es de YouTube"""
+    match = _URL_RE.match((url or "").strip())
+    if not match:
+        return None
+    video_id = match.group("path_id") or match.group("short_id")
+    playlist_id = None
+    start = 0
+    for name, value in _PARAM_RE.findall(match.group("rest") or ""):
+        if name == "v":
+            if video_id is None and _PARAM_VIDEO_ID_RE.match(value):
+                video_id = value
+        elif name == "list":
+            if _PLAYLIST_ID_RE.match(value):
+                playlist_id = value
+        elif not start:
+            start = parse_time(value)
+    if not video_id and not playlist_id:
+        return None
+    return ParsedUrl(video_id, playlist_id, start, _canonical_embed_url(video_id, playlist_id, start))
+
+
+def parse_many(urls):
+    """Analiza una secuencia de URLs (p. ej. una importación de historial); comparte el memo LRU"""
+    parse = parse_youtube_url
+    return [parse(url) for url in urls]
+
+
+def video_id(url):
+    parsed = parse_youtube_url(url)
+    return parsed.video_id if parsed else None